@@ -1 +1,3 @@
-from .serde import from_dict, to_dict
+from .serde import from_dict, from_json, to_dict, to_json
+# After serde, as attrkid.fields (which patch imports) needs from_dict
+from .patch import evolve
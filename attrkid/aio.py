@@ -0,0 +1,413 @@
+import asyncio
+import codecs
+import collections
+import contextlib
+import contextvars
+import functools
+import re
+import threading
+
+from . import jsonlib
+from .codec import _current_codecs
+from .engine import Decoder
+from .jsonlib import _current_backend
+from .options import SerdeOptions
+from .serde import from_dict as _sync_from_dict
+
+# Nodes decoded between giving control back to the event loop
+DEFAULT_BUDGET = 1000
+
+# Payload sizes (roughly, in bytes of JSON) above which `decode` moves work
+# off the event loop, and into a process pool if one is given
+DEFAULT_INLINE_THRESHOLD = 64 * 1024
+DEFAULT_PROCESS_THRESHOLD = 4 * 1024 * 1024
+
+INLINE = 'inline'
+THREAD = 'thread'
+PROCESS = 'process'
+
+DecodeStats = collections.namedtuple('DecodeStats',
+                                     [INLINE, THREAD, PROCESS])
+
+# Route -> [calls, total estimated size]
+_stats = {route: [0, 0] for route in DecodeStats._fields}
+_stats_lock = threading.Lock()
+
+_WHITESPACE = ' \t\n\r'
+
+# What _StreamParser looks for outside strings, the body of a string, and
+# what ends a number or literal
+_SPECIAL = re.compile(r'["\[\]{}]')
+_STRING_BODY = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*', re.DOTALL)
+_SCALAR_END = re.compile(r'[ \t\n\r,\]}]')
+
+
+async def from_dict(cls,
+                    data,
+                    *,
+                    defaults=None,
+                    options: SerdeOptions = None,
+                    budget=DEFAULT_BUDGET):
+    """
+    Deserialise `data` into a `cls` instance, exactly as
+    `attrkid.from_dict`, but give control back to the event loop after
+    every `budget` nodes (nested instances, and items of nested
+    collections), so that other tasks keep running while a large payload
+    is decoded.
+
+    Args:
+        cls: The class to instantiate
+        data: Data to parse
+        defaults: Any defaults from missing data
+        options: A SerdeOptions instance, as for `attrkid.from_dict`
+        budget: Nodes to decode between yields to the event loop
+
+    Returns:
+        The instance
+    """
+    if budget < 1:
+        raise ValueError('budget must be at least 1')
+    with _options_in_force(options):
+        decoder = Decoder(
+            cls,
+            data,
+            defaults=defaults,
+            share_references=options is not None
+            and options.share_references)
+        while not decoder.run(budget):
+            await asyncio.sleep(0)
+    return decoder.result
+
+
+@contextlib.contextmanager
+def _options_in_force(options):
+    """ Use the codecs and JSON backend `options` choose, within the block """
+    tokens = []
+    if options is not None and options.codecs is not None:
+        tokens.append((_current_codecs, _current_codecs.set(options.codecs)))
+    if options is not None and options.json_backend is not None:
+        backend = jsonlib.get_backend(options.json_backend)
+        tokens.append((_current_backend, _current_backend.set(backend)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+async def decode(cls,
+                 raw,
+                 *,
+                 options: SerdeOptions = None,
+                 executor=None,
+                 inline_threshold=DEFAULT_INLINE_THRESHOLD,
+                 process_executor=None,
+                 process_threshold=DEFAULT_PROCESS_THRESHOLD):
+    """
+    Decode `raw` into a `cls` instance, choosing where to do the work from
+    an estimate of the payload's size:
+
+     - below `inline_threshold`, on the event loop, as it's cheaper than
+       handing the work off;
+     - at or above `process_threshold`, in `process_executor` if one is
+       given and `raw` is JSON text, so the decode doesn't compete for the
+       GIL. `cls` must be importable (picklable) for this.
+     - otherwise in `executor`, or the loop's default thread pool.
+
+    Work done in a thread runs in a copy of the caller's context, so the
+    codecs, intern table and allocation profile in force still apply. A
+    process only gets `options` (which must be picklable).
+
+    The route taken is counted; see `decode_stats`.
+
+    Args:
+        cls: The class to instantiate
+        raw: JSON text (bytes or str), or already-parsed data
+        options: A SerdeOptions instance, as for `attrkid.from_dict`
+        executor: The executor for mid-sized payloads, or None for the
+            loop's default
+        inline_threshold: Estimated size below which to decode inline
+        process_executor: Optional `ProcessPoolExecutor` for the largest
+            payloads
+        process_threshold: Estimated size from which to use
+            `process_executor`
+
+    Returns:
+        The instance
+    """
+    size = _estimate_size(raw, limit=max(inline_threshold, process_threshold))
+    if size < inline_threshold:
+        route = INLINE
+    elif (process_executor is not None and size >= process_threshold
+          and isinstance(raw, (bytes, str))):
+        route = PROCESS
+        executor = process_executor
+    else:
+        route = THREAD
+
+    with _stats_lock:
+        stats = _stats[route]
+        stats[0] += 1
+        stats[1] += size
+
+    if route == INLINE:
+        return _decode(cls, raw, options)
+    func = functools.partial(_decode, cls, raw, options)
+    if route == THREAD:
+        func = functools.partial(contextvars.copy_context().run, func)
+    return await asyncio.get_running_loop().run_in_executor(executor, func)
+
+
+def decode_stats(*, size=False) -> DecodeStats:
+    """
+    Return how many `decode` calls took each route, or with `size=True`
+    the total estimated size of the payloads that took it.
+    """
+    with _stats_lock:
+        index = 1 if size else 0
+        return DecodeStats(
+            *[_stats[route][index] for route in DecodeStats._fields])
+
+
+def reset_decode_stats():
+    with _stats_lock:
+        for stats in _stats.values():
+            stats[:] = [0, 0]
+
+
+def _decode(cls, raw, options=None):
+    # Module level, so process pools can pickle it
+    if isinstance(raw, (bytes, str)):
+        raw = jsonlib.loads(raw, options=options)
+    return _sync_from_dict(cls, raw, options=options)
+
+
+def _estimate_size(value, *, limit):
+    """
+    Roughly estimate the size of `value` as JSON, without encoding it.
+    Parsed data is walked only until the estimate reaches `limit`.
+    """
+    if isinstance(value, (bytes, str)):
+        return len(value)
+
+    size = 0
+    stack = [value]
+    while stack and size < limit:
+        value = stack.pop()
+        if isinstance(value, dict):
+            # Braces, and quotes, colons and commas for each key
+            size += 2 + 4 * len(value) + sum(map(len, value))
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            size += 2 + len(value)
+            stack.extend(value)
+        elif isinstance(value, str):
+            size += len(value) + 2
+        else:
+            # Numbers, booleans and null
+            size += 8
+    return size
+
+
+async def aiter_from_json(cls,
+                          stream,
+                          *,
+                          options: SerdeOptions = None,
+                          budget=DEFAULT_BUDGET):
+    """
+    Incrementally parse JSON from `stream`, an async iterable of bytes (or
+    str) chunks, yielding a `cls` instance as each one is complete. The
+    stream may hold either a single JSON array of objects, or a sequence of
+    objects separated by whitespace (eg. newline-delimited JSON):
+
+        async for order in aiter_from_json(Order, response.content):
+            ...
+
+    Only one element is held in memory at a time, and each is decoded with
+    `from_dict` above, so the event loop is given control at least once
+    per chunk and every `budget` nodes.
+
+    Args:
+        cls: The class to instantiate for each element
+        stream: Async iterable of bytes or str chunks, encoded as UTF-8
+        options: A SerdeOptions instance, as for `attrkid.from_dict`
+        budget: Nodes to decode between yields to the event loop
+
+    Returns:
+        An async iterator of instances
+    """
+    parser = _StreamParser(options)
+    async for chunk in stream:
+        parser.feed(chunk)
+        for raw in parser.values():
+            yield await from_dict(cls, raw, options=options, budget=budget)
+        await asyncio.sleep(0)
+
+    parser.close()
+    for raw in parser.values():
+        yield await from_dict(cls, raw, options=options, budget=budget)
+    parser.finish()
+
+
+class _StreamParser:
+    """
+    Pulls complete JSON values out of text fed to it in pieces, treating a
+    leading `[` as the start of an array of values.
+
+    Each piece is scanned once, keeping track of bracket depth and whether
+    we're in a string, so that a value is only decoded once all of it has
+    arrived, with the JSON backend `options` choose. A large value spanning
+    many pieces costs the same as one arriving whole.
+    """
+
+    def __init__(self, options=None):
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._options = options
+        # Text fed since values() last ran
+        self._unscanned = []
+        # Text after the end of the array, for finish() to complain about
+        self._rest = []
+        # None until we've seen the first value, then whether we're in an
+        # array, and whether the array has been closed.
+        self._array = None
+        self._closed = False
+        self._ended = False
+        # Whether the next array value must be preceded by a comma
+        self._need_comma = False
+        # The pieces of the value we're part way through, or None
+        self._value = None
+        self._scalar = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        if not isinstance(chunk, str):
+            chunk = self._text.decode(chunk)
+        self._unscanned.append(chunk)
+
+    def close(self):
+        self._unscanned.append(self._text.decode(b'', final=True))
+        self._ended = True
+
+    def values(self):
+        text = ''.join(self._unscanned)
+        self._unscanned = []
+        pos = 0
+        while pos < len(text):
+            if self._closed:
+                self._rest.append(text[pos:])
+                break
+
+            if self._value is None:
+                pos = self._skip(text, pos)
+                if pos == len(text):
+                    break
+                c = text[pos]
+                if self._array is None:
+                    self._array = c == '['
+                    if self._array:
+                        pos += 1
+                        continue
+                if self._array:
+                    if c == ']':
+                        self._closed = True
+                        pos += 1
+                        continue
+                    if self._need_comma:
+                        if c != ',':
+                            raise ValueError(
+                                f'Expected "," or "]" in JSON stream, got '
+                                f'{c!r}')
+                        self._need_comma = False
+                        pos += 1
+                        continue
+                self._start_value(c)
+
+            start = pos
+            end = self._scan(text, pos)
+            if end < 0:
+                self._value.append(text[start:])
+                break
+            self._value.append(text[start:end])
+            yield self._decode()
+            pos = end
+
+        if self._ended and self._value is not None and self._scalar:
+            # A number (or literal) that ran to the end of the stream
+            yield self._decode()
+
+    def _start_value(self, c):
+        self._value = []
+        self._scalar = c not in '{["'
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def _scan(self, text, pos):
+        """
+        Scan `text` from `pos` for the end of the current value, returning
+        the position just past it, or -1 if it doesn't end in `text`.
+        """
+        if self._scalar:
+            match = _SCALAR_END.search(text, pos)
+            return -1 if match is None else match.start()
+        while True:
+            if self._in_string:
+                if self._escape:
+                    # Whatever was escaped can't end the string
+                    if pos == len(text):
+                        return -1
+                    pos += 1
+                    self._escape = False
+                pos = _STRING_BODY.match(text, pos).end()
+                if pos == len(text):
+                    return -1
+                if text[pos] == '\\':
+                    # The text ends part way through an escape
+                    self._escape = True
+                    return -1
+                pos += 1
+                self._in_string = False
+                if self._depth == 0:
+                    return pos
+                continue
+
+            match = _SPECIAL.search(text, pos)
+            if match is None:
+                return -1
+            pos = match.end()
+            c = match.group()
+            if c == '"':
+                self._in_string = True
+            elif c in '[{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    return pos
+
+    def _decode(self):
+        text = ''.join(self._value)
+        self._value = None
+        self._need_comma = bool(self._array)
+        # The scan ends exactly where the value does, so anything else in
+        # the text is invalid JSON for the backend to reject
+        return jsonlib.loads(text, options=self._options)
+
+    def finish(self):
+        """ Check nothing is left over at the end of the stream """
+        if self._value is not None:
+            raise ValueError('JSON stream ended inside a value')
+        rest = ''.join(self._rest).strip(_WHITESPACE)
+        if rest:
+            raise ValueError(f'Unexpected trailing data in JSON stream: '
+                             f'{rest[:20]!r}')
+        if self._array and not self._closed:
+            raise ValueError('JSON stream ended inside an array')
+
+    @staticmethod
+    def _skip(text, pos):
+        while pos < len(text) and text[pos] in _WHITESPACE:
+            pos += 1
+        return pos
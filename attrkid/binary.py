@@ -0,0 +1,654 @@
+import array
+import datetime
+import decimal
+import hashlib
+import struct
+import sys
+
+import attr
+import pytz
+
+from .codec import CODECS
+from .constants import COLLECTION_TYPES, IS_NDARRAY, PREC, SELF, TYPECODE
+from .exceptions import SchemaMismatchError
+from .kind import UnionKind
+from .reflect import class_info, field_subtype, field_type
+from .engine import _construct
+from .serde import _DEFAULT_OPTIONS, _field_default, to_dict
+
+MAGIC = b'AK'
+VERSION = 1
+FINGERPRINT_SIZE = 8
+_HEADER_SIZE = len(MAGIC) + 1 + FINGERPRINT_SIZE
+
+_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=pytz.utc)
+_FLOAT = struct.Struct('<d')
+
+# Tags for values with no schema information (eg. any_field)
+_T_NONE = 0
+_T_FALSE = 1
+_T_TRUE = 2
+_T_INT = 3
+_T_FLOAT = 4
+_T_STR = 5
+_T_BYTES = 6
+_T_LIST = 7
+_T_DICT = 8
+
+
+def dumps(instance) -> bytes:
+    """
+    Encode an attrs instance into attrkid's compact binary format.
+
+    Fields are written positionally in `attr.fields` order, using the type
+    information recorded by `attrkid.fields`, so no field names are stored.
+    The output starts with a fingerprint of the schema, which `loads` checks
+    before decoding.
+
+    Args:
+        instance: The attrs instance to encode
+
+    Returns:
+        The encoded bytes
+    """
+    codec = _class_codec(type(instance))
+    payload = bytearray()
+    codec.encode(payload, instance)
+    buf = bytearray(MAGIC)
+    buf.append(VERSION)
+    buf += codec.fingerprint
+    _write_uvarint(buf, len(payload))
+    buf += payload
+    return bytes(buf)
+
+
+def loads(cls, data):
+    """
+    Decode bytes produced by `dumps` into a `cls` instance.
+
+    Raises `SchemaMismatchError` if the data was written for a different
+    schema.
+
+    Args:
+        cls: The class to instantiate
+        data: The encoded bytes
+
+    Returns:
+        A `cls` instance
+    """
+    codec = _class_codec(cls)
+    data = bytes(data)
+    length, pos = _read_header(codec, data[:_HEADER_SIZE], data,
+                               _HEADER_SIZE)
+    if pos + length != len(data):
+        raise ValueError('Binary data length does not match its header')
+    value, pos = codec.decode(data, pos)
+    return value
+
+
+def dump(instance, fp):
+    """
+    Encode `instance` as `dumps` does, writing it to the file-like `fp`.
+    Several instances may be written to the same stream one after another.
+    """
+    fp.write(dumps(instance))
+
+
+def load(cls, fp):
+    """
+    Read one instance written by `dump` from the file-like `fp`.
+
+    Raises `EOFError` if the stream is exhausted.
+    """
+    codec = _class_codec(cls)
+    header = fp.read(_HEADER_SIZE)
+    if not header:
+        raise EOFError()
+    length, _ = _read_header(codec, header, _StreamBytes(fp), 0)
+    payload = fp.read(length)
+    if len(payload) != length:
+        raise ValueError('Binary data is truncated')
+    value, _ = codec.decode(payload, 0)
+    return value
+
+
+def fingerprint(cls) -> bytes:
+    """
+    Return the schema fingerprint for `cls`. Two classes have the same
+    fingerprint if they have the same field names, types and layout.
+    """
+    return _class_codec(cls).fingerprint
+
+
+def _read_header(codec, header, buf, pos):
+    if len(header) != _HEADER_SIZE or header[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not attrkid binary data')
+    if header[len(MAGIC)] != VERSION:
+        raise ValueError(f'Unsupported binary version {header[len(MAGIC)]}')
+    if header[len(MAGIC) + 1:] != codec.fingerprint:
+        raise SchemaMismatchError(
+            f'Data was not written with the schema for {codec.cls}')
+    return _read_uvarint(buf, pos)
+
+
+class _StreamBytes:
+    """ Just enough of a bytes interface for `_read_uvarint` on a stream """
+
+    def __init__(self, fp):
+        self.fp = fp
+
+    def __getitem__(self, pos):
+        b = self.fp.read(1)
+        if not b:
+            raise ValueError('Binary data is truncated')
+        return b[0]
+
+
+def _write_uvarint(buf, n):
+    while n > 0x7f:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
+def _read_uvarint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        result |= (b & 0x7f) << shift
+        if b < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _enc_int(buf, n):
+    _write_uvarint(buf, n << 1 if n >= 0 else ((-n) << 1) - 1)
+
+
+def _dec_int(buf, pos):
+    z, pos = _read_uvarint(buf, pos)
+    return (-((z + 1) >> 1) if z & 1 else z >> 1), pos
+
+
+def _enc_bool(buf, value):
+    buf.append(1 if value else 0)
+
+
+def _dec_bool(buf, pos):
+    return buf[pos] == 1, pos + 1
+
+
+def _enc_float(buf, value):
+    buf += _FLOAT.pack(value)
+
+
+def _dec_float(buf, pos):
+    return _FLOAT.unpack_from(buf, pos)[0], pos + 8
+
+
+def _enc_bytes(buf, value):
+    if isinstance(value, memoryview):
+        # Count bytes, rather than items of its format
+        value = value.cast('B')
+    _write_uvarint(buf, len(value))
+    buf += value
+
+
+def _dec_bytes(buf, pos):
+    n, pos = _read_uvarint(buf, pos)
+    end = pos + n
+    return bytes(buf[pos:end]), end
+
+
+def _enc_str(buf, value):
+    _enc_bytes(buf, value.encode('utf-8'))
+
+
+def _dec_str(buf, pos):
+    n, pos = _read_uvarint(buf, pos)
+    end = pos + n
+    return str(buf[pos:end], 'utf-8'), end
+
+
+def _enc_decimal(buf, value):
+    # Decimals are written as a scaled int: the exponent, then the
+    # coefficient with the sign in its low bit (so -0 survives).
+    sign, digits, exponent = value.as_tuple()
+    if not isinstance(exponent, int):
+        raise ValueError(f'Cannot encode non-finite decimal {value}')
+    coefficient = int(''.join(map(str, digits))) if digits else 0
+    _enc_int(buf, exponent)
+    _write_uvarint(buf, coefficient << 1 | sign)
+
+
+def _dec_decimal(buf, pos):
+    exponent, pos = _dec_int(buf, pos)
+    n, pos = _read_uvarint(buf, pos)
+    digits = tuple(map(int, str(n >> 1)))
+    return decimal.Decimal((n & 1, digits, exponent)), pos
+
+
+def _enc_datetime(buf, value):
+    # Datetimes are written as microseconds since the epoch, in UTC, with
+    # a low bit set for naive datetimes. Those are taken to be UTC already,
+    # as `datetime_field` does, and decode naive again.
+    naive = value.tzinfo is None
+    if naive:
+        value = value.replace(tzinfo=pytz.utc)
+    delta = value - _EPOCH
+    micros = ((delta.days * 86400 + delta.seconds) * 1000000 +
+              delta.microseconds)
+    _enc_int(buf, micros << 1 | naive)
+
+
+def _dec_datetime(buf, pos):
+    n, pos = _dec_int(buf, pos)
+    value = _EPOCH + datetime.timedelta(microseconds=n >> 1)
+    if n & 1:
+        value = value.replace(tzinfo=None)
+    return value, pos
+
+
+def _enc_any(buf, value):
+    """ Encode a value with no schema information, tagging its type """
+    if value is None:
+        buf.append(_T_NONE)
+    elif value is True:
+        buf.append(_T_TRUE)
+    elif value is False:
+        buf.append(_T_FALSE)
+    elif isinstance(value, int):
+        buf.append(_T_INT)
+        _enc_int(buf, value)
+    elif isinstance(value, float):
+        buf.append(_T_FLOAT)
+        _enc_float(buf, value)
+    elif isinstance(value, str):
+        buf.append(_T_STR)
+        _enc_str(buf, value)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        buf.append(_T_BYTES)
+        _enc_bytes(buf, value)
+    elif isinstance(value, COLLECTION_TYPES):
+        buf.append(_T_LIST)
+        _write_uvarint(buf, len(value))
+        for each in value:
+            _enc_any(buf, each)
+    elif isinstance(value, dict):
+        buf.append(_T_DICT)
+        _write_uvarint(buf, len(value))
+        for k, v in value.items():
+            _enc_str(buf, k)
+            _enc_any(buf, v)
+    elif attr.has(type(value)):
+        _enc_any(buf, to_dict(value))
+    else:
+        raise TypeError(f'Cannot encode {value!r} without type information')
+
+
+def _dec_any(buf, pos):
+    tag = buf[pos]
+    pos += 1
+    if tag == _T_NONE:
+        return None, pos
+    elif tag == _T_TRUE:
+        return True, pos
+    elif tag == _T_FALSE:
+        return False, pos
+    elif tag == _T_INT:
+        return _dec_int(buf, pos)
+    elif tag == _T_FLOAT:
+        return _dec_float(buf, pos)
+    elif tag == _T_STR:
+        return _dec_str(buf, pos)
+    elif tag == _T_BYTES:
+        return _dec_bytes(buf, pos)
+    elif tag == _T_LIST:
+        n, pos = _read_uvarint(buf, pos)
+        result = []
+        for _ in range(n):
+            v, pos = _dec_any(buf, pos)
+            result.append(v)
+        return result, pos
+    elif tag == _T_DICT:
+        n, pos = _read_uvarint(buf, pos)
+        result = {}
+        for _ in range(n):
+            k, pos = _dec_str(buf, pos)
+            result[k], pos = _dec_any(buf, pos)
+        return result, pos
+    raise ValueError(f'Unknown value tag {tag}')
+
+
+# Codecs for concrete types, with the character used to describe them in the
+# schema fingerprint.
+_SCALARS = {
+    bool: ('?', _enc_bool, _dec_bool),
+    int: ('i', _enc_int, _dec_int),
+    float: ('f', _enc_float, _dec_float),
+    str: ('s', _enc_str, _dec_str),
+    bytes: ('b', _enc_bytes, _dec_bytes),
+    decimal.Decimal: ('d', _enc_decimal, _dec_decimal),
+    datetime.datetime: ('t', _enc_datetime, _dec_datetime),
+}
+
+_COLLECTION_CHARS = {list: 'L', tuple: 'T', set: 'S', frozenset: 'S'}
+
+_CODECS = {}
+
+
+def _class_codec(cls):
+    codec = _CODECS.get(cls)
+    if codec is None:
+        if not attr.has(cls):
+            raise TypeError(f'{cls} is not an attrs class')
+        codec = _ClassCodec(cls)
+        # Nested classes' codecs are only looked up when encoding or
+        # decoding, so self-referencing classes don't need this one
+        # registered yet. Only publish it once it's complete, for other
+        # threads; if two threads both compile one, either will do.
+        codec.compile()
+        codec = _CODECS.setdefault(cls, codec)
+    return codec
+
+
+class _ClassCodec:
+    """
+    Encoder and decoder for one attrs class. Each instance is written as a
+    bitmap of which fields are None, followed by the non-None field values
+    in field order.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.fields = []
+        self.kw_only = []
+        # The __init__ argument names of keyword-only fields
+        self.kw_names = []
+        self.defaults = []
+        self._fingerprint = None
+
+    def compile(self):
+        info = class_info(self.cls)
+        for f in info.fields:
+            if not f.init:
+                continue
+            self.kw_only.append(getattr(f, 'kw_only', False))
+            if self.kw_only[-1]:
+                self.kw_names.append(f.name.lstrip('_'))
+            if f not in info.serialisable:
+                self.defaults.append(f)
+                self.fields.append(None)
+                continue
+            self.defaults.append(None)
+            self.fields.append((f.name, ) + _field_codec(self.cls, f))
+        self.encoded = [f for f in self.fields if f is not None]
+        self.bitmap_size = (len(self.encoded) + 7) // 8
+
+    @property
+    def fingerprint(self):
+        if self._fingerprint is None:
+            description = _describe(self.cls, {})
+            self._fingerprint = hashlib.blake2b(
+                description.encode('utf-8'),
+                digest_size=FINGERPRINT_SIZE).digest()
+        return self._fingerprint
+
+    def encode(self, buf, instance):
+        nulls = 0
+        values = []
+        for i, (name, _, enc, _) in enumerate(self.encoded):
+            value = getattr(instance, name)
+            if value is None:
+                nulls |= 1 << i
+            else:
+                values.append((enc, value))
+        buf += nulls.to_bytes(self.bitmap_size, 'little')
+        for enc, value in values:
+            enc(buf, value)
+
+    def decode(self, buf, pos):
+        end = pos + self.bitmap_size
+        nulls = int.from_bytes(buf[pos:end], 'little')
+        pos = end
+        values = []
+        i = 0
+        for field, default in zip(self.fields, self.defaults):
+            if field is None:
+                values.append(_field_default(default))
+                continue
+            if nulls >> i & 1:
+                values.append(None)
+            else:
+                value, pos = field[3](buf, pos)
+                values.append(value)
+            i += 1
+        return self._instantiate(values), pos
+
+    def _instantiate(self, values):
+        if not self.kw_names:
+            return _construct(self.cls, {}, args=values)
+        return _construct(
+            self.cls,
+            dict(
+                zip(self.kw_names,
+                    [v for v, k in zip(values, self.kw_only) if k])),
+            args=[v for v, k in zip(values, self.kw_only) if not k])
+
+
+def _field_codec(owning_cls, f):
+    """
+    Return a (description, encoder, decoder) triple for field `f`. The
+    description is only used to build the schema fingerprint.
+    """
+    typecode = f.metadata.get(TYPECODE)
+    if typecode is not None:
+        return _array_codec(typecode, f.metadata[IS_NDARRAY])
+    if PREC in f.metadata:
+        return _prec_decimal_codec(owning_cls, f)
+
+    proxy, = field_type(f, default=(None, ), unwrap=False)
+    if proxy is not None and not isinstance(proxy, UnionKind):
+        kind, = proxy.get()
+        if kind in COLLECTION_TYPES:
+            sub_proxy, = field_subtype(f, default=(None, ), unwrap=False)
+            return _collection_codec(kind,
+                                     _kind_codec(owning_cls, sub_proxy))
+
+    codec = _kind_codec(owning_cls, proxy)
+    if codec[0] != '*':
+        return codec
+
+    # We don't know how to write this type natively, so fall back to the
+    # field's own serialiser (if any) and a self-describing encoding.
+    info = class_info(owning_cls)
+    serialise = info.serialisers[f.name]
+    deserialise = info.deserialisers[f.name]
+    if serialise is None and deserialise is None:
+        return codec
+
+    def enc(buf, value):
+        if serialise is not None:
+            value = serialise(f, value, options=_DEFAULT_OPTIONS)
+        _enc_any(buf, value)
+
+    def dec(buf, pos):
+        value, pos = _dec_any(buf, pos)
+        if deserialise is not None:
+            value = deserialise(owning_cls, f, value)
+        return value, pos
+
+    return '*', enc, dec
+
+
+def _prec_decimal_codec(owning_cls, f):
+    # Written like any decimal, and rounded to the field's precision when
+    # read, as `from_dict` does
+    deserialise = class_info(owning_cls).deserialisers[f.name]
+
+    def dec(buf, pos):
+        value, pos = _dec_decimal(buf, pos)
+        return deserialise(owning_cls, f, value), pos
+
+    return 'd', _enc_decimal, dec
+
+
+def _array_codec(typecode, ndarray):
+    # Items are written in little-endian order, as everything else is
+    swap = sys.byteorder != 'little'
+
+    def enc(buf, value):
+        data = memoryview(value)
+        if swap or not data.c_contiguous:
+            data = array.array(typecode)
+            data.frombytes(value.tobytes())
+            if swap:
+                data.byteswap()
+        _enc_bytes(buf, data)
+
+    def dec(buf, pos):
+        n, pos = _read_uvarint(buf, pos)
+        end = pos + n
+        value = array.array(typecode)
+        value.frombytes(memoryview(buf)[pos:end])
+        if swap:
+            value.byteswap()
+        if ndarray:
+            import numpy
+            value = numpy.frombuffer(value, dtype=typecode)
+        return value, end
+
+    return f'A{typecode}', enc, dec
+
+
+def _kind_codec(owning_cls, proxy):
+    if proxy is None:
+        return '*', _enc_any, _dec_any
+    if isinstance(proxy, UnionKind):
+        return _union_codec(owning_cls, proxy)
+    kind, = proxy.get()
+    if kind is SELF:
+        kind = owning_cls
+    codec = _SCALARS.get(kind)
+    if codec is not None:
+        return codec
+    if attr.has(kind):
+        return _object_codec(kind)
+    codec = CODECS.lookup(kind)
+    if codec is not None:
+        return _registry_codec(kind, codec)
+    return '*', _enc_any, _dec_any
+
+
+def _registry_codec(kind, codec):
+    # Values are written in their serialised form from the codec registry
+    encode, decode = codec.encode, codec.decode
+
+    def enc(buf, value):
+        _enc_any(buf, encode(value, options=_DEFAULT_OPTIONS))
+
+    def dec(buf, pos):
+        value, pos = _dec_any(buf, pos)
+        return decode(kind, value), pos
+
+    return f'<{kind.__module__}.{kind.__qualname__}>', enc, dec
+
+
+def _object_codec(kind):
+
+    def enc(buf, value):
+        _class_codec(kind).encode(buf, value)
+
+    def dec(buf, pos):
+        return _class_codec(kind).decode(buf, pos)
+
+    return kind, enc, dec
+
+
+def _collection_codec(collection_type, item_codec):
+    description, enc_item, dec_item = item_codec
+
+    def enc(buf, value):
+        _write_uvarint(buf, len(value))
+        for each in value:
+            enc_item(buf, each)
+
+    def dec(buf, pos):
+        n, pos = _read_uvarint(buf, pos)
+        result = []
+        for _ in range(n):
+            value, pos = dec_item(buf, pos)
+            result.append(value)
+        if collection_type is list:
+            return result, pos
+        return collection_type(result), pos
+
+    return (_COLLECTION_CHARS[collection_type], description), enc, dec
+
+
+def _union_codec(owning_cls, union):
+    # Union values are written as the index of their variant, followed by
+    # the variant itself. Variants are resolved lazily, as they may be
+    # DeferredKinds.
+    variants = []
+    indexes = {}
+
+    def resolve():
+        if not variants:
+            for i, (name, kind) in enumerate(union._concrete_kinds()):
+                if kind is SELF:
+                    kind = owning_cls
+                indexes[kind] = i
+                variants.append(_class_codec(kind))
+        return variants
+
+    def enc(buf, value):
+        resolve()
+        try:
+            i = indexes[type(value)]
+        except KeyError:
+            raise ValueError(type(value)) from None
+        _write_uvarint(buf, i)
+        variants[i].encode(buf, value)
+
+    def dec(buf, pos):
+        i, pos = _read_uvarint(buf, pos)
+        return resolve()[i].decode(buf, pos)
+
+    return ('U', union, owning_cls), enc, dec
+
+
+def _describe(cls, seen):
+    """
+    Build a string describing the layout of `cls`, for fingerprinting.
+    Classes already being described are referred to by position, so
+    recursive schemas terminate.
+    """
+    if cls in seen:
+        return f'#{seen[cls]}'
+    seen[cls] = len(seen)
+    codec = _class_codec(cls)
+    parts = []
+    for field in codec.encoded:
+        name, description = field[0], field[1]
+        parts.append(f'{name}:{_describe_codec(description, seen)}')
+    return '{' + ','.join(parts) + '}'
+
+
+def _describe_codec(description, seen):
+    if isinstance(description, str):
+        return description
+    if isinstance(description, type):
+        return _describe(description, seen)
+    if description[0] == 'U':
+        _, union, owning_cls = description
+        variants = []
+        for name, kind in union._concrete_kinds():
+            if kind is SELF:
+                kind = owning_cls
+            variants.append(f'{name}={_describe(kind, seen)}')
+        return 'U(' + '|'.join(variants) + ')'
+    char, item = description
+    return f'{char}[{_describe_codec(item, seen)}]'
@@ -0,0 +1,167 @@
+import contextvars
+import datetime
+import decimal
+import enum
+import ipaddress
+import uuid
+
+import attr
+import pytz
+from dateutil.parser import parse
+
+
+@attr.s(frozen=True, slots=True)
+class Codec:
+    """
+    How to serialise values of one type, and deserialise them again.
+
+    `encode(value, *, options)` is passed the value and the SerdeOptions in
+    force, and returns its serialised form. `decode(cls, raw)` is passed
+    the type the field asks for (which may be a subclass of the one the
+    codec was registered for) and the serialised value.
+    """
+    encode = attr.ib()
+    decode = attr.ib()
+
+
+class CodecRegistry:
+    """
+    Maps types to the `Codec` used for values of that type, in fields that
+    don't serialise their values themselves (including `any_field`, and the
+    items of collection fields).
+
+    A type without a codec of its own uses the codec of its nearest base
+    class that has one, so a codec registered for `enum.Enum` handles every
+    enum. Lookups are cached per type, so after the first value of a type
+    finding its codec is a single dict lookup.
+
+        registry = CODECS.copy()
+        registry.register(Money, encode=..., decode=...)
+        to_dict(order, options=SerdeOptions(codecs=registry))
+
+    Args:
+        codecs: Optional dict of type -> `Codec` to start with
+    """
+
+    def __init__(self, codecs=None):
+        self._codecs = dict(codecs or {})
+        # Type -> Codec or None, filled in as types are looked up
+        self._cache = {}
+
+    def register(self, cls, *, encode, decode):
+        """
+        Use `encode` and `decode` (see `Codec`) for values of `cls` and its
+        subclasses, replacing any codec already registered for `cls`.
+        """
+        self._codecs[cls] = Codec(encode=encode, decode=decode)
+        # Subclasses may have been resolved to another codec
+        self._cache = {}
+
+    def unregister(self, cls):
+        """ Remove the codec registered for `cls` """
+        del self._codecs[cls]
+        self._cache = {}
+
+    def lookup(self, cls):
+        """ Return the `Codec` for values of `cls`, or None """
+        try:
+            return self._cache[cls]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable, so not a type we could have a codec for
+            return None
+        codec = None
+        for base in getattr(cls, '__mro__', ()):
+            codec = self._codecs.get(base)
+            if codec is not None:
+                break
+        self._cache[cls] = codec
+        return codec
+
+    def copy(self):
+        """ Return a new registry holding the same codecs as this one """
+        return CodecRegistry(self._codecs)
+
+    def __contains__(self, cls):
+        return self.lookup(cls) is not None
+
+
+def _encode_datetime(value, *, options):
+    if options.convert_datetimes:
+        value = value.strftime(options.datetime_format)
+    return value
+
+
+def _decode_datetime(cls, raw):
+    # TODO(dan): Ensure timezone is populated with UTC
+    return parse(raw).replace(tzinfo=pytz.utc)
+
+
+def _encode_iso(value, *, options):
+    return value.isoformat()
+
+
+def _decode_iso(cls, raw):
+    return cls.fromisoformat(raw)
+
+
+def _encode_str(value, *, options):
+    return str(value)
+
+
+def _decode_call(cls, raw):
+    return cls(raw)
+
+
+def _encode_enum(value, *, options):
+    return value.value
+
+
+# The registry used unless SerdeOptions say otherwise
+CODECS = CodecRegistry()
+CODECS.register(
+    datetime.datetime, encode=_encode_datetime, decode=_decode_datetime)
+for _cls in (datetime.date, datetime.time):
+    CODECS.register(_cls, encode=_encode_iso, decode=_decode_iso)
+for _cls in (decimal.Decimal, uuid.UUID, ipaddress.IPv4Address,
+             ipaddress.IPv6Address, ipaddress.IPv4Network,
+             ipaddress.IPv6Network, ipaddress.IPv4Interface,
+             ipaddress.IPv6Interface):
+    CODECS.register(_cls, encode=_encode_str, decode=_decode_call)
+CODECS.register(enum.Enum, encode=_encode_enum, decode=_decode_call)
+del _cls
+
+# The registry from_dict is decoding with
+_current_codecs = contextvars.ContextVar('attrkid_codecs', default=CODECS)
+
+
+def register(cls, *, encode, decode):
+    """ Register a codec for `cls` in the global registry, `CODECS` """
+    CODECS.register(cls, encode=encode, decode=decode)
+
+
+def encode(value, *, options):
+    """
+    Serialise `value` with the codec for its type from the registry in
+    `options` (or `CODECS`), or return it as it is if there isn't one.
+    """
+    registry = options.codecs
+    if registry is None:
+        registry = CODECS
+    codec = registry.lookup(value.__class__)
+    if codec is None:
+        return value
+    return codec.encode(value, options=options)
+
+
+def decode(cls, raw):
+    """
+    Deserialise `raw` into a `cls` with the codec for `cls` from the
+    registry `from_dict` is using. None, values which are already a `cls`,
+    and values of types without a codec are returned as they are.
+    """
+    codec = _current_codecs.get().lookup(cls)
+    if codec is None or raw is None or isinstance(raw, cls):
+        return raw
+    return codec.decode(cls, raw)
@@ -0,0 +1,157 @@
+import attr
+
+from .constants import SELF
+from .exceptions import ValidationError
+from .kind import UnionKind
+from .reflect import class_info, field_type
+from .engine import _construct
+from .serde import _field_default
+
+_LEAF = 'leaf'
+_NESTED = 'nested'
+_DEFAULT = 'default'
+
+
+def from_columns(cls, columns, *, masks=None):
+    """
+    Deserialise columnar data into a list of `cls` instances.
+
+    Column names are field names. Fields holding a nested attrs instance
+    can be addressed with dotted paths, eg. `home.postcode`; the nested
+    instance is then built from those columns in the same way.
+
+    A value of None in a column is a null. Nulls can also be given as
+    `masks`, a mapping of column name (or dotted object path, eg. `home`)
+    to a sequence of booleans where True means "null in this row". A mask
+    on an object path makes the whole nested instance None for that row.
+
+    Columns and masks may be any sequence. Anything with a `tolist()` method
+    (`array.array`, NumPy arrays) is converted to plain Python values once,
+    up front, rather than element by element.
+
+    Fields with no column are given their default, as `from_dict` would.
+    Defaults which take the instance (eg. `default_from_attr`) are left to
+    attrs.
+
+    Args:
+        cls: The attrs class to instantiate
+        columns: Mapping of column name to sequence of values
+        masks: Optional mapping of column or object path to null mask
+
+    Returns:
+        A list of `cls` instances, one per row
+    """
+    columns = {name: _as_list(col) for name, col in columns.items()}
+    masks = {name: _as_list(mask) for name, mask in (masks or {}).items()}
+
+    lengths = {len(v) for v in columns.values()}
+    lengths.update(len(v) for v in masks.values())
+    if len(lengths) > 1:
+        raise ValueError(
+            f'All columns and masks must be the same length, got {lengths}')
+    length = lengths.pop() if lengths else 0
+
+    build = _build_plan(cls, '', columns, masks)
+    return [build(i) for i in range(length)]
+
+
+def _as_list(values):
+    tolist = getattr(values, 'tolist', None)
+    if tolist is not None:
+        return tolist()
+    return values
+
+
+def _build_plan(cls, prefix, columns, masks):
+    """
+    Work out where each field of `cls` comes from, and return a function
+    that builds the instance for a given row index.
+    """
+    steps = []
+    kw_only = []
+    # Whether any fields are left for attrs to default
+    omitted = False
+    info = class_info(cls)
+    for f in info.fields:
+        if not f.init:
+            continue
+        path = prefix + f.name
+        if path in columns:
+            source = (_LEAF, columns[path], masks.get(path))
+        elif any(name.startswith(path + '.') for name in columns):
+            nested = _nested_kind(cls, f)
+            source = (_NESTED, _build_plan(nested, path + '.', columns,
+                                           masks), None)
+        elif isinstance(f.default, attr.Factory) and f.default.takes_self:
+            omitted = True
+            continue
+        else:
+            source = (_DEFAULT, None, None)
+        steps.append((f, info.deserialisers[f.name]) + source)
+        kw_only.append(getattr(f, 'kw_only', False))
+
+    names = [f.name for f, *_ in steps]
+    # attrs takes keyword-only fields by keyword, and everything else
+    # positionally in definition order. Once a field is omitted, the ones
+    # after it can't be given positionally, so everything is given by
+    # keyword.
+    if omitted:
+        kw_only = [True] * len(steps)
+    init_names = [name.lstrip('_') for name in names]
+    kw_names = [name for name, k in zip(init_names, kw_only) if k]
+    own_mask = masks.get(prefix[:-1]) if prefix else None
+
+    def build(i):
+        if own_mask is not None and own_mask[i]:
+            return None
+        values = []
+        for f, deserialise, how, source, mask in steps:
+            if how is _LEAF:
+                raw = None if mask is not None and mask[i] else source[i]
+                if deserialise is None:
+                    value = raw
+                else:
+                    try:
+                        value = deserialise(cls, f, raw)
+                    except Exception as exc:
+                        raise ValidationError(
+                            errors=[{
+                                'field': f,
+                                'exc': exc,
+                                'row': i
+                            }],
+                            exc=exc) from exc
+            elif how is _NESTED:
+                value = source(i)
+            else:
+                value = _field_default(f)
+            values.append(value)
+
+        if not kw_names:
+            return _construct(cls, {}, args=values, row=i)
+        return _construct(
+            cls,
+            {n: v for n, v, k in zip(init_names, values, kw_only) if k},
+            args=[v for v, k in zip(values, kw_only) if not k],
+            row=i)
+
+    return build
+
+
+def _nested_kind(cls, f):
+    """
+    Return the attrs class held by object field `f`, so dotted columns can
+    be expanded into it.
+    """
+    proxies = field_type(f, default=(None, ), unwrap=False)
+    proxy, = proxies
+    if proxy is None or isinstance(proxy, UnionKind):
+        raise TypeError(
+            f'Dotted columns cannot be used for field `{f.name}` of {cls}')
+    kind, = proxy.get()
+    if kind is SELF:
+        kind = cls
+    if not attr.has(kind):
+        raise TypeError(
+            f'Dotted columns cannot be used for field `{f.name}` of {cls}')
+    return kind
@@ -8,10 +8,28 @@ IS_UNIQUE = '__is_unique'
 SHOULD_SERIALISE = '__should_serialise'
 IS_DEFAULT_FROM_ATTR = '__is_default_from_attr'
 IS_ONLY_FIELD = '__is_only_field'
+IS_OPTIONAL = '__is_optional'
+# Set on fields holding attrkid-decoded nested instances (or collections of
+# them), so the decoder can walk into them without recursing
+IS_NESTED = '__is_nested'
+# The array module typecode of an array_field, and whether it holds NumPy
+# arrays
+TYPECODE = '__typecode'
+IS_NDARRAY = '__is_ndarray'
+# The precision of a decimal_field, if it was given one
+PREC = '__prec'
 
 # Used to indicate a kind field refers to itself
 SELF = object()
 
 MISSING = object()
 
+# Keys marking shared instances, with SerdeOptions(share_references=True)
+REF_ID = '$id'
+REF = '$ref'
+
 COLLECTION_TYPES = (list, tuple, set, frozenset)
+
+# The operations `attrkid.profile` counts allocations against
+FROM_DICT = 'from_dict'
+TO_DICT = 'to_dict'
@@ -0,0 +1,563 @@
+import abc
+import functools
+
+import attr
+
+from . import jsonlib
+from .codec import _current_codecs, decode, encode
+from .constants import COLLECTION_TYPES, MISSING, REF, REF_ID
+from .exceptions import ValidationError
+from .intern import _current_table
+from .kind import UnionKind, union_parts, union_value
+from .memo import _MEMOISED
+from .reflect import class_info
+from .validators import validate
+
+# Returned by the frame methods while a frame is waiting on a child frame
+_PENDING = object()
+
+
+class _Walker(metaclass=abc.ABCMeta):
+    """
+    Walks a model with an explicit stack of frames rather than by
+    recursing, so that models of any depth can be handled, and so that a
+    walk can be paused between nodes and resumed later.
+
+    Each frame's `step` returns either its finished value, or _PENDING
+    having pushed a child frame; the child's value is passed to the
+    frame's `deliver` when it's finished.
+    """
+
+    def __init__(self, start):
+        self.result = MISSING
+        self._stack = []
+        self._start = start
+
+    def run(self, budget=None):
+        """
+        Visit up to `budget` nodes (nested instances, and the items of
+        nested collections), or everything that's left if `budget` is None.
+
+        Returns:
+            True once the walk has finished and `result` is set
+        """
+        stack = self._stack
+        try:
+            if self._start is not MISSING:
+                value = self._open(*self._start)
+                self._start = MISSING
+                if value is not _PENDING:
+                    self.result = value
+                    return True
+
+            while stack:
+                if budget is not None:
+                    if budget <= 0:
+                        return False
+                    budget -= 1
+
+                value = stack[-1].step(self)
+                if value is _PENDING:
+                    continue
+
+                stack.pop()
+                if not stack:
+                    self.result = value
+                    return True
+                stack[-1].deliver(value)
+        except Exception as exc:
+            raise self._unwind(exc)
+        return True
+
+    @abc.abstractmethod
+    def _open(self, *args):
+        """
+        Start on a value. Returns the result if it can be had straight
+        away, or else pushes a frame and returns _PENDING.
+        """
+
+    def _unwind(self, exc):
+        self._stack.clear()
+        return exc
+
+
+class Decoder(_Walker):
+    """
+    Decodes `data` into a `cls` instance exactly as `from_dict` does (which
+    uses it), a node at a time:
+
+        decoder = Decoder(Order, data)
+        while not decoder.run(budget=1000):
+            ...  # Do something else for a while
+        order = decoder.result
+
+    Args:
+        cls: The class to instantiate
+        data: Data to parse
+        defaults: Any defaults from missing data
+        share_references: Whether to resolve the reference markers written
+            with `SerdeOptions(share_references=True)`
+    """
+
+    def __init__(self, cls, data, *, defaults=None, share_references=False):
+        super().__init__((cls, data, defaults))
+        # Captured now, so a decode resumed elsewhere keeps its table
+        self._table = _current_table.get()
+        # Reference id -> decoded instance
+        self._refs = {} if share_references else None
+
+    def _open(self, cls, data, defaults=None):
+        if not attr.has(cls):
+            return decode(cls, data)
+
+        self._stack.append(_DecodeInstance(cls, data, defaults))
+        return _PENDING
+
+    def _open_item(self, kind, raw):
+        """ Start decoding one nested value of `kind`, as fields.py would """
+        if raw is None:
+            return None
+        if self._refs is not None and type(raw) is dict and REF in raw:
+            try:
+                return self._refs[raw[REF]]
+            except (KeyError, TypeError):
+                raise ValueError(f'Unknown reference {raw[REF]!r}') from None
+        if isinstance(kind, UnionKind):
+            kind, raw = union_parts(kind, raw)
+        return self._open(kind, raw)
+
+    def _open_nested(self, info, field, raw):
+        collection_type = info.nested[field.name]
+        kind = info.item_kind(field.name)
+        if collection_type is None:
+            return self._open_item(kind, raw)
+
+        if isinstance(raw, (bytes, str)):
+            raw = jsonlib.loads(raw)
+        if not isinstance(kind, UnionKind) and not attr.has(kind):
+            # Nothing to decode inside the items, except perhaps by codec
+            if kind in _current_codecs.get():
+                return collection_type(
+                    map(functools.partial(decode, kind), raw))
+            if raw.__class__ is collection_type and collection_type is not list:
+                # Immutable, so it can be shared
+                return raw
+            return collection_type(raw)
+        self._stack.append(_DecodeCollection(kind, collection_type, raw))
+        return _PENDING
+
+    def _unwind(self, exc):
+        """
+        Wrap `exc`, raised by the frame on top of the stack, in a
+        ValidationError for each instance it's nested inside, as a
+        recursive decode would.
+        """
+        stack = self._stack
+        if stack:
+            stack.pop()
+        while stack:
+            frame = stack.pop()
+            if isinstance(frame, _DecodeInstance):
+                wrapped = ValidationError(
+                    errors=[{
+                        'field': frame.field,
+                        'exc': exc
+                    }], exc=exc)
+                wrapped.__cause__ = exc
+                exc = wrapped
+        return exc
+
+
+class _DecodeInstance:
+    __slots__ = ('cls', 'info', 'data', 'defaults', 'index', 'kw', 'field')
+
+    def __init__(self, cls, data, defaults):
+        self.cls = cls
+        self.info = class_info(cls)
+        self.data = data
+        self.defaults = {} if defaults is None else defaults
+        self.index = 0
+        self.kw = {}
+        # The field whose value we're waiting on
+        self.field = None
+
+    def step(self, decoder):
+        info = self.info
+        fields = info.fields
+        nested = info.nested
+        kw = self.kw
+        while self.index < len(fields):
+            f = fields[self.index]
+            self.index += 1
+
+            # If this field is the only field, then we don't have to
+            # extract a value out of the data dict - the whole value *is*
+            # the data dict.
+            value = MISSING
+            if f is info.only_field:
+                raw = self.data
+            else:
+                raw = self.data.get(f.name, MISSING)
+
+                # If we pull a value from defaults and it's not an attrs
+                # class, we'll treat it as a fully-fledged value note
+                # requiring deserialisation.
+                if raw is MISSING:
+                    default = self.defaults.get(f.name, MISSING)
+                    if default is not MISSING:
+                        if attr.has(default):
+                            value = default
+                        else:
+                            raw = default
+
+            if raw is MISSING and value is MISSING:
+                value = _field_default(f)
+
+            if value is MISSING:
+                try:
+                    if f.name in nested and raw is not None:
+                        value = decoder._open_nested(info, f, raw)
+                        if value is _PENDING:
+                            self.field = f
+                            return _PENDING
+                    else:
+                        deserialise = info.deserialisers[f.name]
+                        value = raw if deserialise is None else deserialise(
+                            self.cls, f, raw)
+                except Exception as exc:
+                    raise ValidationError(
+                        errors=[{
+                            'field': f,
+                            'exc': exc
+                        }], exc=exc) from exc
+            kw[f.name] = value
+
+        if decoder._table is not None:
+            instance = decoder._table.intern(self.cls, kw, _construct)
+        else:
+            instance = _construct(self.cls, kw)
+        if decoder._refs is not None and type(self.data) is dict:
+            ref = self.data.get(REF_ID)
+            if ref is not None:
+                decoder._refs[ref] = instance
+        return instance
+
+    def deliver(self, value):
+        self.kw[self.field.name] = value
+
+
+class _DecodeCollection:
+    __slots__ = ('kind', 'collection_type', 'items', 'results')
+
+    def __init__(self, kind, collection_type, raw):
+        self.kind = kind
+        self.collection_type = collection_type
+        self.items = iter(raw)
+        self.results = []
+
+    def step(self, decoder):
+        for raw in self.items:
+            value = decoder._open_item(self.kind, raw)
+            if value is _PENDING:
+                return _PENDING
+            self.results.append(value)
+        if self.collection_type is list:
+            return self.results
+        return self.collection_type(self.results)
+
+    def deliver(self, value):
+        self.results.append(value)
+
+
+class Encoder(_Walker):
+    """
+    Serialises `instance` exactly as `to_dict` does (which uses it), a node
+    at a time. See `Decoder`.
+
+    Args:
+        instance: The instance (or collection of instances) to serialise
+        options: A SerdeOptions instance to control serialisation
+    """
+
+    def __init__(self, instance, *, options):
+        super().__init__((instance, options))
+        # Ids of the instances being serialised, to catch cycles
+        self._active = set()
+        self._shared = self._refs = None
+        if options.share_references:
+            self._shared = _shared_instances(instance)
+            # id(instance) -> reference id, once it has been written out
+            self._refs = {}
+
+    def _open(self, value, options, share=True):
+        # We may get passed a collection. Serialise its elements as a list
+        # - obviously we don't have a field at this point to pull out a
+        # custom serialiser.
+        if isinstance(value, COLLECTION_TYPES):
+            self._stack.append(_EncodeList(value, options))
+            return _PENDING
+
+        cls = value.__class__
+        if not attr.has(cls):
+            return encode(value, options=options)
+
+        key = id(value)
+        if key in self._active:
+            raise ValueError(_cycle_message(value))
+
+        memo = ref = None
+        if self._refs is None:
+            memo = _MEMOISED.get(cls)
+            if memo is not None:
+                result = memo.lookup(value, options)
+                if result is not MISSING:
+                    return result
+        elif share and key in self._shared:
+            ref = self._refs.get(key)
+            if ref is not None:
+                return {REF: ref}
+            ref = self._refs[key] = len(self._refs) + 1
+
+        self._active.add(key)
+        self._stack.append(_EncodeInstance(value, options, memo, ref))
+        return _PENDING
+
+
+class _EncodeInstance:
+    __slots__ = ('instance', 'options', 'memo', 'info', 'rv', 'data', 'union',
+                 'selector', 'index', 'field', 'field_options')
+
+    def __init__(self, instance, options, memo, ref):
+        self.instance = instance
+        self.options = options
+        self.memo = memo
+        self.info = class_info(instance.__class__)
+        self.union = union = options.union
+        if union is not None and not union.untagged:
+            # If we're serialising a union, we need to make sure we
+            # serialise the correct top-level tag.
+            self.selector = union.selector_for(instance.__class__)
+            if union.tag is not None:
+                # Internally tagged, so the tag goes in alongside the fields
+                self.rv = self.data = {union.tag: self.selector}
+            else:
+                self.data = {}
+                self.rv = {self.selector: self.data}
+        else:
+            # Note we've arranged things so the code always updates the
+            # dict pointed to by `data`. This might be the top-level dict,
+            # or it might be the data dict wrapped for the UnionField.
+            self.rv = self.data = {}
+            self.selector = None
+        if ref is not None:
+            self.data[REF_ID] = ref
+        self.index = 0
+        # The field whose value we're waiting on
+        self.field = None
+        self.field_options = options
+
+    def step(self, encoder):
+        info = self.info
+        fields = info.serialisable
+        unions = info.unions
+        serialisers = info.serialisers
+        nested = info.nested
+        instance = self.instance
+        options = self.field_options
+        data = self.data
+        index = self.index
+        while index < len(fields):
+            field = fields[index]
+            index += 1
+            name = field.name
+            value = getattr(instance, name)
+
+            # Figure out if we're processing a field with a UnionKind. If we
+            # are, then we need to pass it down to the next layers as it
+            # will eventually need to be serialised slightly differently.
+            mu = unions[name]
+            if mu is not options.union and mu != options.union:
+                options = self.field_options = attr.evolve(options, union=mu)
+
+            # If this is the only field, then we skip serialisation of this
+            # field and directly return the serialised value.
+            if field is info.only_field:
+                value = encoder._open(value, options)
+                if value is _PENDING:
+                    self.index = index
+                    self.field = field
+                    return _PENDING
+                return self._finish(encoder, self._only(value))
+
+            if options.omit_null_values and value is None:
+                continue
+            serialiser = serialisers[name]
+            if serialiser is not None:
+                if value is not None and nested.get(name) is not None:
+                    # A collection of nested instances
+                    encoder._stack.append(_EncodeList(value, options))
+                    self.index = index
+                    self.field = field
+                    return _PENDING
+                value = serialiser(field, value, options=options)
+            elif attr.has(value.__class__):
+                # We can't decode references in fields we don't decode
+                # ourselves, so don't write them there.
+                value = encoder._open(value, options, share=name in nested)
+                if value is _PENDING:
+                    self.index = index
+                    self.field = field
+                    return _PENDING
+            data[name] = value
+        self.index = index
+        return self._finish(encoder, self.rv)
+
+    def deliver(self, value):
+        if self.field is self.info.only_field:
+            self.index = len(self.info.serialisable)
+            self.rv = self._only(value)
+        else:
+            self.data[self.field.name] = value
+
+    def _only(self, value):
+        # If we're serialising a union (ie. we have a valid selector) then
+        # the value needs tagging rather than returning directly.
+        if self.selector:
+            return union_value(self.union, self.selector, value)
+        return value
+
+    def _finish(self, encoder, result):
+        encoder._active.discard(id(self.instance))
+        if self.memo is not None:
+            result = self.memo.store(self.instance, self.options, result)
+        return result
+
+
+class _EncodeList:
+    __slots__ = ('items', 'options', 'results')
+
+    def __init__(self, items, options):
+        self.items = iter(items)
+        self.options = options
+        self.results = []
+
+    def step(self, encoder):
+        for item in self.items:
+            value = encoder._open(item, self.options)
+            if value is _PENDING:
+                return _PENDING
+            self.results.append(value)
+        return self.results
+
+    def deliver(self, value):
+        self.results.append(value)
+
+
+def _shared_instances(value):
+    """
+    Return the ids of the attrs instances reachable from `value` more than
+    once through nested fields, except for instances of classes with an
+    `is_only_field`, which don't serialise to a dict that could carry a
+    reference id.
+
+    Raises:
+        ValueError: If the instances refer to each other in a cycle
+    """
+    walked = set()
+    shared = set()
+    # Ids of the instances whose children we're walking
+    active = set()
+    # Each entry is an instance (or None for a collection), and an iterator
+    # over its children
+    stack = [(None, iter((value, )))]
+    while stack:
+        owner, children = stack[-1]
+        for child in children:
+            if isinstance(child, COLLECTION_TYPES):
+                stack.append((None, iter(child)))
+                break
+
+            cls = child.__class__
+            if not attr.has(cls):
+                continue
+            key = id(child)
+            if key in active:
+                raise ValueError(_cycle_message(child))
+            info = class_info(cls)
+            if key in walked:
+                if info.only_field is None:
+                    shared.add(key)
+                continue
+
+            walked.add(key)
+            active.add(key)
+            stack.append((child,
+                          iter([
+                              getattr(child, f.name)
+                              for f in info.serialisable
+                              if f.name in info.nested
+                          ])))
+            break
+        else:
+            stack.pop()
+            if owner is not None:
+                active.discard(id(owner))
+    return shared
+
+
+def _cycle_message(value):
+    # Not the repr, which would go round the cycle too
+    return f'Reference cycle through a {value.__class__.__name__} instance'
+
+
+def _construct(cls, kw, *, args=(), row=None):
+    """
+    Return `cls(*args, **kw)`. `args`, if any, are the values of the first
+    fields `__init__` takes positionally, and `kw` holds the rest. `row` is
+    added to the errors of any ValidationError raised.
+    """
+    try:
+        return cls(*args, **kw)
+    except Exception as exc:
+        # If something bad happened, try to run the validators again
+        # individually as a best-effort to figure out what went wrong. This
+        # isn't perfect, because we don't have an instance to play with.
+        if args:
+            kw = _field_values(cls, args, kw)
+        errors = validate(cls, kw)
+        if errors:
+            if row is not None:
+                for error in errors:
+                    error['row'] = row
+            raise ValidationError(errors=errors, exc=exc) from exc
+        raise
+
+
+def _field_values(cls, args, kw):
+    """ Key the `cls` field values in `args` and `kw` by field name """
+    values = {}
+    positional = iter(args)
+    for f in class_info(cls).fields:
+        if not f.init:
+            continue
+        if not getattr(f, 'kw_only', False):
+            value = next(positional, MISSING)
+            if value is not MISSING:
+                values[f.name] = value
+                continue
+        value = kw.get(f.name, kw.get(f.name.lstrip('_'), MISSING))
+        if value is not MISSING:
+            values[f.name] = value
+    return values
+
+
+def _field_default(field):
+    """
+    Return the value to use for `field` when the incoming data has nothing
+    for it: the attrs default (calling any factory), or None.
+    """
+    if field.default is not attr.NOTHING:
+        if isinstance(field.default, attr.Factory):
+            return field.default.factory()
+        return field.default
+    return None
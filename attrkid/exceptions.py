@@ -9,3 +9,17 @@ class ValidationError(Exception):
 
     def __str__(self):
         return self._str
+
+
+class SchemaMismatchError(ValueError):
+    """
+    Raised when encoded data was written for a different schema to the one
+    it is being read with.
+    """
+
+
+class DuplicateKeyError(ValueError):
+    """
+    Raised when adding an instance would give two instances the same primary
+    key or unique field value.
+    """
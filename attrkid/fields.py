@@ -1,42 +1,76 @@
+import array
+import base64
+import binascii
 import datetime
+import enum
 import functools
-import json
 import operator
-import uuid
 
 import attr
 import decimal
-import pytz
-from dateutil.parser import parse
 
 from attr.validators import optional
 
-from . import from_dict, to_dict
+from . import from_dict, jsonlib, to_dict
 
+from .codec import _current_codecs, decode, encode
 from .constants import (
+    COLLECTION_TYPES,
     DESERIALISE,
     IS_DEFAULT_FROM_ATTR,
     IS_KEY,
+    IS_NDARRAY,
+    IS_NESTED,
     IS_ONLY_FIELD,
+    IS_OPTIONAL,
     IS_PK,
     IS_UNIQUE,
     MISSING,
+    PREC,
     SELF,
     SERIALISE,
     SHOULD_SERIALISE,
     SUBTYPE,
     TYPE,
+    TYPECODE,
 )
-from .kind import UnionKind, union_parts, wrap_kind
+from .ids import new_uuid4
+from .kind import ImmediateKind, UnionKind, union_parts, wrap_kind
 from .options import SerdeOptions
-from .reflect import field_subtype, field_type
-from .validators import all_of, collection_of, instance_of
+from .reflect import class_info
+from .validators import (
+    all_of,
+    array_of,
+    collection_of,
+    fuse,
+    instance_of,
+    member_of,
+)
+
+# Types whose values are serialised as they are
+_NATIVE_TYPES = frozenset((str, int, float, bool, bytes, dict) +
+                          COLLECTION_TYPES)
+
+
+# (Enum class, by) -> _EnumCodec
+_ENUM_CODECS = {}
+
+# What bytes_field accepts, without copying
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+
+# bytes_field values longer than this (in bytes) are encoded and decoded a
+# chunk at a time, which bounds the intermediate copies the encoders make
+BYTES_CHUNK_THRESHOLD = 1024 * 1024
+
+# Bytes per chunk; a multiple of 3 and 4, so base64 and base85 chunks don't
+# need padding
+_BYTES_CHUNK_SIZE = 12 * 65536
 
 
 # We do this dance for ease of testing, because new_uuid gets wrapped before
 # any patching is possible
 def _new_uuid():
-    return uuid.uuid4().hex
+    return new_uuid4()
 
 
 def _check_bool(v, name):
@@ -62,7 +96,10 @@ def primary_key(kind=str,
         kind: The class to use for the primary key
         auto: If true, then string values will be autogenerated
             by calling `auto_func`
-        auto_func: a 0-arity function to generate IDs.
+        auto_func: a 0-arity function to generate IDs. The default,
+            `new_uuid`, makes random UUIDs; `attrkid.ids.new_uuid7` and
+            `attrkid.ids.new_ulid` make time-ordered ones, which keep
+            inserts into an index on the key close together.
     Returns:
 
     """
@@ -140,6 +177,7 @@ def object_field(kind,
         should_serialise=should_serialise,
         deserialise=_deserialise_maybe_union,
         is_only_field=is_only_field,
+        is_nested=True,
     )
 
 
@@ -159,19 +197,26 @@ def _field(kind,
            subtype=MISSING,
            default_from_attr=MISSING,
            is_only_field=False,
-           convert=MISSING):
+           is_nested=False,
+           instance_kind=MISSING,
+           metadata=None,
+           converter=MISSING):
     """
     Basic wrapper for attr.ib.
 
     Note that unique is purely informational at this level - it's up to the
-    data persistence layer to do something about it.
+    data persistence layer to do something about it. `instance_kind` is
+    what values are checked to be instances of, if that's not just `kind`,
+    or None if `validator` checks their type itself.
     """
-    if kind:
+    if instance_kind is None:
+        v = None
+    elif instance_kind is not MISSING:
+        v = instance_of(instance_kind)
+    elif kind:
         v = instance_of(kind)
     else:
-
-        def v(inst, attr, value):
-            return True
+        v = None
 
     # Check boolean fields actually are boolean
     _check_bool(unique, 'unique')
@@ -185,12 +230,13 @@ def _field(kind,
     # be able to deserialise them...). We also have to wrap any explicitly-
     # provided validator in optional, otherwise it will be invoked on None.
     if is_optional or not should_serialise:
-        v = optional(v)
+        if v is not None:
+            v = optional(v)
         if validator is not MISSING:
             validator = optional(validator)
 
     if validator is not MISSING:
-        v = all_of(v, validator)
+        v = validator if v is None else all_of(v, validator)
 
     attrkid_metadata = {
         TYPE: kind,
@@ -200,9 +246,14 @@ def _field(kind,
         IS_PK: is_pk,
         IS_DEFAULT_FROM_ATTR: default_from_attr is not MISSING,
         IS_ONLY_FIELD: is_only_field,
+        IS_OPTIONAL: is_optional or not should_serialise,
+        IS_NESTED: is_nested,
     }
+    if metadata:
+        attrkid_metadata.update(metadata)
 
-    kw = {'validator': v, 'metadata': attrkid_metadata}
+    # One generated function, rather than a call per validator it's made of
+    kw = {'validator': fuse(v), 'metadata': attrkid_metadata}
 
     if default_from_attr is not MISSING:
         if default is not MISSING:
@@ -217,8 +268,14 @@ def _field(kind,
         kw['factory'] = factory
     if not should_serialise:
         kw['default'] = None
-    if convert is not MISSING:
-        kw['convert'] = convert
+    if not is_nested and _is_coded(kind):
+        # Leave it to the codec registry, when we get a value
+        if serialise is MISSING:
+            serialise = _serialise_value
+        if deserialise is MISSING and kind:
+            deserialise = _deserialise_value
+    if converter is not MISSING:
+        kw['converter'] = converter
     if serialise is not MISSING:
         attrkid_metadata[SERIALISE] = serialise
     if deserialise is not MISSING:
@@ -229,6 +286,36 @@ def _field(kind,
     return attr.ib(**kw)
 
 
+def _is_coded(kind):
+    """
+    Return True if values of a field of `kind` (as wrapped by `wrap_kind`)
+    should be serialised by the codec registry: untyped fields, and fields
+    of a single type which isn't serialised as it is.
+    """
+    if not kind:
+        return True
+    if len(kind) > 1 or isinstance(kind[0], UnionKind):
+        return False
+    if isinstance(kind[0], ImmediateKind):
+        kind = kind[0].kind
+        return not (kind is SELF or kind in _NATIVE_TYPES or attr.has(kind))
+    # Deferred, so we can't tell yet
+    return True
+
+
+def _serialise_value(field, value, *, options: SerdeOptions):
+    if attr.has(value.__class__):
+        return to_dict(value, options=options)
+    return encode(value, options=options)
+
+
+def _deserialise_value(owning_cls, field, value):
+    if value is None:
+        return None
+    kind, = class_info(owning_cls).field_types(field.name)
+    return from_dict(kind, value)
+
+
 def _deserialise_list_of(collection_type, kind, owning_cls, field, value):
     """
     Deserialise a list of items into a collection objects of class `kind`. Note
@@ -247,12 +334,24 @@ def _deserialise_list_of(collection_type, kind, owning_cls, field, value):
         return None
     # TODO(dan): Is this json stuff necessary?
     if isinstance(value, (bytes, str)):
-        value = json.loads(value)
-
-    result = [
-        _deserialise_maybe_union(owning_cls, field, each) for each in value
-    ]
-    return collection_type(result)
+        value = jsonlib.loads(value)
+
+    # Build the collection straight from the items, rather than filling a
+    # list and copying it
+    item_kind = class_info(owning_cls).item_kind(field.name)
+    if not isinstance(item_kind, UnionKind) and not attr.has(item_kind):
+        # Nothing to decode inside the items, except perhaps by codec
+        if item_kind in _current_codecs.get():
+            return collection_type(
+                map(functools.partial(decode, item_kind), value))
+        if value.__class__ is collection_type and collection_type is not list:
+            # Immutable, so it can be shared
+            return value
+        return collection_type(value)
+    return collection_type(
+        map(
+            functools.partial(_deserialise_maybe_union, owning_cls, field),
+            value))
 
 
 def _collection_field(collection_type,
@@ -264,7 +363,7 @@ def _collection_field(collection_type,
                       is_only_field=False,
                       is_optional=False,
                       default=MISSING,
-                      convert=MISSING,
+                      converter=MISSING,
                       deserialise=MISSING):
     v = collection_of(kind)
     if validator is not MISSING:
@@ -274,7 +373,9 @@ def _collection_field(collection_type,
     if default_from_attr is MISSING and default is MISSING:
         default = attr.Factory(collection_type)
 
-    if deserialise is MISSING:
+    # Items are only nested instances if we're decoding them ourselves
+    is_nested = deserialise is MISSING
+    if is_nested:
         deserialise = functools.partial(_deserialise_list_of, collection_type,
                                         kind)
 
@@ -294,7 +395,8 @@ def _collection_field(collection_type,
         is_optional=is_optional,
         should_serialise=should_serialise,
         default_from_attr=default_from_attr,
-        convert=convert,
+        is_nested=is_nested,
+        converter=converter,
         serialise=_serialise)
 
 
@@ -320,7 +422,7 @@ def list_field(kind,
         validator=validator,
         should_serialise=should_serialise,
         is_only_field=is_only_field,
-        convert=sort_converter)
+        converter=sort_converter)
 
 
 @wrap_kind()
@@ -355,25 +457,124 @@ def set_field(kind,
         validator=validator,
         should_serialise=should_serialise,
         default_from_attr=default_from_attr,
-        convert=frozenset)
+        converter=_to_frozenset)
+
+
+def _to_frozenset(value):
+    # Values decoded by from_dict are frozensets already, so don't copy them
+    if value is None or value.__class__ is frozenset:
+        return value
+    return frozenset(value)
+
+
+def array_field(typecode,
+                *,
+                ndarray=False,
+                validator=MISSING,
+                is_optional=False,
+                default=MISSING,
+                factory=MISSING,
+                should_serialise=True):
+    """
+    A field holding a sequence of numbers, stored unboxed in an
+    `array.array` of `typecode` ('d' for doubles, 'q' for 64 bit ints and so
+    on, as for the array module), or with `ndarray=True` in a 1-d NumPy
+    array of the matching dtype. A double takes 8 bytes this way, rather
+    than about 32 in a list.
+
+    Values are checked by their typecode (or dtype) alone, rather than item
+    by item, and serialised as lists. Decoding checks each item's type as
+    the array is filled. The binary format writes the array's memory as it
+    is.
+
+    NumPy arrays don't compare with `==` as attrs expects, so classes with
+    an `ndarray=True` field should be defined with `cmp=False`.
+
+    Args:
+        typecode: The array module typecode of the items
+        ndarray: Whether to hold NumPy arrays rather than `array.array`s
+    """
+    if (not isinstance(typecode, str) or len(typecode) != 1
+            or typecode not in array.typecodes or typecode in 'uw'):
+        raise ValueError(f'{typecode!r} is not a numeric array typecode')
+    codec = _array_codec(typecode, ndarray)
+    v = array_of(typecode, ndarray=ndarray)
+    if validator is not MISSING:
+        v = all_of(v, validator)
+    if default is MISSING and factory is MISSING and not is_optional:
+        factory = codec.empty
+    return _field(
+        codec.kind,
+        # array_of checks the type
+        instance_kind=None,
+        validator=v,
+        is_optional=is_optional,
+        default=default,
+        factory=factory,
+        should_serialise=should_serialise,
+        serialise=codec.serialise,
+        deserialise=codec.deserialise,
+        metadata={
+            TYPECODE: typecode,
+            IS_NDARRAY: ndarray
+        })
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError(
+            'NumPy must be installed to use array_field(ndarray=True)'
+        ) from None
+    return numpy
+
+
+# (typecode, ndarray) -> _ArrayCodec
+_ARRAY_CODECS = {}
+
+
+def _array_codec(typecode, ndarray):
+    codec = _ARRAY_CODECS.get((typecode, ndarray))
+    if codec is None:
+        kind = _numpy().ndarray if ndarray else array.array
+        codec = _ARRAY_CODECS[(typecode, ndarray)] = _ArrayCodec(
+            typecode, kind)
+    return codec
+
+
+@attr.s(frozen=True, slots=True)
+class _ArrayCodec:
+    typecode = attr.ib()
+    kind = attr.ib()
+
+    def empty(self):
+        return self.deserialise(None, None, ())
+
+    def serialise(self, field, value, *, options: SerdeOptions):
+        if value is None:
+            return None
+        return value.tolist()
+
+    def deserialise(self, owning_cls, field, value):
+        if value is None or value.__class__ is self.kind:
+            return value
+        if isinstance(value, (bytes, str)):
+            value = jsonlib.loads(value)
+        # array checks each item is of the right type (which NumPy doesn't
+        # for, eg. floats in an int array), and NumPy can then share its
+        # memory.
+        value = array.array(self.typecode, value)
+        if self.kind is array.array:
+            return value
+        return _numpy().frombuffer(value, dtype=self.typecode)
 
 
 def _deserialise_maybe_union(owning_cls, field, value):
     if value is not None:
-        maybe_typ, = field_subtype(field, unwrap=False, default=(None, ))
-        if maybe_typ is None:
-            typ, = field_type(field, unwrap=False)
-        else:
-            typ = maybe_typ
-        if isinstance(typ, UnionKind):
-            final_kind, value = union_parts(typ, value)
-        else:
-            # This is safe, because only UnionKind returns multiple
-            # types in its `get()`.
-            final_kind, = typ.get()
-            if final_kind is SELF:
-                final_kind = owning_cls
-
+        final_kind = class_info(owning_cls).item_kind(field.name)
+        if isinstance(final_kind, UnionKind):
+            final_kind, value = union_parts(final_kind, value)
         return from_dict(final_kind, value)
     else:
         return None
@@ -449,28 +650,12 @@ def datetime_field(*,
                    validator=MISSING,
                    is_optional=False):
 
-    def _parse_datetime(owning_cls, field, v):
-        if v is None:
-            return None
-        if isinstance(v, datetime.datetime):
-            # TODO(dan): Ensure timezone is populated with UTC
-            return v
-        else:
-            return parse(v).replace(tzinfo=pytz.utc)
-
-    def _serialise_datetime(field, value, *, options: SerdeOptions):
-        if isinstance(value, datetime.datetime) and options.convert_datetimes:
-            value = value.strftime(options.datetime_format)
-        return value
-
     return _field(
         datetime.datetime,
         validator=validator,
         is_optional=is_optional,
         default=default,
-        factory=factory,
-        deserialise=_parse_datetime,
-        serialise=_serialise_datetime)
+        factory=factory)
 
 
 def int_field(*,
@@ -508,15 +693,12 @@ def decimal_field(*,
                   factory=MISSING,
                   default=MISSING):
 
-    def _deserialise_decimal(owning_cls, field, v):
-        if prec is not MISSING:
-            decimal_context = decimal.Context(prec=prec)
-        else:
-            decimal_context = decimal.Context()
-        return decimal.Decimal(v, context=decimal_context)
-
-    def _serialise_decimal(field, value, *, options: SerdeOptions):
-        return str(value)
+    if prec is not MISSING:
+        deserialise = functools.partial(_deserialise_decimal, prec)
+        metadata = {PREC: prec}
+    else:
+        deserialise = MISSING
+        metadata = None
 
     return _field(
         decimal.Decimal,
@@ -524,11 +706,96 @@ def decimal_field(*,
         is_optional=is_optional,
         default=default,
         factory=factory,
-        serialise=_serialise_decimal,
-        deserialise=_deserialise_decimal,
+        deserialise=deserialise,
+        metadata=metadata,
     )
 
 
+def _deserialise_decimal(prec, owning_cls, field, v):
+    if v is None:
+        return None
+    # The Decimal constructor is exact, whatever context it's given
+    return decimal.Context(prec=prec).create_decimal(v)
+
+
+def enum_field(enum_cls,
+               *,
+               by='value',
+               validator=MISSING,
+               is_optional=False,
+               default=MISSING,
+               factory=MISSING,
+               should_serialise=True):
+    """
+    A field holding a member of the Enum `enum_cls`, serialised as the
+    member's value, or with `by='name'` its name.
+
+    Serialised values are looked up in a dict built once per enum, so
+    decoding costs the same as a `string_field` with a `one_of` validator,
+    and each value decodes to the member singleton rather than to another
+    copy of the string.
+
+    Args:
+        enum_cls: The Enum class
+        by: 'value' or 'name'; what to serialise members as
+    """
+    if not (isinstance(enum_cls, type) and issubclass(enum_cls, enum.Enum)):
+        raise TypeError(f'{enum_cls!r} is not an Enum class')
+    codec = _enum_codec(enum_cls, by)
+    v = member_of(enum_cls)
+    if validator is not MISSING:
+        v = all_of(v, validator)
+    return _field(
+        enum_cls,
+        # member_of checks the type
+        instance_kind=None,
+        validator=v,
+        is_optional=is_optional,
+        default=default,
+        factory=factory,
+        should_serialise=should_serialise,
+        serialise=codec.serialise,
+        deserialise=codec.deserialise)
+
+
+def _enum_codec(enum_cls, by):
+    codec = _ENUM_CODECS.get((enum_cls, by))
+    if codec is None:
+        if by == 'value':
+            members = {m.value: m for m in enum_cls.__members__.values()}
+        elif by == 'name':
+            # Including aliases
+            members = dict(enum_cls.__members__)
+        else:
+            raise ValueError(f"by must be 'value' or 'name', not {by!r}")
+        wire = {m: getattr(m, by) for m in enum_cls}
+        codec = _ENUM_CODECS[(enum_cls, by)] = _EnumCodec(
+            enum_cls, members, wire)
+    return codec
+
+
+@attr.s(frozen=True, slots=True)
+class _EnumCodec:
+    cls = attr.ib()
+    # Serialised value -> member, and member -> serialised value
+    members = attr.ib(repr=False)
+    wire = attr.ib(repr=False)
+
+    def serialise(self, field, value, *, options: SerdeOptions):
+        if value is None:
+            return None
+        return self.wire[value]
+
+    def deserialise(self, owning_cls, field, value):
+        if value is None or value.__class__ is self.cls:
+            return value
+        try:
+            return self.members[value]
+        except (KeyError, TypeError):
+            raise ValueError(
+                f'{value!r} is not a valid {self.cls.__name__}') from None
+
+
 def bool_field(*,
                default=MISSING,
                validator=MISSING,
@@ -545,16 +812,121 @@ def bool_field(*,
 
 
 def bytes_field(*,
+                encoding='raw',
+                chunk_threshold=BYTES_CHUNK_THRESHOLD,
                 default=MISSING,
                 validator=MISSING,
                 factory=MISSING,
                 is_optional=False,
                 should_serialise=True):
+    """
+    A field holding binary data: `bytes`, or a `bytearray` or `memoryview`,
+    which is kept as it is rather than copied.
+
+    With `encoding='raw'`, values are serialised as they are. With
+    'base64', 'base85' or 'hex', they're serialised as a string in that
+    encoding. Values longer than `chunk_threshold` bytes are encoded and
+    decoded a chunk at a time, which bounds the intermediate copies. Encoded
+    values always decode to `bytes`, whatever their size.
+
+    Args:
+        encoding: 'raw', 'base64', 'base85' or 'hex'
+        chunk_threshold: Size in bytes above which to work in chunks
+    """
+    if encoding == 'raw':
+        serialise = deserialise = MISSING
+    else:
+        if encoding not in _BYTES_ENCODINGS:
+            raise ValueError(f'Unknown bytes encoding {encoding!r}')
+        codec = _bytes_codec(encoding, chunk_threshold)
+        serialise, deserialise = codec.serialise, codec.deserialise
     return _field(
         bytes,
+        instance_kind=_BYTES_TYPES,
         validator=validator,
         is_optional=is_optional,
         factory=factory,
         default=default,
         should_serialise=should_serialise,
+        serialise=serialise,
+        deserialise=deserialise,
     )
+
+
+def _b64encode(data):
+    return binascii.b2a_base64(data, newline=False).decode('ascii')
+
+
+def _b64decode(text):
+    return base64.b64decode(text, validate=True)
+
+
+def _b85encode(data):
+    return base64.b85encode(data).decode('ascii')
+
+
+def _hex_encode(data):
+    return data.hex()
+
+
+# Encoding -> (encode, decode, encoded characters per chunk, whether to
+# encode in chunks). hex() makes its string directly, so is best left to
+# encode in one go.
+_BYTES_ENCODINGS = {
+    'base64': (_b64encode, _b64decode, _BYTES_CHUNK_SIZE // 3 * 4, True),
+    'base85':
+    (_b85encode, base64.b85decode, _BYTES_CHUNK_SIZE // 4 * 5, True),
+    'hex': (_hex_encode, bytes.fromhex, _BYTES_CHUNK_SIZE * 2, False),
+}
+
+# (encoding, chunk_threshold) -> _BytesCodec
+_BYTES_CODECS = {}
+
+
+def _bytes_codec(encoding, chunk_threshold):
+    codec = _BYTES_CODECS.get((encoding, chunk_threshold))
+    if codec is None:
+        codec = _BYTES_CODECS[(encoding, chunk_threshold)] = _BytesCodec(
+            encoding, chunk_threshold, *_BYTES_ENCODINGS[encoding])
+    return codec
+
+
+@attr.s(frozen=True, slots=True)
+class _BytesCodec:
+    encoding = attr.ib()
+    chunk_threshold = attr.ib()
+    encode = attr.ib(repr=False)
+    decode = attr.ib(repr=False)
+    chunk_chars = attr.ib(repr=False)
+    encode_chunks = attr.ib(repr=False)
+
+    def serialise(self, field, value, *, options: SerdeOptions):
+        if value is None:
+            return None
+        # A flat view of the bytes, whatever the type, without copying them
+        data = memoryview(value).cast('B')
+        if data.nbytes <= self.chunk_threshold or not self.encode_chunks:
+            return self.encode(data)
+        return ''.join([
+            self.encode(data[i:i + _BYTES_CHUNK_SIZE])
+            for i in range(0, data.nbytes, _BYTES_CHUNK_SIZE)
+        ])
+
+    def deserialise(self, owning_cls, field, value):
+        if value is None or isinstance(value, _BYTES_TYPES):
+            return value
+        if not isinstance(value, str):
+            raise TypeError(
+                f'`{field.name}` must be a {self.encoding} string, it was '
+                f'{value!r}')
+        try:
+            step = self.chunk_chars
+            if len(value) <= step * self.chunk_threshold // _BYTES_CHUNK_SIZE:
+                return self.decode(value)
+            return b''.join([
+                self.decode(value[i:i + step])
+                for i in range(0, len(value), step)
+            ])
+        except (ValueError, binascii.Error) as exc:
+            raise ValueError(
+                f'`{field.name}` is not valid {self.encoding}: {exc}') from exc
@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+
+# Random bytes read from the OS at a time. Each ID takes 10-16 of them.
+ENTROPY_BLOCK_SIZE = 4096
+
+# Crockford's base 32, as used by ULIDs
+_ULID_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+# Every 10 bit value as two characters, so a ULID takes 13 lookups
+_ULID_PAIRS = [a + b for a in _ULID_ALPHABET for b in _ULID_ALPHABET]
+
+
+class _EntropyPool:
+    """
+    Hands out random bytes from blocks read with `os.urandom`, so making
+    many IDs costs one system call per block rather than one per ID.
+
+    The pool is emptied in the child after a fork, so parent and child
+    never hand out the same bytes.
+    """
+
+    def __init__(self, block_size=ENTROPY_BLOCK_SIZE):
+        self._block_size = block_size
+        self._lock = threading.Lock()
+        self._block = b''
+        self._pos = 0
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._discard)
+
+    def take(self, n) -> int:
+        """ Return `n` random bytes, as an unsigned integer """
+        with self._lock:
+            pos = self._pos
+            if pos + n > len(self._block):
+                self._block = os.urandom(max(n, self._block_size))
+                pos = 0
+            self._pos = pos + n
+            return int.from_bytes(self._block[pos:pos + n], 'big')
+
+    def _discard(self):
+        self._lock = threading.Lock()
+        self._block = b''
+        self._pos = 0
+
+
+_entropy = _EntropyPool()
+
+
+class _TimeOrdered:
+    """
+    Makes (milliseconds, random) pairs for time-ordered IDs. Within a
+    process, each pair sorts after the one before: if the clock hasn't
+    moved on (or has gone backwards), the previous random part is
+    incremented rather than drawing a new one.
+
+    Args:
+        random_bits: The size of the random part
+    """
+
+    def __init__(self, random_bits):
+        self._random_bits = random_bits
+        self._random_bytes = (random_bits + 7) // 8
+        self._lock = threading.Lock()
+        self._last = (0, 0)
+        if hasattr(os, 'register_at_fork'):
+            # Draw afresh, rather than counting on from where the parent
+            # (which carries on counting too) left off
+            os.register_at_fork(after_in_child=self._reset)
+
+    def next(self):
+        ms = time.time_ns() // 1000000
+        with self._lock:
+            last_ms, random = self._last
+            if ms > last_ms:
+                random = _entropy.take(self._random_bytes) >> (
+                    self._random_bytes * 8 - self._random_bits)
+            else:
+                ms = last_ms
+                random += 1
+                if random >> self._random_bits:
+                    # Out of room in this millisecond, so borrow the next
+                    ms += 1
+                    random = 0
+            self._last = (ms, random)
+        return ms, random
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        self._last = (0, 0)
+
+
+_uuid7_clock = _TimeOrdered(74)
+_ulid_clock = _TimeOrdered(80)
+
+
+def new_uuid4() -> str:
+    """ Return a random (version 4) UUID, as 32 hex digits """
+    n = _entropy.take(16)
+    # Set the version and variant bits
+    n = n & ~(0xf000 << 64) | (0x4000 << 64)
+    n = n & ~(0xc000 << 48) | (0x8000 << 48)
+    return f'{n:032x}'
+
+
+def new_uuid7() -> str:
+    """
+    Return a time-ordered (version 7) UUID, as 32 hex digits. The first 48
+    bits are the Unix time in milliseconds, so IDs made later sort later,
+    and are inserted next to each other at the end of an index rather than
+    scattered through it as random UUIDs are.
+    """
+    ms, random = _uuid7_clock.next()
+    rand_a, rand_b = random >> 62, random & ((1 << 62) - 1)
+    n = ms << 80 | 0x7 << 76 | rand_a << 64 | 0b10 << 62 | rand_b
+    return f'{n:032x}'
+
+
+def new_ulid() -> str:
+    """
+    Return a ULID: 26 characters of Crockford's base 32, encoding the Unix
+    time in milliseconds followed by 80 random bits. Like `new_uuid7`,
+    IDs made later sort later, as strings too.
+    """
+    ms, random = _ulid_clock.next()
+    # Shifting 40 bit halves is much quicker than shifting all 128 bits
+    hi, lo = random >> 40, random & 0xffffffffff
+    p = _ULID_PAIRS
+    return ''.join((
+        p[ms >> 40], p[ms >> 30 & 0x3ff], p[ms >> 20 & 0x3ff],
+        p[ms >> 10 & 0x3ff], p[ms & 0x3ff],
+        p[hi >> 30], p[hi >> 20 & 0x3ff], p[hi >> 10 & 0x3ff], p[hi & 0x3ff],
+        p[lo >> 30], p[lo >> 20 & 0x3ff], p[lo >> 10 & 0x3ff], p[lo & 0x3ff],
+    ))
@@ -0,0 +1,165 @@
+from .exceptions import DuplicateKeyError
+from .patch import evolve
+from .reflect import class_info, primary_key_for
+
+
+class IndexedCollection:
+    """
+    An in-memory collection of instances of one attrs class, with hash
+    indexes built from the field metadata set by `primary_key`, `key` and
+    `unique=True`:
+
+     - the primary key, and each unique field, map a value to the single
+       instance holding it. Adding a second instance with the same value
+       raises `DuplicateKeyError`.
+     - each other key field maps a value to all instances holding it.
+
+    None values are not indexed (and so never clash).
+
+        people = IndexedCollection(Person, rows)
+        people.get_by_pk('1234')
+        people.get_by('email', 'chris@example.com')
+        people.filter_by('company_id', 'abcd')
+
+    Args:
+        cls: The attrs class to hold. It must have a primary key.
+        instances: Optional instances to add
+    """
+
+    def __init__(self, cls, instances=()):
+        info = class_info(cls)
+        pk = primary_key_for(cls)
+        self.cls = cls
+        self._pk = pk.name
+        self._by_pk = {}
+        # Unique field name -> {value: instance}
+        self._unique = {
+            f.name: {}
+            for f in info.uniques if f is not pk
+        }
+        # Non-unique key field name -> {value: {pk: instance}}
+        self._keys = {
+            f.name: {}
+            for f in info.keys
+            if f is not pk and f.name not in self._unique
+        }
+        if instances:
+            self.extend(instances)
+
+    def __len__(self):
+        return len(self._by_pk)
+
+    def __iter__(self):
+        return iter(self._by_pk.values())
+
+    def get_by_pk(self, pk, default=None):
+        """ Return the instance with primary key `pk`, or `default` """
+        return self._by_pk.get(pk, default)
+
+    def get_by(self, field, value, default=None):
+        """
+        Return the instance whose primary key or unique `field` has `value`,
+        or `default`.
+        """
+        if field == self._pk:
+            return self._by_pk.get(value, default)
+        try:
+            index = self._unique[field]
+        except KeyError:
+            raise ValueError(
+                f'`{field}` is not a unique field of {self.cls}; use '
+                f'filter_by') from None
+        return index.get(value, default)
+
+    def filter_by(self, field, value):
+        """ Return a list of all instances whose key `field` has `value` """
+        if field == self._pk or field in self._unique:
+            found = self.get_by(field, value)
+            return [] if found is None else [found]
+        try:
+            index = self._keys[field]
+        except KeyError:
+            raise ValueError(
+                f'`{field}` is not a key field of {self.cls}') from None
+        return list(index.get(value, {}).values())
+
+    def add(self, instance):
+        """ Add one instance """
+        self.extend((instance, ))
+
+    def extend(self, instances):
+        """
+        Add many instances, building their index entries in a single pass.
+        Either all instances are added, or (if any would break uniqueness)
+        none are.
+        """
+        pk_name = self._pk
+        staged_pks = {}
+        staged_unique = {name: {} for name in self._unique}
+        for instance in instances:
+            if not isinstance(instance, self.cls):
+                raise TypeError(f'{instance!r} is not a {self.cls}')
+            pk = getattr(instance, pk_name)
+            if pk in self._by_pk or pk in staged_pks:
+                raise DuplicateKeyError(f'Duplicate primary key {pk!r}')
+            staged_pks[pk] = instance
+            for name, staged in staged_unique.items():
+                value = getattr(instance, name)
+                if value is None:
+                    continue
+                if value in self._unique[name] or value in staged:
+                    raise DuplicateKeyError(
+                        f'Duplicate value {value!r} for unique field '
+                        f'`{name}`')
+                staged[value] = instance
+
+        self._by_pk.update(staged_pks)
+        for name, staged in staged_unique.items():
+            self._unique[name].update(staged)
+        for name, index in self._keys.items():
+            for pk, instance in staged_pks.items():
+                value = getattr(instance, name)
+                if value is not None:
+                    index.setdefault(value, {})[pk] = instance
+
+    def remove(self, pk):
+        """ Remove and return the instance with primary key `pk` """
+        instance = self._by_pk.pop(pk)
+        self._unindex(pk, instance)
+        return instance
+
+    def update(self, pk, **changes):
+        """
+        Replace the instance with primary key `pk` with
+        `evolve(instance, **changes)`, keeping the indexes up to date,
+        and return the new instance. Uniqueness is checked before anything is
+        changed.
+        """
+        old = self._by_pk[pk]
+        new = evolve(old, **changes)
+        new_pk = getattr(new, self._pk)
+        if new_pk != pk and new_pk in self._by_pk:
+            raise DuplicateKeyError(f'Duplicate primary key {new_pk!r}')
+        for name, index in self._unique.items():
+            value = getattr(new, name)
+            if value is not None and index.get(value, old) is not old:
+                raise DuplicateKeyError(
+                    f'Duplicate value {value!r} for unique field `{name}`')
+
+        del self._by_pk[pk]
+        self._unindex(pk, old)
+        self.extend((new, ))
+        return new
+
+    def _unindex(self, pk, instance):
+        for name, index in self._unique.items():
+            value = getattr(instance, name)
+            if value is not None:
+                del index[value]
+        for name, index in self._keys.items():
+            value = getattr(instance, name)
+            if value is not None:
+                bucket = index[value]
+                del bucket[pk]
+                if not bucket:
+                    del index[value]
@@ -0,0 +1,146 @@
+import collections
+import contextlib
+import contextvars
+import datetime
+import decimal
+import threading
+
+import attr
+
+from .reflect import is_frozen
+
+DEFAULT_MAXSIZE = 65536
+
+# Marks the key of an (already interned) attrs instance
+_INSTANCE = object()
+
+# The table in force for the current context, if any. `from_dict` checks
+# this.
+_current_table = contextvars.ContextVar('attrkid_intern_table', default=None)
+
+
+class InternTable:
+    """
+    A bounded table mapping the content of decoded data to the frozen
+    instance it produced, so that identical data decodes to the same
+    instance. Least recently used entries are evicted first.
+
+    Create one per batch, or keep one around to share instances across
+    batches.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise ValueError('maxsize must be a positive int')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._frozen = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def intern(self, cls, kw, construct):
+        """
+        Return the instance of `cls` with the field values in `kw`, calling
+        `construct(cls, kw)` only if identical values haven't been seen.
+        Classes which aren't frozen, and values which can't be hashed, are
+        always constructed.
+
+        This is called once nested instances have been interned, so
+        identical children are already the same instance, and are keyed by
+        identity: the cost of a key doesn't depend on how deeply the
+        instance nests.
+        """
+        frozen = self._frozen.get(cls)
+        if frozen is None:
+            frozen = self._frozen[cls] = is_frozen(cls)
+        if not frozen:
+            return construct(cls, kw)
+
+        # Every field is in `kw`, always in the same order
+        try:
+            key = (cls, tuple([_value_key(value) for value in kw.values()]))
+            with self._lock:
+                instance = self._entries.get(key)
+                if instance is not None:
+                    self.hits += 1
+                    self._entries.move_to_end(key)
+                    return instance
+                self.misses += 1
+        except TypeError:
+            # Unhashable
+            return construct(cls, kw)
+
+        instance = construct(cls, kw)
+        with self._lock:
+            # Another thread may have got here first; keep its instance
+            instance = self._entries.setdefault(key, instance)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return instance
+
+
+@contextlib.contextmanager
+def interning(table=None):
+    """
+    Context manager which makes `from_dict` intern instances of frozen
+    attrs classes by content: within the block, identical data for a
+    frozen class decodes to the same instance.
+
+        with interning():
+            orders = [from_dict(Order, d) for d in batch]
+
+    Args:
+        table: The `InternTable` to use. If not given, a new table is used
+            for just this block.
+
+    Returns:
+        The `InternTable` in use
+    """
+    if table is None:
+        table = InternTable()
+    token = _current_table.set(table)
+    try:
+        yield table
+    finally:
+        _current_table.reset(token)
+
+
+def _value_key(value):
+    """
+    Return a hashable key for a decoded field value. attrs instances are
+    keyed by identity, as they've been interned already; an entry's
+    instance holds on to them, so their ids can't be reused while the key
+    is in the table. Scalar types are part of the key, so that eg. `1`,
+    `1.0` and `True` don't share an instance.
+
+    Values which compare equal but serialise differently get different
+    keys: `Decimal('1.0')` and `Decimal('1.00')`, `0.0` and `-0.0`, and
+    the same instant in different timezones.
+    """
+    if attr.has(value.__class__):
+        return _INSTANCE, id(value)
+    if isinstance(value, dict):
+        return dict, frozenset([(k, _value_key(v)) for k, v in value.items()])
+    if isinstance(value, (list, tuple)):
+        return value.__class__, tuple([_value_key(v) for v in value])
+    if isinstance(value, (set, frozenset)):
+        return value.__class__, frozenset([_value_key(v) for v in value])
+    if value.__class__ is str:
+        return value
+    if isinstance(value, float):
+        return value.__class__, repr(value)
+    if isinstance(value, decimal.Decimal):
+        return value.__class__, value.as_tuple()
+    if isinstance(value, (datetime.datetime, datetime.time)):
+        return value.__class__, value, value.tzinfo
+    return value.__class__, value
@@ -0,0 +1,137 @@
+import contextvars
+import json
+
+import attr
+
+# The backend used unless SerdeOptions (or `set_default_backend`) say
+# otherwise
+DEFAULT_BACKEND = 'json'
+
+
+@attr.s(frozen=True, slots=True)
+class JSONBackend:
+    """
+    A JSON library, as attrkid uses it. `dumps(obj)` returns compact JSON
+    as a str, and `loads(data)` accepts a str or UTF-8 bytes and raises a
+    ValueError for invalid JSON.
+
+    `name` is the library actually in use, which is 'json' if the one asked
+    for isn't installed.
+    """
+    name = attr.ib()
+    dumps = attr.ib()
+    loads = attr.ib()
+
+
+def _load_json():
+    return JSONBackend(
+        name='json',
+        dumps=json.JSONEncoder(
+            ensure_ascii=False, separators=(',', ':')).encode,
+        loads=json.loads)
+
+
+def _load_orjson():
+    import orjson
+
+    def default(obj):
+        # orjson only writes exact tuples as arrays, not subclasses such as
+        # memo's FrozenList
+        if isinstance(obj, tuple):
+            return list(obj)
+        raise TypeError(f'Type is not JSON serializable: {type(obj)}')
+
+    def dumps(obj):
+        return orjson.dumps(obj, default=default).decode('utf-8')
+
+    return JSONBackend(name='orjson', dumps=dumps, loads=orjson.loads)
+
+
+def _load_ujson():
+    import ujson
+
+    def dumps(obj):
+        return ujson.dumps(
+            obj, ensure_ascii=False, escape_forward_slashes=False)
+
+    return JSONBackend(name='ujson', dumps=dumps, loads=ujson.loads)
+
+
+def _load_simplejson():
+    import simplejson
+
+    encoder = simplejson.JSONEncoder(
+        ensure_ascii=False, separators=(',', ':'))
+    return JSONBackend(
+        name='simplejson', dumps=encoder.encode, loads=simplejson.loads)
+
+
+_LOADERS = {
+    'json': _load_json,
+    'orjson': _load_orjson,
+    'ujson': _load_ujson,
+    'simplejson': _load_simplejson,
+}
+
+BACKEND_NAMES = tuple(_LOADERS)
+
+# Name -> JSONBackend, filled in as backends are asked for
+_loaded = {}
+_default = DEFAULT_BACKEND
+
+# The backend from_dict is decoding with, if SerdeOptions chose one
+_current_backend = contextvars.ContextVar('attrkid_json', default=None)
+
+
+def get_backend(name=None) -> JSONBackend:
+    """
+    Return the `JSONBackend` called `name` (one of `BACKEND_NAMES`), or the
+    default backend if `name` is None. If the library isn't installed, the
+    standard library's `json` is used instead.
+    """
+    if name is None:
+        name = _default
+    try:
+        return _loaded[name]
+    except KeyError:
+        pass
+    try:
+        loader = _LOADERS[name]
+    except KeyError:
+        raise ValueError(f'Unknown JSON backend {name!r}, expected one of '
+                         f'{", ".join(BACKEND_NAMES)}') from None
+    try:
+        backend = loader()
+    except ImportError:
+        backend = get_backend('json')
+    _loaded[name] = backend
+    return backend
+
+
+def set_default_backend(name):
+    """
+    Use the backend called `name` wherever SerdeOptions don't choose one.
+    """
+    global _default
+    # Check the name now, rather than on first use
+    get_backend(name)
+    _default = name
+
+
+def dumps(obj, *, options=None) -> str:
+    """ Encode `obj` as JSON with the backend `options` choose """
+    name = options.json_backend if options is not None else None
+    return get_backend(name).dumps(obj)
+
+
+def loads(data, *, options=None):
+    """
+    Decode JSON `data` (str or bytes) with the backend `options` choose, or
+    else the one the `from_dict` call in progress is using.
+    """
+    name = options.json_backend if options is not None else None
+    if name is None:
+        backend = _current_backend.get()
+        if backend is not None:
+            return backend.loads(data)
+    return get_backend(name).loads(data)
@@ -5,6 +5,17 @@ from typing import Union
 import attr
 import functools
 
+from .constants import (
+    IS_ONLY_FIELD,
+    IS_OPTIONAL,
+    REF_ID,
+    SHOULD_SERIALISE,
+    TYPE,
+)
+
+# How many distinct key sets an untagged union remembers the kind for
+_MAX_CACHED_KEY_SETS = 1024
+
 
 class ProxyKind(metaclass=abc.ABCMeta):
 
@@ -44,13 +55,64 @@ class ImmediateKind(ProxyKind):
         return self.kind,
 
 
-@attr.s(init=False)
+# Hashable so that it can be carried by SerdeOptions, which are used as keys.
+@attr.s(init=False, hash=True)
 class UnionKind(ProxyKind):
+    """
+    One of several kinds, told apart by a selector name. By default values
+    are tagged externally, wrapped in a dict keyed by the selector:
+
+        {'and': {'items': [...]}}
+
+    With `tag`, they're tagged internally instead, with the selector held
+    in the value's own dict under the key `tag`:
+
+        UnionKind(('and', And), ('not', Not), tag='type')
+
+        {'type': 'and', 'items': [...]}
+
+    The tag key must not clash with a field name of any of the kinds; a
+    kind with a field of that name raises a `TypeError`.
+
+    With `untagged=True`, values are written as they are, and the kind to
+    decode is picked by matching the keys of the value's dict against each
+    kind's fields: those it requires (fields with no default which aren't
+    optional) and those it allows. A value matching no kind, or more than
+    one, can't be decoded. Kinds with an `is_only_field` can't be used, as
+    they don't serialise to a dict of fields.
+    """
     # This should be a tuple of name/type pairs
     kinds = attr.ib(validator=attr.validators.instance_of(tuple))
-
-    def __init__(self, *kinds):
+    tag = attr.ib(default=None)
+    untagged = attr.ib(default=False)
+    # Selector -> kind, and kind -> selector. These are built on first use,
+    # as some kinds may be deferred.
+    _by_selector = attr.ib(default=None, cmp=False, repr=False)
+    _by_kind = attr.ib(default=None, cmp=False, repr=False)
+    # For untagged unions, (name, kind, required keys, allowed keys) for
+    # each kind, and the kinds already matched to key sets
+    _signatures = attr.ib(default=None, cmp=False, repr=False)
+    _by_keys = attr.ib(default=None, cmp=False, repr=False)
+
+    def __init__(self, *kinds, tag=None, untagged=False):
+        if tag is not None and not isinstance(tag, str):
+            raise TypeError('tag must be a str')
+        if tag is not None and untagged:
+            raise TypeError('An untagged union cannot have a tag')
         self.kinds = kinds
+        self.tag = tag
+        self.untagged = untagged
+        # Reject kinds that can't be told apart by their keys, or whose
+        # fields clash with the tag, now if we have them; deferred kinds are
+        # checked on first use
+        for name, k in kinds:
+            if isinstance(k, type):
+                if untagged:
+                    _signature(name, k)
+                elif tag is not None:
+                    _check_tag(tag, k)
+        self._by_selector = self._by_kind = None
+        self._signatures = self._by_keys = None
 
     def get(self):
         return tuple([kind for name, kind in self.kinds])
@@ -61,17 +123,92 @@ class UnionKind(ProxyKind):
                 k, = k.get()
             yield name, k
 
-    def selector_for(self, kind):
+    def _resolve(self):
+        by_selector = {}
+        by_kind = {}
         for name, k in self._concrete_kinds():
-            if k == kind:
-                return name
-        raise ValueError(kind)
+            if self.tag is not None:
+                _check_tag(self.tag, k)
+            # The first match wins, as it always has
+            by_selector.setdefault(name, k)
+            by_kind.setdefault(k, name)
+        self._by_selector, self._by_kind = by_selector, by_kind
+
+    def selector_for(self, kind):
+        if self._by_kind is None:
+            self._resolve()
+        try:
+            return self._by_kind[kind]
+        except KeyError:
+            raise ValueError(kind) from None
 
     def kind_for(self, selector):
-        for name, k in self._concrete_kinds():
-            if name == selector:
-                return k
-        raise ValueError(selector)
+        if self._by_selector is None:
+            self._resolve()
+        try:
+            return self._by_selector[selector]
+        except (KeyError, TypeError):
+            raise ValueError(selector) from None
+
+    def kind_for_keys(self, keys):
+        """
+        For untagged unions, return the kind whose fields match `keys`, the
+        keys of a value's dict.
+        """
+        if not isinstance(keys, frozenset):
+            keys = frozenset(keys)
+        if self._signatures is None:
+            self._signatures = [
+                _signature(name, k) for name, k in self._concrete_kinds()
+            ]
+            self._by_keys = {}
+
+        kind = self._by_keys.get(keys)
+        if kind is None:
+            matches = [(name, k)
+                       for name, k, required, allowed in self._signatures
+                       if required <= keys <= allowed]
+            if not matches:
+                raise ValueError(
+                    f'No kind in the union has fields matching the keys '
+                    f'{sorted(keys)}')
+            if len(matches) > 1:
+                names = ', '.join([name for name, k in matches])
+                raise ValueError(
+                    f'Ambiguous untagged union value: the keys '
+                    f'{sorted(keys)} match each of {names}')
+            kind = matches[0][1]
+            if len(self._by_keys) < _MAX_CACHED_KEY_SETS:
+                self._by_keys[keys] = kind
+        return kind
+
+
+def _serialised_fields(kind):
+    return [
+        f for f in attr.fields(kind) if f.metadata.get(SHOULD_SERIALISE, True)
+    ]
+
+
+def _check_tag(tag, kind):
+    if attr.has(kind) and any(f.name == tag
+                              for f in _serialised_fields(kind)):
+        raise TypeError(f'{kind} has a field named {tag!r}, which clashes '
+                        f'with the union\'s tag')
+
+
+def _signature(name, kind):
+    fields = _serialised_fields(kind)
+    if any(f.metadata.get(IS_ONLY_FIELD, False) for f in fields):
+        raise TypeError(f'{kind} has an is_only_field, so it cannot be part '
+                        f'of an untagged union')
+    required = frozenset([
+        f.name for f in fields
+        if f.default is attr.NOTHING and not f.metadata.get(IS_OPTIONAL, False)
+        # Untyped fields happily take None
+        and (f.metadata.get(TYPE) or (None, ))[0] is not None
+    ])
+    allowed = frozenset([f.name for f in fields])
+    return name, kind, required, allowed
 
 
 PROXY_KINDS = (DeferredKind, ImmediateKind, UnionKind)
@@ -147,7 +284,39 @@ def union_parts(union: UnionKind, value: dict):
         a 2-tuple of (type, data)
 
     """
-    selector, sub_value = list(value.items())[0]
-    final_kind = union.kind_for(selector)
-    value = sub_value
-    return final_kind, value
+    if union.untagged:
+        keys = frozenset(value)
+        if REF_ID in keys:
+            keys = keys - {REF_ID}
+        return union.kind_for_keys(keys), value
+
+    if union.tag is not None:
+        # The value is the data, with the selector inside it
+        try:
+            selector = value[union.tag]
+        except KeyError:
+            raise ValueError(
+                f'Union value is missing its {union.tag!r} tag') from None
+        return union.kind_for(selector), value
+
+    if not isinstance(value, dict) or len(value) != 1:
+        raise ValueError(
+            f'Union value must be a dict with exactly one key, the '
+            f'selector: got {value!r}')
+    (selector, sub_value), = value.items()
+    return union.kind_for(selector), sub_value
+
+
+def union_value(union: UnionKind, selector, value):
+    """
+    The inverse of `union_parts`: return already-serialised `value` tagged
+    with `selector` as `union` expects. Internally tagged unions need
+    `value` to be a dict, to hold the tag.
+    """
+    if union.untagged:
+        return value
+    if union.tag is None:
+        return {selector: value}
+    if not isinstance(value, dict):
+        raise TypeError(f'Cannot add a {union.tag!r} tag to {value!r}')
+    return {union.tag: selector, **value}
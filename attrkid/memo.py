@@ -0,0 +1,191 @@
+import collections
+import threading
+import weakref
+
+from .constants import MISSING
+from .reflect import is_frozen
+
+COPY = 'copy'
+READ_ONLY = 'read_only'
+MODES = (COPY, READ_ONLY)
+
+DEFAULT_MAXSIZE = 1024
+
+# Memoised classes, mapped to their caches. `to_dict` looks classes up here.
+_MEMOISED = {}
+
+CacheInfo = collections.namedtuple('CacheInfo',
+                                   ['hits', 'misses', 'size', 'maxsize'])
+
+
+def memoise(cls=None, *, maxsize=DEFAULT_MAXSIZE, mode=COPY):
+    """
+    Class decorator that makes `to_dict` cache the serialised form of
+    instances of a frozen attrs class, per instance and `SerdeOptions`:
+
+        @memoise(maxsize=100)
+        @attr.s(frozen=True)
+        class Config:
+            ...
+
+    Instances are cached by identity, and dropped when they are garbage
+    collected or when more than `maxsize` instances are cached (least
+    recently used first). Memoised children are cached in the same way, so
+    a parent's serialised form reuses theirs.
+
+    Cached values must not be changed, so `mode` controls what callers get
+    back:
+
+     - `COPY` (the default) returns a fresh copy of the cached dicts and
+       lists on every call.
+     - `READ_ONLY` returns the cached value itself, with dicts that raise
+       `TypeError` if changed and `FrozenList` tuples in place of lists.
+       This avoids the copy, and lets parents share their children's
+       serialised form.
+
+    Note that only the instance is checked for immutability: a frozen
+    instance holding a list that is later changed will serialise stale
+    data.
+
+    Args:
+        cls: The class to memoise
+        maxsize: The maximum number of instances to cache
+        mode: `COPY` or `READ_ONLY`
+
+    Returns:
+        The class
+    """
+    if mode not in MODES:
+        raise ValueError(f'mode must be one of {MODES}')
+    if not isinstance(maxsize, int) or maxsize < 1:
+        raise ValueError('maxsize must be a positive int')
+
+    def _memoise(cls):
+        if not is_frozen(cls):
+            raise TypeError(f'{cls} must be a frozen attrs class')
+        _MEMOISED[cls] = _Cache(maxsize, mode)
+        return cls
+
+    if cls is None:
+        return _memoise
+    return _memoise(cls)
+
+
+def unmemoise(cls):
+    """ Stop caching the serialised form of `cls` instances """
+    _MEMOISED.pop(cls, None)
+
+
+def cache_info(cls) -> CacheInfo:
+    """ Return hit, miss and size statistics for a memoised class """
+    cache = _MEMOISED[cls]
+    return CacheInfo(cache.hits, cache.misses, len(cache.entries),
+                     cache.maxsize)
+
+
+def clear(cls=None):
+    """ Empty the cache for `cls`, or for every memoised class """
+    caches = _MEMOISED.values() if cls is None else [_MEMOISED[cls]]
+    for cache in caches:
+        cache.clear()
+
+
+class _Cache:
+
+    def __init__(self, maxsize, mode):
+        self.maxsize = maxsize
+        self.mode = mode
+        # id(instance) -> (reference to instance, {options: result})
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, instance, options):
+        """ Return the cached result for `instance`, or MISSING """
+        key = id(instance)
+        entry = self.entries.get(key)
+        if entry is not None and entry[0]() is instance:
+            result = entry[1].get(options, MISSING)
+            if result is not MISSING:
+                self.hits += 1
+                with self._lock:
+                    if key in self.entries:
+                        self.entries.move_to_end(key)
+                return result if self.mode == READ_ONLY else _copy(result)
+        self.misses += 1
+        return MISSING
+
+    def store(self, instance, options, result):
+        """
+        Cache a freshly serialised `result`, and return it as `lookup`
+        would
+        """
+        key = id(instance)
+        result = _freeze(result)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0]() is not instance:
+                entry = (_reference(instance, key, self._discard), {})
+                self.entries[key] = entry
+            entry[1][options] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+        return result if self.mode == READ_ONLY else _copy(result)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def _discard(self, key, ref):
+        # Called when a cached instance is garbage collected. Its id may
+        # already have been reused, so only remove our own entry.
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] is ref:
+                del self.entries[key]
+
+
+def _reference(instance, key, callback):
+    try:
+        return weakref.ref(instance, lambda ref: callback(key, ref))
+    except TypeError:
+        # Slotted classes without a __weakref__ slot. We have to hold on to
+        # these until they're evicted.
+        return lambda: instance
+
+
+class FrozenDict(dict):
+    """ A dict that can't be changed. Returned by `READ_ONLY` caches. """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError('Cached serialised data cannot be changed')
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return FrozenDict, (dict(self), )
+
+
+class FrozenList(tuple):
+    """ Stands in for lists in `READ_ONLY` cached data """
+
+
+def _freeze(value):
+    if type(value) is dict:
+        return FrozenDict((k, _freeze(v)) for k, v in value.items())
+    if type(value) is list:
+        return FrozenList([_freeze(v) for v in value])
+    return value
+
+
+def _copy(value):
+    if type(value) is FrozenDict:
+        return {k: _copy(v) for k, v in value.items()}
+    if type(value) is FrozenList:
+        return [_copy(v) for v in value]
+    return value
@@ -1,6 +1,8 @@
 import attr
-from attr.validators import instance_of, optional
+from attr.validators import in_, instance_of, optional
 
+from .codec import CodecRegistry
+from .jsonlib import BACKEND_NAMES
 from .kind import UnionKind
 
 DEFAULT_DATETIME_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
@@ -24,5 +26,21 @@ class SerdeOptions:
     datetime_format = attr.ib(
         validator=instance_of(str), default=DEFAULT_DATETIME_FORMAT)
 
+    # Should instances referenced from more than one place be written out
+    # once, and referred to elsewhere? See `to_dict`.
+    share_references = attr.ib(validator=instance_of(bool), default=False)
+
+    # Where to find the codecs for values of types that aren't serialised
+    # as they are (see `attrkid.codec`), or None for the global `CODECS`.
+    # `from_dict` decodes with them too.
+    codecs = attr.ib(
+        validator=optional(instance_of(CodecRegistry)), default=None)
+
+    # The JSON library (see `attrkid.jsonlib`) used by `to_json` and
+    # `from_json`, and to decode fields given as JSON strings, or None for
+    # the default.
+    json_backend = attr.ib(
+        validator=optional(in_(BACKEND_NAMES)), default=None)
+
     # The UnionKind in force, if any
     union = attr.ib(validator=optional(instance_of(UnionKind)), default=None)
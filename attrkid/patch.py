@@ -0,0 +1,408 @@
+import threading
+
+import attr
+
+from .constants import SERIALISE
+from .exceptions import ValidationError
+from .fields import _serialise_value
+from .kind import union_parts
+from .options import SerdeOptions
+from .reflect import class_info
+from .serde import (
+    _DEFAULT_OPTIONS,
+    _do_deserialise,
+    _do_serialise,
+    _field_default,
+)
+
+# Returned internally when there's no difference to report
+_UNCHANGED = object()
+
+# Class -> dict of `__init__` argument name -> field name, for `evolve`
+_INIT_NAMES = {}
+
+# Collections that can't change once made, so that once their items have
+# passed a field's validator they needn't be checked again
+_FROZEN_COLLECTIONS = frozenset((tuple, frozenset))
+
+# attrs' slot for the hash of `cache_hash=True` classes, which `__init__`
+# clears
+_HASH_CACHE = '_attrs_cached_hash'
+
+# (field, id(value)) -> value, for frozen collections whose items have
+# passed the field's validator. The value is held so that its id can't be
+# reused by another while it's remembered, so the items held are bounded
+# in total, oldest forgotten first. Collections too small to be worth it
+# aren't remembered.
+_validated = {}
+_validated_items = 0
+_validated_lock = threading.Lock()
+_MIN_VALIDATED_ITEMS = 32
+_MAX_VALIDATED_ITEMS = 100000
+
+
+def to_dict_diff(old, new, *, options: SerdeOptions = None):
+    """
+    Return a JSON Merge Patch (RFC 7396) which turns `to_dict(old)` into
+    `to_dict(new)`. An empty dict means there are no changes.
+
+    Only fields whose values differ are visited: values which are the same
+    object in both instances are skipped without being looked at, and
+    nested attrs instances of the same class are diffed field by field.
+    Everything else that has changed (eg. collections) is replaced
+    wholesale, as Merge Patch has no way to describe changes inside a list.
+
+    Union fields whose variant has changed remove the old selector and add
+    the new one. Classes with an `is_only_field` are diffed as their only
+    field, to match `to_dict`.
+
+    Note that Merge Patch uses null to mean "remove this key", so a field
+    which becomes None is removed rather than set to null, even with
+    `omit_null_values=False`.
+
+    Args:
+        old: The original instance
+        new: The updated instance, of the same class as `old`
+        options: A SerdeOptions instance to control serialisation
+
+    Returns:
+        The patch
+    """
+    if type(old) is not type(new):
+        raise TypeError(
+            f'Cannot diff a {type(old)} against a {type(new)}')
+    if options is None:
+        options = _DEFAULT_OPTIONS
+    patch = _diff_instance(old, new, options)
+    return {} if patch is _UNCHANGED else patch
+
+
+def _diff_instance(old, new, options):
+    if old is new:
+        return _UNCHANGED
+
+    # Externally tagged union values wrap their patch in the selector.
+    # Internally tagged ones don't need to, as the tag hasn't changed, and
+    # untagged ones can't.
+    union = options.union
+    selector = None
+    if union is not None and union.tag is None and not union.untagged:
+        selector = union.selector_for(type(new))
+
+    info = class_info(type(new))
+    patch = {}
+    for field in info.serialisable:
+        mu = info.unions[field.name]
+        if mu != options.union:
+            options = attr.evolve(options, union=mu)
+
+        old_value = getattr(old, field.name)
+        new_value = getattr(new, field.name)
+        if field is info.only_field:
+            # The whole instance serialises as this field's value, so its
+            # diff is the diff of that value.
+            sub_patch = _diff_value(field, old_value, new_value, options)
+            if sub_patch is _UNCHANGED:
+                return _UNCHANGED
+            return {selector: sub_patch} if selector else sub_patch
+
+        sub_patch = _diff_value(field, old_value, new_value, options)
+        if sub_patch is not _UNCHANGED:
+            patch[field.name] = sub_patch
+
+    if not patch:
+        return _UNCHANGED
+    return {selector: patch} if selector else patch
+
+
+def _has_serialiser(field):
+    """ Whether `field` serialises its values with a function of its own """
+    # Rather than leaving them to to_dict, or the codec registry
+    serialise = field.metadata.get(SERIALISE)
+    return serialise is not None and serialise is not _serialise_value
+
+
+def _diff_value(field, old, new, options):
+    if old is new:
+        return _UNCHANGED
+    if new is None:
+        return None
+
+    if (old is not None and attr.has(type(new))
+            and not _has_serialiser(field)):
+        if type(old) is type(new):
+            return _diff_instance(old, new, options)
+        union = options.union
+        if union is not None and union.tag is None and not union.untagged:
+            # The union variant has changed. Drop the old selector and
+            # send the new value in full. (Other unions are diffed in
+            # serialised form, below.)
+            patch = {options.union.selector_for(type(old)): None}
+            patch.update(_do_serialise(field, new, options=options))
+            return patch
+
+    if type(old) is type(new) and old == new:
+        return _UNCHANGED
+    return _diff_serialised(
+        None if old is None else _do_serialise(field, old, options=options),
+        _do_serialise(field, new, options=options))
+
+
+def _diff_serialised(old, new):
+    """ Merge Patch between two already-serialised values """
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return _UNCHANGED if old == new else new
+
+    patch = {}
+    for k in old.keys() - new.keys():
+        patch[k] = None
+    for k, v in new.items():
+        if k in old:
+            sub_patch = _diff_serialised(old[k], v)
+            if sub_patch is not _UNCHANGED:
+                patch[k] = sub_patch
+        else:
+            patch[k] = v
+    return patch or _UNCHANGED
+
+
+def apply_patch(instance, patch):
+    """
+    Apply a JSON Merge Patch, as produced by `to_dict_diff`, to `instance`.
+
+    This returns a new instance equivalent to
+    `from_dict(type(instance), merge(to_dict(instance), patch))`, but only
+    the parts of the model named in the patch are decoded. Nested instances
+    the patch doesn't touch are reused as they are, and new parents are
+    created only along the path to each change. Only the validators of
+    fields that have changed are run; the rest were validated when
+    `instance` was built.
+
+    Args:
+        instance: The attrs instance to patch
+        patch: The Merge Patch to apply
+
+    Returns:
+        The patched instance
+    """
+    return _apply_instance(instance, patch)
+
+
+def _apply_instance(instance, patch):
+    cls = type(instance)
+    info = class_info(cls)
+    changes = {}
+    for field in info.serialisable:
+        if field is info.only_field:
+            changes[field.name] = _apply_value(
+                cls, field, getattr(instance, field.name), patch)
+            break
+        if not isinstance(patch, dict):
+            raise TypeError(f'Cannot patch a {cls} with {patch!r}')
+        sub_patch = patch.get(field.name, _UNCHANGED)
+        if sub_patch is not _UNCHANGED:
+            changes[field.name] = _apply_value(
+                cls, field, getattr(instance, field.name), sub_patch)
+
+    if not changes:
+        return instance
+    return _evolve(instance, changes)
+
+
+def _apply_value(owning_cls, field, old, patch):
+    try:
+        if patch is None:
+            # Same as the field being missing from the data
+            return _field_default(field)
+
+        if old is not None and attr.has(type(old)) and isinstance(
+                patch, dict) and not _has_serialiser(field):
+            union = class_info(owning_cls).unions[field.name]
+            if union is None:
+                return _apply_instance(old, patch)
+            if union.tag is not None or union.untagged:
+                serialised = _do_serialise(
+                    field,
+                    old,
+                    options=attr.evolve(_DEFAULT_OPTIONS, union=union))
+                merged = _merge(serialised, patch)
+                kind, _ = union_parts(union, merged)
+                if kind is type(old):
+                    return _apply_instance(old, patch)
+                # The variant has changed, so decode the new one in full
+                return _do_deserialise(owning_cls, field, merged)
+
+            selector = union.selector_for(type(old))
+            live = [k for k, v in patch.items() if v is not None]
+            if live == [selector]:
+                return _apply_instance(old, patch[selector])
+            # The variant has changed, so decode the new one in full
+            patch = {k: patch[k] for k in live}
+
+        elif isinstance(patch, dict) and old is not None:
+            # Merge into the existing serialised value
+            serialised = _do_serialise(field, old, options=_DEFAULT_OPTIONS)
+            if isinstance(serialised, dict):
+                patch = _merge(serialised, patch)
+
+        return _do_deserialise(owning_cls, field, patch)
+    except ValidationError:
+        raise
+    except Exception as exc:
+        raise ValidationError(
+            errors=[{
+                'field': field,
+                'exc': exc
+            }], exc=exc) from exc
+
+
+def _merge(target, patch):
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for k, v in patch.items():
+        if v is None:
+            result.pop(k, None)
+        else:
+            result[k] = _merge(result.get(k), v)
+    return result
+
+
+def evolve(instance, **changes):
+    """
+    Like `attr.evolve`, but only the validators (and converters) of the
+    fields being changed are run; the other values are reused as they are,
+    having been validated when `instance` was built:
+
+        order = evolve(order, status=Status.PAID)
+
+    Large frozen collections (tuples and frozensets) which have passed a
+    field's validator are remembered by identity, so passing the same one
+    again, to any instance, doesn't check each item again. The items held
+    this way are bounded in total. Lists aren't remembered, as they could
+    have changed since.
+
+    Raises a `TypeError` for arguments that aren't fields of the class,
+    and whatever a validator raises for an invalid value.
+    """
+    cls = type(instance)
+    names = _init_names(cls)
+    by_field = {}
+    for name, value in changes.items():
+        field_name = names.get(name)
+        if field_name is None:
+            raise TypeError(f'{cls.__qualname__} has no field {name!r}')
+        by_field[field_name] = value
+    return _evolve(instance, by_field, wrap_errors=False)
+
+
+def _init_names(cls):
+    """ Return a dict of `__init__` argument name -> field name """
+    names = _INIT_NAMES.get(cls)
+    if names is None:
+        # attrs strips the underscore from private attributes
+        names = _INIT_NAMES[cls] = {
+            f.name.lstrip('_'): f.name
+            for f in class_info(cls).fields if f.init
+        }
+    return names
+
+
+def _evolve(instance, changes, *, wrap_errors=True):
+    """
+    Return a copy of `instance` with `changes` (a dict of field name ->
+    value), only running the converters and validators of the fields being
+    changed. With `wrap_errors`, validation errors are raised as
+    `ValidationError`s.
+
+    The copy is made without calling `__init__`, so this does what it
+    would otherwise have done: fields with `init=False` get their defaults
+    again (and are validated), and a `cache_hash=True` class's cached hash
+    is cleared.
+    """
+    cls = type(instance)
+    fields = class_info(cls).fields
+    new = cls.__new__(cls)
+    pre_init = getattr(cls, '__attrs_pre_init__', None)
+    if pre_init is not None:
+        pre_init(new)
+    if hasattr(instance, _HASH_CACHE):
+        object.__setattr__(new, _HASH_CACHE, None)
+
+    check = []
+    for f in fields:
+        if not f.init:
+            # As attrs' __init__ would, after the fields it's passed
+            continue
+        if f.name in changes:
+            value = changes[f.name]
+            if f.converter is not None:
+                value = f.converter(value)
+            if value is not getattr(instance, f.name):
+                check.append((f, value))
+        else:
+            value = getattr(instance, f.name)
+        # This gets us past frozen classes
+        object.__setattr__(new, f.name, value)
+    for f in fields:
+        if not f.init and f.default is not attr.NOTHING:
+            value = f.default
+            if isinstance(value, attr.Factory):
+                value = (value.factory(new)
+                         if value.takes_self else value.factory())
+            if f.converter is not None:
+                value = f.converter(value)
+            object.__setattr__(new, f.name, value)
+            check.append((f, value))
+
+    for f, value in check:
+        if f.validator is None:
+            continue
+        try:
+            _validate(new, f, value)
+        except Exception as exc:
+            if not wrap_errors:
+                raise
+            raise ValidationError(
+                errors=[{
+                    'field': f,
+                    'exc': exc
+                }], exc=exc) from exc
+
+    post_init = getattr(cls, '__attrs_post_init__', None)
+    if post_init is not None:
+        post_init(new)
+    return new
+
+
+def _validate(instance, field, value):
+    without_items = getattr(field.validator, 'without_items', None)
+    if without_items is None or value.__class__ not in _FROZEN_COLLECTIONS:
+        field.validator(instance, field, value)
+        return
+
+    key = (field, id(value))
+    with _validated_lock:
+        known = _validated.get(key) is value
+    if known:
+        without_items(instance, field, value)
+        return
+    field.validator(instance, field, value)
+    _remember(key, value)
+
+
+def _remember(key, value):
+    """ Remember that frozen collection `value` passed a field's validator """
+    global _validated_items
+    size = len(value)
+    if size < _MIN_VALIDATED_ITEMS or size > _MAX_VALIDATED_ITEMS:
+        return
+    with _validated_lock:
+        old = _validated.pop(key, None)
+        if old is not None:
+            _validated_items -= len(old)
+        # Forget the oldest, to stay within the bound
+        while _validated and _validated_items + size > _MAX_VALIDATED_ITEMS:
+            _validated_items -= len(_validated.pop(next(iter(_validated))))
+        _validated[key] = value
+        _validated_items += size
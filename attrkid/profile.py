@@ -0,0 +1,293 @@
+import argparse
+import contextlib
+import functools
+import gc
+import importlib
+import json
+import time
+import tracemalloc
+
+import attr
+
+from .serde import _current_profile, from_dict, to_dict
+
+
+@attr.s(slots=True)
+class Usage:
+    """
+    Memory used by one model class, or one field of it, in `from_dict` or
+    `to_dict`. Nested instances and fields are counted in their own
+    `Usage`, not their parent's.
+
+    `bytes` is what was still allocated when each call returned: the values
+    produced, and anything leaked or left for the garbage collector.
+    `objects` counts the objects among them which were allocated for the
+    garbage collector (instances, and most containers): these count
+    towards triggering a collection. `peak` is the most
+    any single call had allocated at once, including nested calls and
+    temporaries freed before it returned. `collections` counts garbage
+    collections which started while this was being processed.
+
+    Memory is sometimes freed by other code than allocated it (eg. when
+    objects are kept on a free list), so `bytes` is approximate, and can
+    be a little below zero for classes and fields which allocate little of
+    their own.
+    """
+    calls = attr.ib(default=0)
+    bytes = attr.ib(default=0)
+    objects = attr.ib(default=0)
+    peak = attr.ib(default=0)
+    collections = attr.ib(default=0)
+
+
+@attr.s(slots=True)
+class Collections:
+    """ Garbage collections of one generation """
+    count = attr.ib(default=0)
+    collected = attr.ib(default=0)
+    seconds = attr.ib(default=0.0)
+
+
+class _Frame:
+    __slots__ = ('usage', 'start', 'start_objects', 'peak', 'child_bytes',
+                 'child_objects')
+
+    def __init__(self, usage):
+        self.usage = usage
+        self.start = self.start_objects = self.peak = 0
+        self.child_bytes = self.child_objects = 0
+
+
+class Allocations:
+    """
+    What was allocated by `from_dict` and `to_dict` within an
+    `allocations` block.
+
+    Attributes:
+        usage: Dict of (class, field name or None, `constants.FROM_DICT`
+            or `TO_DICT`) -> `Usage`
+        gc: Dict of generation -> `Collections`, for every collection during
+            the block
+    """
+
+    def __init__(self):
+        self.usage = {}
+        self.gc = {generation: Collections() for generation in range(3)}
+        self._stack = []
+        self._wrapped = {}
+        self._gc_start = None
+        # Tracked objects counted by the GC before each collection reset
+        # its count
+        self._gc_carry = 0
+        # Number of keyword arguments -> bytes of our own bookkeeping still
+        # allocated when a call is measured, which aren't the call's
+        self._overhead = {}
+
+    def top(self, n=None, *, key='bytes'):
+        """
+        Return up to `n` (key, `Usage`) pairs, most first by the `Usage`
+        attribute `key`.
+        """
+        rows = sorted(
+            self.usage.items(),
+            key=lambda row: getattr(row[1], key),
+            reverse=True)
+        return rows[:n]
+
+    def summary(self, n=20, *, key='bytes'):
+        """ Return a table of the top `n` rows by `key`, as text """
+        lines = [
+            f'{"model / field":40} {"op":9} {"calls":>8} {"KiB":>10} '
+            f'{"objects":>9} {"peak KiB":>9} {"GCs":>5}'
+        ]
+        for (cls, name, op), usage in self.top(n, key=key):
+            label = cls.__qualname__ if name is None else (
+                f'{cls.__qualname__}.{name}')
+            lines.append(
+                f'{label[:40]:40} {op:9} {usage.calls:>8} '
+                f'{usage.bytes / 1024:>10.1f} {usage.objects:>9} '
+                f'{usage.peak / 1024:>9.1f} {usage.collections:>5}')
+        lines.append('')
+        for generation, stats in self.gc.items():
+            lines.append(
+                f'GC generation {generation}: {stats.count} collections, '
+                f'{stats.collected} objects collected, '
+                f'{stats.seconds * 1000:.1f} ms')
+        return '\n'.join(lines)
+
+    def call(self, cls, name, op, func, *args, **kw):
+        """ Call `func`, counting what it allocates against `cls.name` """
+        key = (cls, name, op)
+        usage = self.usage.get(key)
+        if usage is None:
+            usage = self.usage[key] = Usage()
+        stack = self._stack
+        # Made before measuring, so as not to count against the call
+        frame = _Frame(usage)
+        stack.append(frame)
+        current, peak = tracemalloc.get_traced_memory()
+        if len(stack) > 1:
+            parent = stack[-2]
+            parent.peak = max(parent.peak, peak)
+        tracemalloc.reset_peak()
+        frame.start = current
+        frame.peak = current
+        frame.start_objects = gc.get_count()[0] + self._gc_carry
+        try:
+            return func(*args, **kw)
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            objects = (gc.get_count()[0] + self._gc_carry -
+                       frame.start_objects)
+            allocated = current - frame.start - self._overhead.get(len(kw), 0)
+            peak = max(frame.peak, peak)
+            stack.pop()
+            usage.calls += 1
+            usage.bytes += allocated - frame.child_bytes
+            usage.objects += objects - frame.child_objects
+            usage.peak = max(usage.peak, peak - frame.start)
+            if stack:
+                parent = stack[-1]
+                parent.child_bytes += allocated
+                parent.child_objects += objects
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+
+    def _calibrate(self, n=100):
+        """ Measure the overhead of `call` itself, with tracing started """
+        # Serialisers are passed `options`, and _to_dict `serialisers` too
+        for kw in ({}, {'options': None}, {'options': None, 'extra': None}):
+            for _ in range(n):
+                self.call(None, None, len(kw), _noop, **kw)
+            usage = self.usage.pop((None, None, len(kw)))
+            self._overhead[len(kw)] = usage.bytes // n
+
+    def wrap(self, cls, op, functions):
+        """
+        Return a copy of `functions` (a ClassInfo dict of field name ->
+        serialiser or deserialiser) that counts each call against its field.
+        """
+        key = (cls, op)
+        wrapped = self._wrapped.get(key)
+        if wrapped is None:
+            wrapped = self._wrapped[key] = {
+                name: None if func is None else functools.partial(
+                    self.call, cls, name, op, func)
+                for name, func in functions.items()
+            }
+        return wrapped
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+            # Every collection resets the count of new objects
+            self._gc_carry += gc.get_count()[0]
+            if self._stack:
+                self._stack[-1].usage.collections += 1
+        elif self._gc_start is not None:
+            stats = self.gc[info['generation']]
+            stats.count += 1
+            stats.collected += info['collected']
+            stats.seconds += time.perf_counter() - self._gc_start
+            self._gc_start = None
+
+
+def _noop(*, options=None, extra=None):
+    pass
+
+
+@contextlib.contextmanager
+def allocations():
+    """
+    Context manager which counts the memory allocated by `from_dict` and
+    `to_dict` within the block against the model classes and fields that
+    allocated it, along with the garbage collections it triggered:
+
+        with allocations() as profile:
+            orders = [from_dict(Order, d) for d in batch]
+        print(profile.summary())
+
+    Tracing is done with `tracemalloc` (which is started if it isn't
+    running already), and makes serialisation several times slower. It
+    needs Python 3.9 or later, for `tracemalloc.reset_peak`.
+    Instances handled by the explicit-stack engine (see `serde`) are
+    counted against the field that handed them over.
+
+    Returns:
+        The `Allocations` for the block
+    """
+    if not hasattr(tracemalloc, 'reset_peak'):
+        raise RuntimeError('Allocation profiling needs Python 3.9 or later')
+    profile = Allocations()
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    profile._calibrate()
+    gc.callbacks.append(profile._on_gc)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        gc.callbacks.remove(profile._on_gc)
+        if started:
+            tracemalloc.stop()
+
+
+def _import(path):
+    module, _, name = path.partition(':')
+    if not name:
+        raise argparse.ArgumentTypeError(f'Expected module:Class, got {path}')
+    obj = importlib.import_module(module)
+    for part in name.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def main(argv=None):
+    """
+    Decode the JSON in a file with `from_dict` (and encode the instances
+    again with `to_dict`), and print where memory was allocated:
+
+        python -m attrkid.profile myapp.models:Order orders.json
+
+    The file holds either one object, or a list of objects each decoded
+    separately.
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m attrkid.profile',
+        description='Profile memory allocated by from_dict and to_dict')
+    parser.add_argument('cls', type=_import, help='Model class, module:Class')
+    parser.add_argument('path', help='JSON file of data to decode')
+    parser.add_argument(
+        '-n', '--repeat', type=int, default=1, help='Times to decode')
+    parser.add_argument(
+        '--top', type=int, default=20, help='Rows to show')
+    parser.add_argument(
+        '--sort',
+        choices=[f.name for f in attr.fields(Usage)],
+        default='bytes',
+        help='Column to sort rows by')
+    parser.add_argument(
+        '--no-encode',
+        dest='encode',
+        action='store_false',
+        help="Don't encode the decoded instances")
+    args = parser.parse_args(argv)
+
+    with open(args.path, 'rb') as fp:
+        data = json.load(fp)
+    if not isinstance(data, list):
+        data = [data]
+
+    with allocations() as profile:
+        for _ in range(args.repeat):
+            instances = [from_dict(args.cls, each) for each in data]
+            if args.encode:
+                for instance in instances:
+                    to_dict(instance)
+    print(profile.summary(args.top, key=args.sort))
+
+
+if __name__ == '__main__':
+    main()
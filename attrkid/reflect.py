@@ -3,32 +3,143 @@ from typing import Union, Any
 import attr
 
 from .constants import (
+    DESERIALISE,
     IS_DEFAULT_FROM_ATTR,
     IS_KEY,
+    IS_NESTED,
     IS_ONLY_FIELD,
+    IS_OPTIONAL,
     IS_PK,
     IS_UNIQUE,
     MISSING,
+    SELF,
+    SERIALISE,
     SHOULD_SERIALISE,
     SUBTYPE,
     TYPE,
 )
+from .kind import UnionKind
+
+# Where class_info caches its result on each class
+_INFO_ATTR = '__attrkid_info__'
+
+
+@attr.s(frozen=True, slots=True, repr=False)
+class ClassInfo:
+    """
+    attrkid's metadata for one attrs class, worked out once. Use
+    `class_info` to get hold of one.
+    """
+    cls = attr.ib()
+    # All fields, as attr.fields returns them
+    fields = attr.ib()
+    # The primary key field, or None
+    pk = attr.ib()
+    # Key fields (including the primary key) and unique fields
+    keys = attr.ib()
+    uniques = attr.ib()
+    # Fields which should be serialised, in order
+    serialisable = attr.ib()
+    # The field marked is_only_field, or None
+    only_field = attr.ib()
+    # Field name -> serialise/deserialise function or None
+    serialisers = attr.ib()
+    deserialisers = attr.ib()
+    # Field name -> the UnionKind of the field or its contents, or None
+    unions = attr.ib()
+    # Field name -> collection type (or None for a single instance), for
+    # just the fields holding nested instances that attrkid decodes itself
+    nested = attr.ib()
+    # Field name -> resolved types, filled in as they're asked for
+    _types = attr.ib(factory=dict)
+    _item_kinds = attr.ib(factory=dict)
+
+    def field_types(self, name):
+        """
+        Return the resolved tuple of types for field `name`, or `(None, )`
+        if it has no type information. Types are resolved the first time
+        they're asked for, so DeferredKinds are only imported when needed.
+        """
+        types = self._types.get(name)
+        if types is None:
+            f = getattr(attr.fields(self.cls), name)
+            types = self._types[name] = field_type(f, default=(None, ))
+        return types
+
+    def item_kind(self, name):
+        """
+        Return what a nested value of field `name` should be decoded as: the
+        field's `UnionKind` if it has one, or else the concrete class of the
+        field (or of its items, for collections), with SELF resolved to this
+        class.
+        """
+        kind = self._item_kinds.get(name)
+        if kind is None:
+            f = getattr(attr.fields(self.cls), name)
+            kind, = field_subtype(f, unwrap=False, default=(None, ))
+            if kind is None:
+                kind, = field_type(f, unwrap=False)
+            if not isinstance(kind, UnionKind):
+                # This is safe, because only UnionKind returns multiple
+                # types in its `get()`.
+                kind, = kind.get()
+                if kind is SELF:
+                    kind = self.cls
+            self._item_kinds[name] = kind
+        return kind
+
+    def __repr__(self):
+        return f'<ClassInfo for {self.cls!r}>'
+
+
+def class_info(kind) -> ClassInfo:
+    """
+    Return the `ClassInfo` for attrs class `kind`, building and caching it
+    on the class the first time it's asked for.
+    """
+    # Look in the class's own __dict__, so subclasses get their own info
+    info = kind.__dict__.get(_INFO_ATTR)
+    if info is None:
+        fields = attr.fields(kind)
+        only_fields = [f for f in fields if is_only_field(f)]
+        pks = [f for f in fields if is_primary_key(f)]
+        info = ClassInfo(
+            cls=kind,
+            fields=fields,
+            pk=pks[0] if pks else None,
+            keys=tuple([f for f in fields if is_key(f)]),
+            uniques=tuple([f for f in fields if is_unique(f)]),
+            serialisable=tuple([f for f in fields if should_serialise(f)]),
+            only_field=only_fields[0] if only_fields else None,
+            serialisers={f.name: f.metadata.get(SERIALISE)
+                         for f in fields},
+            deserialisers={f.name: f.metadata.get(DESERIALISE)
+                           for f in fields},
+            unions={f.name: field_union(f)
+                    for f in fields},
+            nested={
+                f.name: field_type(f)[0] if SUBTYPE in f.metadata else None
+                for f in fields if is_nested(f)
+            },
+        )
+        setattr(kind, _INFO_ATTR, info)
+    return info
 
 
 def primary_key_for(kind):
-    for f in attr.fields(kind):
-        if is_primary_key(f):
-            return f
-    raise ValueError(kind)
+    pk = class_info(kind).pk
+    if pk is None:
+        raise ValueError(kind)
+    return pk
 
 
 def primary_key_value_for(instance):
-    pk_field = primary_key_for(type(instance))
+    pk_field = primary_key_for(instance.__class__)
     return getattr(instance, pk_field.name)
 
 
 def is_key(f):
-    return IS_KEY in f.metadata
+    return f.metadata.get(IS_KEY, False)
 
 
 def is_primary_key(f):
@@ -51,6 +162,25 @@ def is_only_field(f):
     return f.metadata.get(IS_ONLY_FIELD, False)
 
 
+def is_optional(f):
+    return f.metadata.get(IS_OPTIONAL, False)
+
+
+def is_nested(f):
+    return f.metadata.get(IS_NESTED, False)
+
+
+def is_frozen(kind):
+    """
+    Return True if `kind` is a frozen attrs class (including subclasses of
+    one), whose instances can't be changed after construction.
+    """
+    # attrs doesn't expose this directly, but installs its own __setattr__
+    # on frozen classes.
+    return attr.has(kind) and getattr(kind.__setattr__, '__name__',
+                                      None) == '_frozen_setattrs'
+
+
 def _field_type(f, metadata_field, default, *, unwrap: bool):
     proxy_tuple = f.metadata.get(metadata_field, (None, ))
     if proxy_tuple:
@@ -96,3 +226,15 @@ def field_subtype(f, default=MISSING, *, unwrap=True):
     contained item. Other commentary is the same as for `field_type`.
     """
     return _field_type(f, SUBTYPE, default, unwrap=unwrap)
+
+
+def field_union(f):
+    """
+    Return the `UnionKind` of field `f`, or of the items it contains if it's
+    a collection, or None if there isn't one.
+    """
+    for t in (field_type(f, default=(None, ), unwrap=False),
+              field_subtype(f, default=(None, ), unwrap=False)):
+        if isinstance(t[0], UnionKind):
+            return t[0]
+    return None
@@ -1,47 +1,127 @@
+import contextvars
+import threading
+
 import attr
 
 from .constants import (
     COLLECTION_TYPES,
     DESERIALISE,
+    FROM_DICT,
     MISSING,
     SERIALISE,
+    TO_DICT,
 )
+from .codec import _current_codecs, decode, encode
+from .engine import Decoder, Encoder, _construct, _field_default
 from .exceptions import ValidationError
-from .kind import UnionKind
+from .intern import _current_table
+from .jsonlib import _current_backend, dumps, get_backend, loads
+from .kind import union_value
+from .memo import _MEMOISED
 from .options import SerdeOptions
-from .reflect import field_subtype, field_type, is_only_field, should_serialise
-from .validators import validate
+from .reflect import class_info
 
 # Just create our default options once as it's used 99% of the time
 # (This is safe as SerdeOptions is immutable)
 _DEFAULT_OPTIONS = SerdeOptions()
 
+# How deeply from_dict and to_dict recurse before handing the rest of the
+# model to the explicit-stack engine. Recursion is quicker for the shallow
+# models most of us have, but each level of nesting costs a few Python
+# frames, so deep (eg. SELF-referencing) models would hit the recursion
+# limit.
+MAX_RECURSION_DEPTH = 50
+
+# Per-thread nesting depth of from_dict and to_dict calls
+_nesting = threading.local()
+
+# Set while to_dict is writing shared references
+_sharing = contextvars.ContextVar('attrkid_sharing', default=False)
 
-def from_dict(cls, data, *, defaults=None):
+# The `attrkid.profile.Allocations` in force, if any
+_current_profile = contextvars.ContextVar('attrkid_profile', default=None)
+
+
+def from_dict(cls, data, *, defaults=None, options: SerdeOptions = None):
     """
-    Deserialize `data` into a `cls` instance. If `data` is not an attrs class,
-    we assume there's nothing to do.
+    Deserialize `data` into a `cls` instance. If `cls` is not an attrs class,
+    `data` is decoded with the codec for `cls` if there is one (see
+    `attrkid.codec`), and otherwise returned as it is.
 
     Args:
         cls: The class to instantiate
         data: Data to parse
         defaults: Any defaults from missing data
+        options: A SerdeOptions instance. Only `share_references` and
+            `codecs` affect deserialisation: with `share_references`, the
+            reference markers written by `to_dict` are resolved to shared
+            instances.
 
     Returns:
 
     """
+    if options is not None and options.codecs is not None:
+        token = _current_codecs.set(options.codecs)
+        try:
+            return from_dict(
+                cls,
+                data,
+                defaults=defaults,
+                options=attr.evolve(options, codecs=None))
+        finally:
+            _current_codecs.reset(token)
+
+    if options is not None and options.json_backend is not None:
+        token = _current_backend.set(get_backend(options.json_backend))
+        try:
+            return from_dict(
+                cls,
+                data,
+                defaults=defaults,
+                options=attr.evolve(options, json_backend=None))
+        finally:
+            _current_backend.reset(token)
+
     if not attr.has(cls):
-        return data
+        return decode(cls, data)
+
+    if options is not None and options.share_references:
+        decoder = Decoder(
+            cls, data, defaults=defaults, share_references=True)
+        decoder.run()
+        return decoder.result
+
+    depth = getattr(_nesting, 'depth', 0)
+    if depth >= MAX_RECURSION_DEPTH:
+        decoder = Decoder(cls, data, defaults=defaults)
+        decoder.run()
+        return decoder.result
+
+    _nesting.depth = depth + 1
+    try:
+        return _from_dict(cls, data, defaults)
+    finally:
+        _nesting.depth = depth
+
+
+def _from_dict(cls, data, defaults=None, deserialisers=None):
+    info = class_info(cls)
+    if deserialisers is None:
+        profile = _current_profile.get()
+        if profile is not None:
+            return profile.call(
+                cls, None, FROM_DICT, _from_dict, cls, data, defaults,
+                profile.wrap(cls, FROM_DICT, info.deserialisers))
+        deserialisers = info.deserialisers
 
     kw = {}
     if defaults is None:
         defaults = {}
-
-    for f in attr.fields(cls):
+    for f in info.fields:
         # If this field is the only field, then we don't have to extract
         # a value out of the data dict - the whole value *is* the data dict.
         value = MISSING
-        if is_only_field(f):
+        if f is info.only_field:
             raw = data
         else:
             raw = data.get(f.name, MISSING)
@@ -58,40 +138,40 @@ def from_dict(cls, data, *, defaults=None):
                         raw = default
 
         if raw is MISSING and value is MISSING:
-            if f.default is not attr.NOTHING:
-                if isinstance(f.default, attr.Factory):
-                    value = f.default.factory()
-                else:
-                    value = f.default
-            else:
-                value = None
+            value = _field_default(f)
 
         if value is MISSING:
-            try:
-                value = _do_deserialise(cls, f, raw)
-            except Exception as exc:
-                raise ValidationError(
-                    errors=[{
-                        'field': f,
-                        'exc': exc
-                    }], exc=exc) from exc
+            deserialise = deserialisers[f.name]
+            if deserialise is None:
+                value = raw
+            else:
+                try:
+                    value = deserialise(cls, f, raw)
+                except Exception as exc:
+                    raise ValidationError(
+                        errors=[{
+                            'field': f,
+                            'exc': exc
+                        }], exc=exc) from exc
         kw[f.name] = value
 
-    try:
-        return cls(**kw)
-    except Exception as exc:
-        # If something bad happened, try to run the validators again
-        # individually as a best-effort to figure out what went wrong. This
-        # isn't perfect, because we don't have an instance to play with.
-        errors = validate(cls, kw)
-        if errors:
-            raise ValidationError(errors=errors, exc=exc) from exc
-        raise
+    table = _current_table.get()
+    if table is not None:
+        return table.intern(cls, kw, _construct)
+    return _construct(cls, kw)
 
 
 def to_dict(instance, *, options: SerdeOptions = None):
     """
     Serialize `instance` into a dict.
+
+    With `SerdeOptions(share_references=True)`, an instance referenced from
+    more than one object or collection field is written out in full once,
+    with an extra `'$id'` key, and as `{'$ref': id}` everywhere else. Pass
+    the same options to `from_dict` to restore the shared instances.
+    Either way, ValueError is raised if instances refer to each other in a
+    cycle.
+
     Args:
         instance: The instance to serialise
         options: A SerdeOptions instance to control serialisation
@@ -102,25 +182,96 @@ def to_dict(instance, *, options: SerdeOptions = None):
     if options is None:
         options = _DEFAULT_OPTIONS
 
-    # We may get passed a top-level collection. Handle that directly here by
-    # serialising elements as a list - obviously we don't have a field at
-    # this point to pull out a custom serialiser.
-    if isinstance(instance, COLLECTION_TYPES):
-        return [to_dict(
-            each,
-            options=options,
-        ) for each in instance]
+    if options.share_references:
+        if not _sharing.get():
+            token = _sharing.set(True)
+            try:
+                encoder = Encoder(instance, options=options)
+                encoder.run()
+                return encoder.result
+            finally:
+                _sharing.reset(token)
+        # We're being called by a field serialiser while writing shared
+        # references. We won't decode references in this field ourselves,
+        # so don't write them.
+        options = attr.evolve(options, share_references=False)
 
-    if not attr.has(instance):
-        return instance
+    depth = getattr(_nesting, 'depth', 0)
+    if depth >= MAX_RECURSION_DEPTH:
+        encoder = Encoder(instance, options=options)
+        encoder.run()
+        return encoder.result
 
-    if options.union is not None:
+    _nesting.depth = depth + 1
+    try:
+        # We may get passed a top-level collection. Handle that directly
+        # here by serialising elements as a list - obviously we don't have a
+        # field at this point to pull out a custom serialiser.
+        if isinstance(instance, COLLECTION_TYPES):
+            return [to_dict(
+                each,
+                options=options,
+            ) for each in instance]
+
+        if not attr.has(instance):
+            return encode(instance, options=options)
+
+        memo = _MEMOISED.get(type(instance))
+        if memo is not None:
+            result = memo.lookup(instance, options)
+            if result is MISSING:
+                result = memo.store(instance, options,
+                                    _to_dict(instance, options=options))
+            return result
+        return _to_dict(instance, options=options)
+    finally:
+        _nesting.depth = depth
+
+
+def to_json(instance, *, options: SerdeOptions = None) -> str:
+    """
+    Serialise `instance` with `to_dict`, and encode the result as JSON with
+    the backend chosen by `options.json_backend` (see `attrkid.jsonlib`).
+    """
+    return dumps(to_dict(instance, options=options), options=options)
+
+
+def from_json(cls, data, *, defaults=None, options: SerdeOptions = None):
+    """
+    Decode JSON `data` (str or bytes) with the backend chosen by
+    `options.json_backend`, and deserialise the result into a `cls`
+    instance with `from_dict`.
+    """
+    return from_dict(
+        cls, loads(data, options=options), defaults=defaults, options=options)
+
+
+def _to_dict(instance, *, options: SerdeOptions, serialisers=None):
+    if serialisers is None:
+        profile = _current_profile.get()
+        if profile is not None:
+            cls = instance.__class__
+            return profile.call(
+                cls,
+                None,
+                TO_DICT,
+                _to_dict,
+                instance,
+                options=options,
+                serialisers=profile.wrap(cls, TO_DICT,
+                                         class_info(cls).serialisers))
+
+    union = options.union
+    if union is not None and not union.untagged:
         # If we're serialising a union, we need to make sure we serialise the
         # correct top-level tag.
-        data = {}
-        selector = options.union.selector_for(type(instance))
-
-        rv = {selector: data}
+        selector = union.selector_for(type(instance))
+        if union.tag is not None:
+            # Internally tagged, so the tag goes in alongside the fields
+            rv = data = {union.tag: selector}
+        else:
+            data = {}
+            rv = {selector: data}
     else:
         rv = {}
         data = rv
@@ -129,53 +280,43 @@ def to_dict(instance, *, options: SerdeOptions = None):
     # Note we've arranged things so the code always updates the dict
     # pointed to by `data`. This might be a top-level dict, or it might be
     # the data dict wrapped for the benefit of the UnionField.
-    for field in attr.fields(type(instance)):
-        if not should_serialise(field):
-            continue
-        value = getattr(instance, field.name)
+    info = class_info(instance.__class__)
+    unions = info.unions
+    if serialisers is None:
+        serialisers = info.serialisers
+    for field in info.serialisable:
+        name = field.name
+        value = getattr(instance, name)
 
-        # Figure out if we're processing a field with a UnionKind
-        mu = _maybe_union(field)
-        if mu != options.union:
+        # Figure out if we're processing a field with a UnionKind. If we
+        # are, then we need to pass it down to the next layers as it will
+        # eventually need to be serialised slightly differently.
+        mu = unions[name]
+        if mu is not options.union and mu != options.union:
             options = attr.evolve(options, union=mu)
 
         # If this is the only field, then we skip serialisation of this field
         # and directly return the serialised value. Note that if we're wrapping
         # the value in a container (ie. we have a valid selector) then we
         # put the value in the rv dict rather than returning it directly.
-        if is_only_field(field):
+        if field is info.only_field:
             only_field_value = to_dict(value, options=options)
             if selector:
-                rv[selector] = only_field_value
-                return rv
+                return union_value(union, selector, only_field_value)
             else:
                 return only_field_value
 
         if options.omit_null_values and value is None:
             continue
-        value = _do_serialise(
-            field,
-            value,
-            options=options,
-        )
-        data[field.name] = value
+        serialiser = serialisers[name]
+        if serialiser is not None:
+            value = serialiser(field, value, options=options)
+        elif attr.has(value.__class__):
+            value = to_dict(value, options=options)
+        data[name] = value
     return rv
 
 
-def _maybe_union(field):
-    # Figure out if we're processing in the context of a UnionKind. If we
-    # are, then we need to pass it down to the next layers as it will
-    # eventually need to be serialised slightly differently.
-    type_, = field_type(field, default=(None, ), unwrap=False)
-    subtype, = field_subtype(field, default=(None, ), unwrap=False)
-    union = None
-    for t in (type_, subtype):
-        if isinstance(t, UnionKind):
-            union = t
-            break
-    return union
-
-
 def _do_deserialise(owning_cls, field, value):
     """
     If the current field has a deserialise function, call it. We expect this to
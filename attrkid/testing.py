@@ -0,0 +1,289 @@
+import array
+import datetime
+import decimal
+import enum
+import ipaddress
+import itertools
+import random as _random
+import string
+import uuid
+
+import attr
+import pytz
+
+from .constants import DESERIALISE, SELF, SUBTYPE, TYPECODE
+from .kind import ProxyKind, UnionKind
+from .reflect import (
+    class_info,
+    is_default_from_attr,
+    is_key,
+    is_optional,
+    is_unique,
+    should_serialise,
+)
+from .serde import to_dict
+
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_COLLECTION_SIZE = (0, 5)
+DEFAULT_STRING_LENGTH = (1, 12)
+
+_ALPHABET = string.ascii_letters + string.digits + ' '
+
+# Datetimes are made between these, in UTC
+_EPOCH = datetime.datetime(2000, 1, 1, tzinfo=pytz.utc)
+_SPAN_SECONDS = 30 * 365 * 24 * 60 * 60
+
+# Levels past max_depth that required nested fields may go, before giving
+# up on a model that can't stop nesting
+_MAX_OVERRUN = 10
+
+# Values drawn per item wanted in a set, before settling for a smaller set
+# (eg. of bools)
+_SET_TRIES = 10
+
+
+class Generator:
+    """
+    Makes valid instances of attrs classes from their attrkid field
+    definitions, for load testing and benchmarks. Nested instances,
+    collections, unions (deferred or not), SELF references and scalar
+    fields are all filled in; optional fields are sometimes None, and
+    fields with a default sometimes left to it.
+
+    Fields with validators the generator can't know about (eg. `one_of`,
+    or `url_field`'s https check) need an override, which is passed the
+    generator's `random.Random` and returns a value:
+
+        Generator(overrides={
+            attr.fields(Site).url: lambda r: f'https://{r.randrange(99)}',
+        })
+
+    Args:
+        seed: Seed for the generator's `random.Random`, for repeatable data
+        random: A `random.Random` to use, instead of a seed
+        max_depth: How deeply instances nest. Below this, collections of
+            instances are empty and optional instances None.
+        collection_size: (min, max) items in each collection
+        string_length: (min, max) length of strings and bytes
+        null_probability: How often an optional field is None
+        default_probability: How often a field with a default is left to it
+        overrides: Dict of attrs field -> function of a `random.Random`,
+            returning the field's value
+    """
+
+    def __init__(self,
+                 *,
+                 seed=None,
+                 random=None,
+                 max_depth=DEFAULT_MAX_DEPTH,
+                 collection_size=DEFAULT_COLLECTION_SIZE,
+                 string_length=DEFAULT_STRING_LENGTH,
+                 null_probability=0.1,
+                 default_probability=0.5,
+                 overrides=None):
+        self.random = random if random is not None else _random.Random(seed)
+        self.max_depth = max_depth
+        self.collection_size = collection_size
+        self.string_length = string_length
+        self.null_probability = null_probability
+        self.default_probability = default_probability
+        self.overrides = dict(overrides or {})
+
+    def instance(self, cls, depth=0):
+        """ Return an instance of attrs class `cls` """
+        if depth > self.max_depth + _MAX_OVERRUN:
+            raise ValueError(
+                f"Can't stop nesting {cls!r}: make the field that holds it "
+                f'optional, or give it a default or an override')
+        info = class_info(cls)
+        kw = {}
+        for f in info.fields:
+            value = self._field_value(info, f, depth)
+            if value is not attr.NOTHING:
+                # attrs strips the underscore from private attributes
+                kw[f.name.lstrip('_')] = value
+        return cls(**kw)
+
+    def _field_value(self, info, f, depth):
+        """ Return a value for field `f`, or NOTHING to use its default """
+        if not f.init:
+            return attr.NOTHING
+        override = self.overrides.get(f)
+        if override is not None:
+            return override(self.random)
+
+        r = self.random
+        has_default = f.default is not attr.NOTHING
+        if not should_serialise(f) or is_default_from_attr(f):
+            return attr.NOTHING
+        types = info.field_types(f.name)
+        if (is_key(f) or is_unique(f)) and types == (str, ):
+            # Made rather than left to any (random) default, so that the
+            # same seed gives the same IDs
+            return f'{r.getrandbits(128):032x}'
+        if has_default and r.random() < self.default_probability:
+            return attr.NOTHING
+        if is_optional(f) and r.random() < self.null_probability:
+            return None
+
+        if TYPECODE in f.metadata:
+            return self._array(info.cls, f)
+        if types == (None, ):
+            return self._any()
+        kind = info.item_kind(f.name)
+        if SUBTYPE in f.metadata:
+            return self._collection(types[0], kind, info.cls, depth)
+
+        if self._is_nested(kind, info.cls) and depth >= self.max_depth:
+            # Stop here if we can
+            if is_optional(f):
+                return None
+            if has_default:
+                return attr.NOTHING
+        return self.value(kind, depth, owner=info.cls)
+
+    def value(self, kind, depth=0, *, owner=None):
+        """
+        Return a value of `kind`: a class, `UnionKind` or other kind
+        wrapper. `owner` is the class SELF refers to.
+        """
+        if isinstance(kind, UnionKind):
+            kinds = kind.unwrap()
+            if depth >= self.max_depth:
+                # Head for the way out, if there is one
+                kinds = [k for k in kinds
+                         if k is not owner and k is not SELF] or kinds
+            kind = self.random.choice(kinds)
+        elif isinstance(kind, ProxyKind):
+            kind, = kind.unwrap()
+        if kind is not None and not isinstance(kind, type):
+            # SELF
+            kind = owner
+        if attr.has(kind):
+            return self.instance(kind, depth + 1)
+
+        for base in kind.__mro__:
+            make = _SCALARS.get(base)
+            if make is not None:
+                return make(self, kind)
+        raise TypeError(f"Can't generate values of {kind!r}; give the "
+                        f'field an override')
+
+    def _is_nested(self, kind, owner):
+        if isinstance(kind, ProxyKind):
+            return any(self._is_nested(k, owner) for k in kind.unwrap())
+        return kind is not None and (not isinstance(kind, type) or
+                                     attr.has(kind))
+
+    def _collection(self, collection_type, kind, owner, depth):
+        r = self.random
+        if self._is_nested(kind, owner) and depth >= self.max_depth:
+            return collection_type()
+        size = r.randint(*self.collection_size)
+        if collection_type is frozenset:
+            items = set()
+            for _ in range(size * _SET_TRIES):
+                if len(items) == size:
+                    break
+                items.add(self.value(kind, depth, owner=owner))
+            return frozenset(items)
+        return collection_type(
+            [self.value(kind, depth, owner=owner) for _ in range(size)])
+
+    def _array(self, owner, f):
+        r = self.random
+        typecode = f.metadata[TYPECODE]
+        size = r.randint(*self.collection_size)
+        if typecode in 'fd':
+            values = [r.uniform(-1e6, 1e6) for _ in range(size)]
+        else:
+            bits = array.array(typecode).itemsize * 8
+            if typecode.isupper():
+                low, high = 0, 2**bits - 1
+            else:
+                low, high = -2**(bits - 1), 2**(bits - 1) - 1
+            values = [r.randint(low, high) for _ in range(size)]
+        # Let the field make its array.array or NumPy array
+        return f.metadata[DESERIALISE](owner, f, values)
+
+    def _any(self):
+        r = self.random
+        return r.choice((None, r.randint(-1000, 1000), self._string(str)))
+
+    def _string(self, kind):
+        r = self.random
+        return ''.join(
+            r.choices(_ALPHABET, k=r.randint(*self.string_length)))
+
+    def _datetime(self, kind):
+        r = self.random
+        return _EPOCH + datetime.timedelta(
+            seconds=r.randrange(_SPAN_SECONDS),
+            microseconds=r.randrange(1000000))
+
+
+def _make_bytes(gen, kind):
+    r = gen.random
+    n = r.randint(*gen.string_length)
+    return r.getrandbits(8 * n).to_bytes(n, 'big')
+
+
+_SCALARS = {
+    str: Generator._string,
+    bool: lambda gen, kind: gen.random.random() < 0.5,
+    int: lambda gen, kind: gen.random.randint(-2**31, 2**31 - 1),
+    float: lambda gen, kind: gen.random.uniform(-1e6, 1e6),
+    decimal.Decimal: lambda gen, kind: decimal.Decimal(
+        gen.random.randint(-10**8, 10**8)).scaleb(-2),
+    bytes: _make_bytes,
+    datetime.datetime: Generator._datetime,
+    datetime.date: lambda gen, kind: (
+        _EPOCH + datetime.timedelta(days=gen.random.randrange(365 * 30))
+    ).date(),
+    datetime.time: lambda gen, kind: Generator._datetime(gen, kind).time(),
+    uuid.UUID: lambda gen, kind: uuid.UUID(
+        int=gen.random.getrandbits(128), version=4),
+    ipaddress.IPv4Address: lambda gen, kind: ipaddress.IPv4Address(
+        gen.random.getrandbits(32)),
+    ipaddress.IPv6Address: lambda gen, kind: ipaddress.IPv6Address(
+        gen.random.getrandbits(128)),
+    enum.Enum: lambda gen, kind: gen.random.choice(list(kind)),
+    dict: lambda gen, kind: {
+        gen._string(str): gen._any()
+        for _ in range(gen.random.randint(*gen.collection_size))
+    },
+}
+
+
+def generate(cls, n=None, *, seed=None, as_dicts=False, **settings):
+    """
+    Lazily generate `n` (or with `n=None`, endless) valid instances of
+    attrs class `cls`, or with `as_dicts=True` their `to_dict` forms:
+
+        for order in generate(Order, 10000, seed=1):
+            ...
+
+    The same seed always gives the same data. Other keyword arguments
+    (`max_depth`, `collection_size`, `string_length`, `overrides` and so
+    on) are passed to `Generator`.
+    """
+    gen = Generator(seed=seed, **settings)
+    counter = itertools.count() if n is None else range(n)
+    for _ in counter:
+        instance = gen.instance(cls)
+        yield to_dict(instance) if as_dicts else instance
+
+
+def strategy(cls, *, as_dicts=False, **settings):
+    """
+    Return a Hypothesis strategy for instances of `cls` (or their dicts),
+    made as `generate` does, from randomness Hypothesis controls. Requires
+    the hypothesis package.
+    """
+    from hypothesis import strategies as st
+
+    def build(random):
+        instance = Generator(random=random, **settings).instance(cls)
+        return to_dict(instance) if as_dicts else instance
+
+    return st.randoms(use_true_random=False).map(build)
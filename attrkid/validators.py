@@ -1,7 +1,10 @@
+import array
+
 import attr
+from attr.validators import optional
 
 from .constants import SELF, COLLECTION_TYPES
-from .kind import wrap_kind, ProxyKind
+from .kind import ImmediateKind, ProxyKind, UnionKind, wrap_kind
 
 
 def validate(kind, data):
@@ -53,6 +56,65 @@ def one_of(values):
     return _one_of
 
 
+def member_of(enum_cls):
+    """
+    Return a validator which checks that the value is a member of the Enum
+    `enum_cls`. Members are singletons, so this is just a check of the
+    value's class.
+    """
+    return _MemberOfValidator(enum_cls)
+
+
+@attr.s(repr=False, slots=True, hash=True)
+class _MemberOfValidator:
+    type = attr.ib()
+
+    def __call__(self, inst, attr, value):
+        if value.__class__ is not self.type:
+            raise TypeError(
+                f'`{attr.name}` must be a member of {self.type.__name__}, '
+                f'it was {value!r}')
+
+    def __repr__(self):
+        return f'<member_of validator for {self.type!r}>'
+
+
+def array_of(typecode, *, ndarray=False):
+    """
+    Return a validator which checks that the value is an `array.array` of
+    `typecode`, or with `ndarray=True` a 1-d NumPy array of the matching
+    dtype. Only the array's type is checked, not each item.
+    """
+    if ndarray:
+        import numpy
+        kind = numpy.ndarray
+    else:
+        kind = array.array
+    return _ArrayOfValidator(typecode, kind)
+
+
+@attr.s(repr=False, slots=True, hash=True)
+class _ArrayOfValidator:
+    typecode = attr.ib()
+    kind = attr.ib()
+
+    def __call__(self, inst, attr, value):
+        if value.__class__ is not self.kind:
+            ok = False
+        elif self.kind is array.array:
+            ok = value.typecode == self.typecode
+        else:
+            # Compare dtypes, as several typecodes can mean the same one
+            ok = value.ndim == 1 and value.dtype == self.typecode
+        if not ok:
+            raise TypeError(
+                f'`{attr.name}` must be {self!r}, it was {value!r}')
+
+    def __repr__(self):
+        kind = 'an array' if self.kind is array.array else 'a 1-d ndarray'
+        return f'{kind} of typecode {self.typecode!r}'
+
+
 def all_of(*validators):
     """
     Simply invokes all the given validators
@@ -63,11 +125,19 @@ def all_of(*validators):
 
     """
 
-    def _all_of(inst, attr, value):
-        for validator in validators:
+    return _AllOfValidator(validators)
+
+
+@attr.s(repr=False, slots=True)
+class _AllOfValidator:
+    validators = attr.ib()
+
+    def __call__(self, inst, attr, value):
+        for validator in self.validators:
             validator(inst, attr, value)
 
-    return _all_of
+    def __repr__(self):
+        return f'<all_of validator for {self.validators!r}>'
 
 
 @wrap_kind()
@@ -125,18 +195,156 @@ class _CollectionOfValidator:
                 f'`{attr.name}` must be a collection type, it was `{value}`')
 
         typ = _transform(self.type, instance_type=type(inst))
-        ok = [isinstance(item, typ) for item in value]
-        if not all(ok):
-            errors = []
-            for i, v in enumerate(ok):
-                if not v:
-                    as_list = list(value)
-                    errors.append(
-                        f'`{as_list[i]}` is not of type `{self.type!r}` at '
-                        f'index {i} (attribute `{attr.name}` of `{type(inst)})`'
-                    )
-            raise TypeError(''.join(errors))
+        for item in value:
+            if not isinstance(item, typ):
+                break
+        else:
+            return
+
+        # Only go back over the items to report on them when there's a
+        # problem
+        errors = []
+        for i, item in enumerate(value):
+            if not isinstance(item, typ):
+                errors.append(
+                    f'`{item}` is not of type `{self.type!r}` at '
+                    f'index {i} (attribute `{attr.name}` of `{type(inst)})`')
+        raise TypeError(''.join(errors))
 
     def __repr__(self):
         return ("<collection_of validator for type {type!r}>"
                 .format(type=self.type))
+
+
+# The class of attrs' `optional` validators
+_OptionalValidator = type(optional(all_of()))
+
+
+def fuse(validator):
+    """
+    Return one generated function that does the work of `validator`, for
+    `_field` to give attrs in its place. The `all_of` and `optional`
+    validators a field's validator is built from are flattened into a
+    single body: `instance_of`, `collection_of` and `member_of` checks are
+    inlined against tuples of types worked out once (deferred kinds the
+    first time a value passes), an optional field returns early on None,
+    and any other validator is called directly.
+
+    When an inlined check fails, the validator it came from is called to
+    raise its usual error. Returns None if there's nothing to check.
+
+    If there are `collection_of` checks, the function's `without_items`
+    attribute is another that checks everything but the items, for values
+    whose items are known to be valid already.
+    """
+    steps = []
+    _flatten(validator, False, steps)
+    if not steps:
+        return None
+    validate = _generate(steps, scan=True)
+    if any([v.__class__ is _CollectionOfValidator for v, guarded in steps]):
+        validate.without_items = _generate(steps, scan=False)
+    return validate
+
+
+def _generate(steps, *, scan):
+    namespace = {'_COLLECTION_TYPES': COLLECTION_TYPES}
+    lines = ['def validate(inst, attr, value):']
+    if all([guarded for v, guarded in steps]):
+        lines += ['    if value is None:', '        return']
+        steps = [(v, False) for v, guarded in steps]
+    for i, (v, guarded) in enumerate(steps):
+        indent = '    '
+        if guarded:
+            lines.append('    if value is not None:')
+            indent = '        '
+        lines += [
+            indent + line for line in _step(i, v, namespace, scan=scan)
+        ]
+    exec(compile('\n'.join(lines), '<attrkid validator>', 'exec'), namespace)
+    return namespace['validate']
+
+
+def _flatten(validator, guarded, steps):
+    """ Append (validator, whether it's skipped for None) to `steps` """
+    if validator is None:
+        return
+    if isinstance(validator, _AllOfValidator):
+        for v in validator.validators:
+            _flatten(v, guarded, steps)
+    elif isinstance(validator, _OptionalValidator):
+        _flatten(validator.validator, True, steps)
+    else:
+        steps.append((validator, guarded))
+
+
+def _step(i, validator, namespace, *, scan):
+    """ Return the lines of code (unindented) checking `validator` """
+    types, validator_name = f'_t{i}', f'_v{i}'
+    namespace[validator_name] = validator
+    fail = f'    {validator_name}(inst, attr, value)'
+    if validator.__class__ is _MemberOfValidator:
+        namespace[types] = validator.type
+        return [f'if value.__class__ is not {types}:', fail]
+    if validator.__class__ is _CollectionOfValidator and not scan:
+        return ['if not isinstance(value, _COLLECTION_TYPES):', fail]
+    if validator.__class__ not in (_DeferredInstanceOfValidator,
+                                   _CollectionOfValidator):
+        return [fail.strip()]
+
+    folded, has_self, deferred = _fold(validator.type, resolve=False)
+    namespace[types] = folded
+    if deferred:
+        # Values of the types resolved so far pass; anything else goes to
+        # the validator, after which the rest are resolved too
+        namespace[validator_name] = _resolve_later(validator, namespace, i)
+    lines = []
+    if has_self:
+        lines.append(f'types = {types} + (inst.__class__, )')
+        types = 'types'
+    if validator.__class__ is _DeferredInstanceOfValidator:
+        return lines + [f'if not isinstance(value, {types}):', fail]
+    return [
+        'if isinstance(value, _COLLECTION_TYPES):',
+        *['    ' + line for line in lines],
+        '    for item in value:',
+        f'        if not isinstance(item, {types}):',
+        '        ' + fail,
+        '            break',
+        'else:',
+        fail,
+    ]
+
+
+def _fold(kinds, *, resolve):
+    """
+    Return the concrete types in `kinds`, whether SELF is among them, and
+    whether there are deferred kinds left out (unless `resolve`).
+    """
+    types = ()
+    has_self = deferred = False
+    for k in kinds:
+        if k is SELF:
+            has_self = True
+        elif isinstance(k, ProxyKind):
+            if not resolve and not isinstance(k, (ImmediateKind, UnionKind)):
+                deferred = True
+                continue
+            t, s, d = _fold(k.get(), resolve=resolve)
+            types += t
+            has_self = has_self or s
+            deferred = deferred or d
+        else:
+            types += k,
+    return types, has_self, deferred
+
+
+def _resolve_later(validator, namespace, i):
+
+    def _validate(inst, attr, value):
+        validator(inst, attr, value)
+        # It passed, so the deferred kinds can be imported now
+        namespace[f'_t{i}'] = _fold(validator.type, resolve=True)[0]
+        namespace[f'_v{i}'] = validator
+
+    return _validate
@@ -0,0 +1,102 @@
+"""
+Measure the worst event loop lag while several large batches of orders
+are decoded concurrently, with `from_dict` blocking and with
+`aio.from_dict` yielding every `budget` nodes. Also time `aiter_from_json`
+on one large batch fed in 4 KB chunks, against a quarter of it, which
+should take about a quarter as long.
+
+    python -m benchmarks.bench_aio [n]
+"""
+import asyncio
+import gc
+import json
+import sys
+import time
+import timeit
+
+import attr
+
+from attrkid import aio, from_dict, to_dict
+from attrkid.fields import list_field
+
+from .models import Order, make_order
+
+
+@attr.s(frozen=True)
+class Batch:
+    orders = list_field(Order)
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+async def _worst_lag(decode, payloads):
+    lags = []
+    done = False
+
+    async def ticker():
+        last = time.perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = time.perf_counter()
+            lags.append(now - last)
+            last = now
+
+    tick = asyncio.ensure_future(ticker())
+    await asyncio.sleep(0)
+    await asyncio.gather(*[decode(p) for p in payloads])
+    done = True
+    await tick
+    return max(lags) * 1000
+
+
+def _stream(text, size=4096):
+    encoded = text.encode('utf-8')
+
+    async def chunks():
+        for i in range(0, len(encoded), size):
+            yield encoded[i:i + size]
+
+    async def collect():
+        return [b async for b in aio.aiter_from_json(Batch, chunks())]
+
+    return asyncio.run(collect())
+
+
+def main(n=2000, budget=100, repeat=5):
+    batch = to_dict(Batch(orders=[make_order(i) for i in range(n)]))
+    payloads = [batch] * 3
+
+    async def blocking(data):
+        return from_dict(Batch, data)
+
+    async def cooperative(data):
+        return await aio.from_dict(Batch, data, budget=budget)
+
+    print(f'3 batches of {n} orders, worst event loop lag')
+    # Collector pauses aren't what we're measuring
+    gc.disable()
+    try:
+        for name, decode in (
+            ('from_dict', blocking),
+            (f'aio.from_dict, budget {budget}', cooperative),
+        ):
+            lag = min([
+                asyncio.run(_worst_lag(decode, payloads))
+                for _ in range(repeat)
+            ])
+            print(f'  {name:30} {lag:>8.1f} ms')
+    finally:
+        gc.enable()
+
+    print('aiter_from_json, one batch in 4 KB chunks')
+    for count in (n // 4, n):
+        text = json.dumps({'orders': batch['orders'][:count]})
+        t = _time(lambda: _stream(text), repeat)
+        name = f'{count} orders, {len(text) // 1024} KB'
+        print(f'  {name:30} {t:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
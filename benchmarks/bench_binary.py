@@ -0,0 +1,50 @@
+"""
+Compare the size and speed of `attrkid.binary` against JSON of `to_dict`.
+
+    python -m benchmarks.bench_binary
+"""
+import json
+import timeit
+
+from attrkid import binary, from_dict, to_dict
+
+from .models import Order, make_order
+
+
+def main(n=1000, repeat=5):
+    orders = [make_order(i) for i in range(n)]
+
+    as_json = [json.dumps(to_dict(o)) for o in orders]
+    as_binary = [binary.dumps(o) for o in orders]
+    json_size = sum(len(s.encode('utf-8')) for s in as_json)
+    binary_size = sum(len(b) for b in as_binary)
+
+    def json_encode():
+        for o in orders:
+            json.dumps(to_dict(o))
+
+    def json_decode():
+        for s in as_json:
+            from_dict(Order, json.loads(s))
+
+    def binary_encode():
+        for o in orders:
+            binary.dumps(o)
+
+    def binary_decode():
+        for b in as_binary:
+            binary.loads(Order, b)
+
+    print(f'{n} orders')
+    print(f'{"":8} {"bytes":>10} {"encode ms":>10} {"decode ms":>10}')
+    for name, size, enc, dec in (
+        ('json', json_size, json_encode, json_decode),
+        ('binary', binary_size, binary_encode, binary_decode),
+    ):
+        enc_t = min(timeit.repeat(enc, number=1, repeat=repeat)) * 1000
+        dec_t = min(timeit.repeat(dec, number=1, repeat=repeat)) * 1000
+        print(f'{name:8} {size:>10} {enc_t:>10.1f} {dec_t:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+Time `to_dict` and `from_dict` on models with one large list, tuple or set
+field, of plain ints and of nested instances, and show the peak memory
+`from_dict` allocates on top of its input. Decoding builds each collection
+once, so for plain items the peak is about one copy of the collection.
+
+    python -m benchmarks.bench_collections [n]
+"""
+import sys
+import timeit
+import tracemalloc
+
+import attr
+
+from attrkid import from_dict, to_dict
+from attrkid.fields import int_field, list_field, set_field, tuple_field
+
+
+@attr.s(frozen=True)
+class Point:
+    x = int_field()
+
+
+def _model(field):
+
+    @attr.s
+    class Holder:
+        items = field
+
+    return Holder
+
+
+def _peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main(n=100000, repeat=5):
+    print(f'{n} items')
+    print(f'{"":18} {"encode ms":>10} {"decode ms":>10} {"decode KiB":>11}')
+    for name, field, items in (
+        ('list of int', list_field(int), list(range(n))),
+        ('tuple of int', tuple_field(int), tuple(range(n))),
+        ('set of int', set_field(int), frozenset(range(n))),
+        ('list of Point', list_field(Point), [Point(x=i) for i in range(n)]),
+        ('set of Point', set_field(Point),
+         frozenset(Point(x=i) for i in range(n))),
+    ):
+        Holder = _model(field)
+        holder = Holder(items=items)
+        as_dict = to_dict(holder)
+        assert holder == from_dict(Holder, as_dict)
+
+        enc_t = min(
+            timeit.repeat(lambda: to_dict(holder), number=1,
+                          repeat=repeat)) * 1000
+        dec_t = min(
+            timeit.repeat(
+                lambda: from_dict(Holder, as_dict), number=1,
+                repeat=repeat)) * 1000
+        peak = _peak(lambda: from_dict(Holder, as_dict)) / 1024
+        print(f'{name:18} {enc_t:>10.1f} {dec_t:>10.1f} {peak:>11.0f}')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
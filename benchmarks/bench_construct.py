@@ -0,0 +1,54 @@
+"""
+Time building orders directly (as business logic does, without `from_dict`)
+with the fields' fused validators, against the same models with each
+field's validator left as the chain of `all_of`, `optional` and
+`instance_of` calls it's built from.
+
+    python -m benchmarks.bench_construct [n]
+"""
+import sys
+import timeit
+
+import attr
+
+from attrkid.fields import int_field, string_field
+from attrkid.validators import all_of, instance_of
+
+from .models import make_order
+
+
+def _nonempty(inst, attr, value):
+    if not value:
+        raise ValueError(f'{attr.name} must not be empty')
+
+
+@attr.s(frozen=True)
+class Fused:
+    sku = string_field(validator=_nonempty)
+    quantity = int_field()
+    note = string_field(is_optional=True, default=None)
+
+
+@attr.s(frozen=True)
+class Chained:
+    sku = attr.ib(validator=all_of(instance_of(str), _nonempty))
+    quantity = attr.ib(validator=instance_of(int))
+    note = attr.ib(
+        validator=attr.validators.optional(instance_of(str)), default=None)
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main(n=100000, repeat=5):
+    print(f'{n} instances')
+    for name, cls in (('fused', Fused), ('chained', Chained)):
+        t = _time(lambda: [cls('SKU-1', i, 'x') for i in range(n)], repeat)
+        print(f'{name:>24} {t:>10.1f} ms')
+    t = _time(lambda: [make_order(i) for i in range(n // 10)], repeat)
+    print(f'{"make_order (fused)":>24} {t:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
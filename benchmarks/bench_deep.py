@@ -0,0 +1,50 @@
+"""
+Time `to_dict` and `from_dict` on a 10k-deep SELF-referencing model, which
+is handled by the explicit-stack engine, against a flat model with the same
+number of nodes. Also time shallow orders with the engine forced, to show
+what recursion saves for the first `MAX_RECURSION_DEPTH` levels.
+
+    python -m benchmarks.bench_deep
+"""
+import timeit
+
+from attrkid import from_dict, serde, to_dict
+
+from .models import Employee, Order, make_chain, make_flat, make_order
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main(depth=10000, n_orders=1000, repeat=5):
+    print(f'{"":24} {"encode ms":>10} {"decode ms":>10}')
+
+    for name, employee in (
+        (f'chain, depth {depth}', make_chain(depth)),
+        (f'flat, {depth} reports', make_flat(depth)),
+    ):
+        as_dict = to_dict(employee)
+        enc_t = _time(lambda: to_dict(employee), repeat)
+        dec_t = _time(lambda: from_dict(Employee, as_dict), repeat)
+        print(f'{name:24} {enc_t:>10.1f} {dec_t:>10.1f}')
+
+    orders = [make_order(i) for i in range(n_orders)]
+    dicts = [to_dict(o) for o in orders]
+    max_depth = serde.MAX_RECURSION_DEPTH
+    for name, limit in (
+        (f'{n_orders} orders', max_depth),
+        (f'{n_orders} orders, engine', 0),
+    ):
+        serde.MAX_RECURSION_DEPTH = limit
+        try:
+            enc_t = _time(lambda: [to_dict(o) for o in orders], repeat)
+            dec_t = _time(lambda: [from_dict(Order, d) for d in dicts],
+                          repeat)
+        finally:
+            serde.MAX_RECURSION_DEPTH = max_depth
+        print(f'{name:24} {enc_t:>10.1f} {dec_t:>10.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Time changing one field of a frozen model holding a large collection, with
+`attr.evolve` (which validates every field again) and `attrkid.evolve`
+(which validates only the changed one), and moving the same large tuple
+between instances, which `attrkid.evolve` only checks the items of once.
+
+    python -m benchmarks.bench_evolve [n] [size]
+"""
+import sys
+import timeit
+
+import attr
+
+from attrkid import evolve
+from attrkid.fields import int_field, set_field, tuple_field
+
+from .models import LineItem, make_order
+
+
+@attr.s(frozen=True)
+class Basket:
+    version = int_field()
+    tags = set_field(str)
+    items = tuple_field(LineItem)
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main(n=1000, size=1000, repeat=5):
+    items = tuple(make_order(0, n_items=size).items)
+    basket = Basket(
+        version=0, tags=frozenset([f'tag {i}' for i in range(size)]),
+        items=items)
+    print(f'{n} evolves, {size} items')
+    for name, func in (
+        ('attr.evolve', lambda: attr.evolve(basket, version=1)),
+        ('attrkid.evolve', lambda: evolve(basket, version=1)),
+        ('attr.evolve items', lambda: attr.evolve(basket, items=items)),
+        ('attrkid.evolve items', lambda: evolve(basket, items=items)),
+    ):
+        t = _time(lambda: [func() for _ in range(n)], repeat)
+        print(f'{name:>24} {t:>10.1f} ms')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
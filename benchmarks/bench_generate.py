@@ -0,0 +1,40 @@
+"""
+Time making orders with `attrkid.testing.generate`, against building them
+by hand with `make_order`, and time `to_dict` and `from_dict` on the
+generated ones, whose shapes (collection sizes, optional fields) vary as
+real data does.
+
+    python -m benchmarks.bench_generate [n]
+"""
+import sys
+import timeit
+
+from attrkid import from_dict, to_dict
+from attrkid.testing import generate
+
+from .models import Order, make_order
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main(n=1000, repeat=5):
+    print(f'{n} orders')
+    make_t = _time(lambda: [make_order(i) for i in range(n)], repeat)
+    gen_t = _time(
+        lambda: list(generate(Order, n, seed=0, collection_size=(0, 20))),
+        repeat)
+    print(f'{"make_order ms":>24} {make_t:>10.1f}')
+    print(f'{"generate ms":>24} {gen_t:>10.1f}')
+
+    orders = list(generate(Order, n, seed=0, collection_size=(0, 20)))
+    dicts = [to_dict(o) for o in orders]
+    enc_t = _time(lambda: [to_dict(o) for o in orders], repeat)
+    dec_t = _time(lambda: [from_dict(Order, d) for d in dicts], repeat)
+    print(f'{"generated to_dict ms":>24} {enc_t:>10.1f}')
+    print(f'{"generated from_dict ms":>24} {dec_t:>10.1f}')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
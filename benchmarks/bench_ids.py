@@ -0,0 +1,72 @@
+"""
+Time creating instances whose primary keys are made by each of the
+built-in `auto_func`s, against calling `uuid.uuid4().hex` directly, and
+show how the IDs land in a sorted index.
+
+Locality is measured by inserting a sample of each kind of ID, in the order
+they were made, into a sorted list (as a B-tree index on the key would): the
+"append" column is the share of inserts landing at the very end, and "mean
+pos" the average insert position as a fraction of the index's size. Random
+UUIDs land all over the index (a mean of about 0.5), so each insert touches
+a different page; time-ordered IDs always land at the end, on the one page
+that's already being written.
+
+    python -m benchmarks.bench_ids [n]
+"""
+import bisect
+import sys
+import time
+import uuid
+
+import attr
+
+from attrkid.fields import new_uuid, primary_key, string_field
+from attrkid.ids import new_ulid, new_uuid7
+
+
+def _stdlib_uuid4():
+    return uuid.uuid4().hex
+
+
+def _model(auto_func):
+
+    @attr.s
+    class Row:
+        id = primary_key(auto_func=auto_func)
+        name = string_field(default='x')
+
+    return Row
+
+
+def _locality(ids):
+    index = []
+    appended = 0
+    total = 0.0
+    for i in ids:
+        pos = bisect.bisect(index, i)
+        if pos == len(index):
+            appended += 1
+        total += pos / (len(index) or 1)
+        index.insert(pos, i)
+    return appended / len(ids), total / len(ids)
+
+
+def main(n=1000000, sample=20000):
+    print(f'{n} instances')
+    print(f'{"":16} {"create s":>10} {"append":>8} {"mean pos":>9}')
+    for name, auto_func in (
+        ('uuid.uuid4', _stdlib_uuid4),
+        ('new_uuid', new_uuid),
+        ('new_uuid7', new_uuid7),
+        ('new_ulid', new_ulid),
+    ):
+        Row = _model(auto_func)
+        start = time.perf_counter()
+        rows = [Row() for _ in range(n)]
+        elapsed = time.perf_counter() - start
+        appended, mean_pos = _locality([r.id for r in rows[:sample]])
+        print(f'{name:16} {elapsed:>10.2f} {appended:>8.1%} {mean_pos:>9.2f}')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,47 @@
+"""
+Time `to_json` and `from_json` on orders with each JSON backend, and the
+JSON step alone (`dumps` of the dicts from `to_dict`, and `loads`).
+Backends that aren't installed are skipped.
+
+    python -m benchmarks.bench_json [n]
+"""
+import sys
+import timeit
+
+from attrkid import from_json, jsonlib, to_dict, to_json
+from attrkid.options import SerdeOptions
+
+from .models import Order, make_order
+
+
+def _time(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main(n=1000, repeat=5):
+    orders = [make_order(i) for i in range(n)]
+    dicts = [to_dict(o) for o in orders]
+
+    print(f'{n} orders')
+    print(f'{"":12} {"dumps ms":>9} {"loads ms":>9} {"to_json ms":>11} '
+          f'{"from_json ms":>13}')
+    for name in jsonlib.BACKEND_NAMES:
+        backend = jsonlib.get_backend(name)
+        if backend.name != name:
+            print(f'{name:12} (not installed)')
+            continue
+        options = SerdeOptions(json_backend=name)
+        texts = [backend.dumps(d) for d in dicts]
+        dumps_t = _time(lambda: [backend.dumps(d) for d in dicts], repeat)
+        loads_t = _time(lambda: [backend.loads(t) for t in texts], repeat)
+        to_t = _time(lambda: [to_json(o, options=options) for o in orders],
+                     repeat)
+        from_t = _time(
+            lambda: [from_json(Order, t, options=options) for t in texts],
+            repeat)
+        print(f'{name:12} {dumps_t:>9.1f} {loads_t:>9.1f} {to_t:>11.1f} '
+              f'{from_t:>13.1f}')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
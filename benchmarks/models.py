@@ -0,0 +1,79 @@
+import datetime
+import decimal
+
+import attr
+import pytz
+
+from attrkid.constants import SELF
+from attrkid.fields import (
+    bool_field,
+    datetime_field,
+    decimal_field,
+    int_field,
+    list_field,
+    object_field,
+    string_field,
+)
+
+
+@attr.s(frozen=True)
+class Address:
+    line_1 = string_field()
+    line_2 = string_field()
+    postcode = string_field()
+
+
+@attr.s(frozen=True)
+class LineItem:
+    sku = string_field()
+    quantity = int_field()
+    price = decimal_field()
+
+
+@attr.s(frozen=True)
+class Order:
+    id = int_field()
+    created = datetime_field()
+    paid = bool_field()
+    address = object_field(Address)
+    items = list_field(LineItem)
+
+
+def make_order(i, n_items=10):
+    return Order(
+        id=i,
+        created=datetime.datetime(2020, 1, 1, 12, 0, i % 60,
+                                  tzinfo=pytz.utc),
+        paid=bool(i % 2),
+        address=Address(
+            line_1=f'{i} Some Street', line_2='Some Town',
+            postcode='AB12 3AB'),
+        items=[
+            LineItem(
+                sku=f'SKU-{j:05d}',
+                quantity=j,
+                price=decimal.Decimal(f'{j}.99')) for j in range(n_items)
+        ],
+    )
+
+
+@attr.s(frozen=True)
+class Employee:
+    name = string_field()
+    manager = object_field(SELF, is_optional=True, default=None)
+    reports = list_field(SELF)
+
+
+def make_chain(depth):
+    """ An employee `depth` managers deep """
+    employee = Employee(name='ceo')
+    for i in range(depth):
+        employee = Employee(name=f'employee {i}', manager=employee)
+    return employee
+
+
+def make_flat(n):
+    """ An employee with `n` reports, for the same number of nodes """
+    return Employee(
+        name='ceo',
+        reports=[Employee(name=f'employee {i}') for i in range(n)])
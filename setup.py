@@ -12,6 +12,8 @@ setup(
     keywords=["attrs"],
     packages=find_packages(),
     include_package_data=True,
+    # contextvars, for the intern table in force
+    python_requires='>=3.7',
     install_requires=[
         'attrs>=18.2.0',
         'python-dateutil>=2.7.5',
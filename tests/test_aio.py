@@ -0,0 +1,454 @@
+import asyncio
+import json
+
+import attr
+import pytest
+
+
+def test_from_dict_matches_sync():
+    from attrkid import from_dict
+    from attrkid import aio
+    from attrkid.fields import (
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class Leaf:
+        name = string_field()
+
+    @attr.s
+    class Tag:
+        label = string_field()
+
+    @attr.s
+    class Node:
+        id = int_field()
+        tag = object_field(
+            UnionKind(('leaf', Leaf), ('tag', Tag)), is_optional=True)
+        children = list_field(Leaf)
+
+    @attr.s
+    class Batch:
+        nodes = list_field(Node)
+
+    data = {
+        'nodes': [{
+            'id': i,
+            'tag': {
+                'tag': {
+                    'label': str(i)
+                }
+            },
+            'children': [{
+                'name': f'{i}-{n}'
+            } for n in range(3)],
+        } for i in range(50)]
+    }
+    result = asyncio.run(aio.from_dict(Batch, data, budget=3))
+    assert from_dict(Batch, data) == result
+    assert Tag('7') == result.nodes[7].tag
+
+    with pytest.raises(ValueError):
+        asyncio.run(aio.from_dict(Batch, data, budget=0))
+
+
+def test_from_dict_errors_match_sync():
+    from attrkid import from_dict
+    from attrkid import aio
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import (
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class Leaf:
+        name = string_field()
+
+    @attr.s
+    class Tag:
+        label = string_field()
+
+    @attr.s
+    class Node:
+        id = int_field()
+        tag = object_field(
+            UnionKind(('leaf', Leaf), ('tag', Tag)), is_optional=True)
+        children = list_field(Leaf)
+
+    @attr.s
+    class Batch:
+        nodes = list_field(Node)
+
+    data = {
+        'nodes': [
+            {
+                'id': 0,
+                'tag': {
+                    'leaf': {
+                        'name': '0'
+                    }
+                },
+                'children': [{
+                    'name': '0-0'
+                }],
+            },
+            {
+                'id': 1,
+                'tag': {
+                    'tag': {
+                        'label': '1'
+                    }
+                },
+                'children': [{
+                    'name': 1
+                }],
+            },
+        ]
+    }
+    with pytest.raises(ValidationError) as sync_info:
+        from_dict(Batch, data)
+    with pytest.raises(ValidationError) as aio_info:
+        asyncio.run(aio.from_dict(Batch, data, budget=1))
+
+    sync_exc, aio_exc = sync_info.value, aio_info.value
+    while isinstance(sync_exc, ValidationError):
+        assert isinstance(aio_exc, ValidationError)
+        assert len(sync_exc.errors) == len(aio_exc.errors)
+        if 'field' not in sync_exc.errors[0]:
+            break
+        assert sync_exc.errors[0]['field'] is aio_exc.errors[0]['field']
+        sync_exc, aio_exc = sync_exc.exc, aio_exc.exc
+
+
+@pytest.mark.parametrize('as_array', [True, False])
+def test_aiter_from_json(as_array):
+    from attrkid import aio
+    from attrkid.fields import (
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class Leaf:
+        name = string_field()
+
+    @attr.s
+    class Tag:
+        label = string_field()
+
+    @attr.s
+    class Node:
+        id = int_field()
+        tag = object_field(
+            UnionKind(('leaf', Leaf), ('tag', Tag)), is_optional=True)
+        children = list_field(Leaf)
+
+    nodes = [{
+        'id': i,
+        'tag': {
+            'tag': {
+                'label': str(i)
+            }
+        },
+        'children': [{
+            'name': f'{i}-{n}'
+        } for n in range(3)],
+    } for i in range(20)]
+    nodes[3]['children'][0]['name'] = 'café ☃'
+    if as_array:
+        text = json.dumps(nodes, indent=1)
+    else:
+        text = '\n'.join(json.dumps(n) for n in nodes) + '\n'
+    encoded = text.encode('utf-8')
+
+    async def chunks(size):
+        for i in range(0, len(encoded), size):
+            yield encoded[i:i + size]
+
+    async def collect(size):
+        return [n async for n in aio.aiter_from_json(Node, chunks(size))]
+
+    for size in (1, 7, len(encoded)):
+        result = asyncio.run(collect(size))
+        assert [n['id'] for n in nodes] == [n.id for n in result]
+        assert 'café ☃' == result[3].children[0].name
+
+    async def truncated():
+        yield b'[{"id": 1, "children": []}, {"id": '
+
+    async def read_truncated():
+        return [n async for n in aio.aiter_from_json(Node, truncated())]
+
+    with pytest.raises(ValueError):
+        asyncio.run(read_truncated())
+
+
+def test_aiter_from_json_backend(monkeypatch):
+    from attrkid import aio, jsonlib
+    from attrkid.fields import int_field
+    from attrkid.options import SerdeOptions
+
+    @attr.s
+    class Item:
+        id = int_field()
+
+    calls = []
+
+    def loads(data):
+        calls.append(data)
+        return json.loads(data)
+
+    monkeypatch.setattr(jsonlib, '_loaded',
+                        {'simplejson': jsonlib.JSONBackend(
+                            name='simplejson', dumps=None, loads=loads)})
+    options = SerdeOptions(json_backend='simplejson')
+
+    async def chunks():
+        yield b'[{"id": 1}, {"id"'
+        yield b': 2}]'
+
+    async def collect():
+        return [
+            item async for item in aio.aiter_from_json(
+                Item, chunks(), options=options)
+        ]
+
+    assert [Item(1), Item(2)] == asyncio.run(collect())
+    # Each value is handed to the chosen backend whole
+    assert ['{"id": 1}', '{"id": 2}'] == calls
+
+
+def test_yields_per_budget(monkeypatch):
+    """
+    Decoding gives control back to the event loop once per `budget` nodes,
+    so concurrent decodes take turns. (python -m benchmarks.bench_aio
+    measures the effect on event loop lag.)
+    """
+    from attrkid import aio
+    from attrkid.engine import Decoder
+    from attrkid.fields import int_field, list_field, string_field
+
+    @attr.s
+    class Leaf:
+        name = string_field()
+
+    @attr.s
+    class Node:
+        id = int_field()
+        children = list_field(Leaf)
+
+    @attr.s
+    class Batch:
+        nodes = list_field(Node)
+
+    data = {
+        'nodes': [{
+            'id': i,
+            'children': [{
+                'name': f'{i}-{n}'
+            } for n in range(3)],
+        } for i in range(500)]
+    }
+    decoder = Decoder(Batch, data)
+    nodes = 0
+    while not decoder.run(1):
+        nodes += 1
+
+    sleep = asyncio.sleep
+    yields = []
+
+    async def counting_sleep(delay, *args, **kwargs):
+        yields.append(asyncio.current_task())
+        return await sleep(delay, *args, **kwargs)
+
+    monkeypatch.setattr(asyncio, 'sleep', counting_sleep)
+
+    async def run(budget):
+        tasks = [
+            asyncio.ensure_future(aio.from_dict(Batch, data, budget=budget))
+            for _ in range(3)
+        ]
+        return tasks, await asyncio.gather(*tasks)
+
+    for budget in (1, 100, 1000, nodes + 1):
+        yields.clear()
+        tasks, results = asyncio.run(run(budget))
+        assert all(len(r.nodes) == 500 for r in results)
+        # They take turns, rather than each running to the end
+        assert tasks * (nodes // budget) == yields
+
+
+def test_decode_routes():
+    from concurrent.futures import ThreadPoolExecutor
+
+    from attrkid import aio
+    from attrkid.fields import (
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class Leaf:
+        name = string_field()
+
+    @attr.s
+    class Tag:
+        label = string_field()
+
+    @attr.s
+    class Node:
+        id = int_field()
+        tag = object_field(
+            UnionKind(('leaf', Leaf), ('tag', Tag)), is_optional=True)
+        children = list_field(Leaf)
+
+    small = {'id': 1, 'tag': {'tag': {'label': '1'}}, 'children': []}
+    large = {'id': 2, 'children': [{'name': 'x' * 100}] * 100}
+    large_text = json.dumps(large)
+
+    aio.reset_decode_stats()
+    # A thread pool stands in for the process pool; all that matters here
+    # is which executor is picked.
+    with ThreadPoolExecutor(1) as executor, ThreadPoolExecutor(
+            1) as process_executor:
+
+        async def run():
+            return [
+                await aio.decode(Node, small, inline_threshold=1000),
+                await aio.decode(
+                    Node, large, executor=executor, inline_threshold=1000),
+                await aio.decode(
+                    Node,
+                    large_text,
+                    inline_threshold=1000,
+                    process_executor=process_executor,
+                    process_threshold=5000),
+                # Parsed data isn't worth pickling across to a process
+                await aio.decode(
+                    Node,
+                    large,
+                    inline_threshold=1000,
+                    process_executor=process_executor,
+                    process_threshold=5000),
+            ]
+
+        results = asyncio.run(run())
+
+    assert [1, 2, 2, 2] == [r.id for r in results]
+    assert 100 == len(results[2].children)
+    assert (1, 2, 1) == aio.decode_stats()
+    inline, thread, process = aio.decode_stats(size=True)
+    assert inline < 1000 <= thread
+    assert len(large_text) == process
+
+    aio.reset_decode_stats()
+    assert (0, 0, 0) == aio.decode_stats()
+
+
+def test_stream_parser_large_value():
+    """
+    Each chunk is scanned once, however much of a value has arrived before
+    it. (python -m benchmarks.bench_aio times this.)
+    """
+    from attrkid.aio import _StreamParser
+
+    class CountingParser(_StreamParser):
+        scanned = 0
+
+        def _scan(self, text, pos):
+            end = super()._scan(text, pos)
+            self.scanned += (len(text) if end < 0 else end) - pos
+            return end
+
+    def parse(text, size):
+        parser = CountingParser()
+        values = []
+        for i in range(0, len(text), size):
+            parser.feed(text[i:i + size])
+            values.extend(parser.values())
+        parser.close()
+        values.extend(parser.values())
+        parser.finish()
+        return values, parser.scanned
+
+    def value(n):
+        return {'leaves': [{'name': f'a "quoted" \\ {i}'} for i in range(n)]}
+
+    # One value of over 1 MB, in 4 KB chunks
+    large = value(40000)
+    text = json.dumps(large)
+    assert len(text) > 1000000
+    values, scanned = parse(text, 4096)
+    assert [large] == values
+    # Rescanning the buffer for every chunk made this quadratic
+    assert len(text) == scanned
+
+    # Escapes and strings split across chunks
+    for size in (1, 2, 3):
+        text = json.dumps(value(5))
+        assert ([value(5)], len(text)) == parse(text, size)
+
+
+def test_options_and_context():
+    import uuid
+    from concurrent.futures import ThreadPoolExecutor
+
+    from attrkid import aio, to_dict
+    from attrkid.codec import CODECS
+    from attrkid.fields import _field, list_field, string_field
+    from attrkid.intern import interning
+    from attrkid.options import SerdeOptions
+
+    @attr.s(frozen=True)
+    class Host:
+        id = _field(uuid.UUID)
+        name = string_field()
+
+    @attr.s
+    class Hosts:
+        hosts = list_field(Host)
+
+    registry = CODECS.copy()
+    registry.register(
+        uuid.UUID,
+        encode=lambda value, *, options: value.int,
+        decode=lambda cls, raw: cls(int=raw))
+    options = SerdeOptions(codecs=registry, share_references=True)
+    host = Host(id=uuid.uuid4(), name='a')
+    data = to_dict(Hosts([host, host]), options=options)
+
+    async def run(executor):
+        with interning() as table:
+            return table, [
+                await aio.from_dict(Hosts, data, options=options, budget=1),
+                await aio.decode(
+                    Hosts, data, options=options, inline_threshold=0,
+                    executor=executor),
+                # The intern table in force is used in the thread too
+                await aio.decode(
+                    Hosts, to_dict(Hosts([host, host])), inline_threshold=0,
+                    executor=executor),
+            ]
+
+    with ThreadPoolExecutor(1) as executor:
+        table, results = asyncio.run(run(executor))
+    for result in results[:2]:
+        assert host == result.hosts[0]
+        assert result.hosts[0] is result.hosts[1]
+    # Interned, in the thread: the one instance made by the first decode
+    assert results[2].hosts[0] is results[2].hosts[1] is results[0].hosts[0]
+    assert table.hits >= 3
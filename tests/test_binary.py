@@ -0,0 +1,233 @@
+import datetime
+import decimal
+import io
+import json
+
+import attr
+import pytest
+import pytz
+
+
+def test_round_trip():
+    from attrkid import binary
+    from attrkid.constants import SELF
+    from attrkid.fields import (
+        any_field,
+        bool_field,
+        bytes_field,
+        datetime_field,
+        decimal_field,
+        float_field,
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+        tuple_field,
+    )
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class A:
+        i = int_field()
+        s = string_field(is_optional=True)
+
+    @attr.s
+    class B:
+        f = float_field()
+
+    @attr.s
+    class M:
+        a = object_field(A)
+        u = object_field(UnionKind(('a', A), ('b', B)))
+        d = decimal_field()
+        dt = datetime_field()
+        by = bytes_field()
+        an = any_field()
+        b = bool_field()
+        sub = object_field(SELF, is_optional=True, default=None)
+        items = list_field(A)
+        t = tuple_field(int)
+
+    m = M(
+        a=A(i=-5, s=None),
+        u=B(f=1.5),
+        d=decimal.Decimal('-12.340'),
+        dt=datetime.datetime(2017, 11, 13, 15, 12, 0, 1, tzinfo=pytz.utc),
+        by=b'\x00\xff',
+        an={'k': [1, None, 'x']},
+        b=True,
+        items=[A(i=1, s='é'), A(i=2**70, s='')],
+        t=(1, 2, 3),
+    )
+    m = attr.evolve(m, sub=m)
+    assert m == binary.loads(M, binary.dumps(m))
+
+
+def test_stream():
+    from attrkid import binary
+    from attrkid.fields import int_field, string_field
+
+    @attr.s
+    class A:
+        i = int_field()
+        s = string_field(is_optional=True)
+
+    a1 = A(i=1, s='a')
+    a2 = A(i=2, s=None)
+    fp = io.BytesIO()
+    binary.dump(a1, fp)
+    binary.dump(a2, fp)
+    fp.seek(0)
+    assert a1 == binary.load(A, fp)
+    assert a2 == binary.load(A, fp)
+    with pytest.raises(EOFError):
+        binary.load(A, fp)
+
+
+def test_registry_types():
+    """ Types from the codec registry are written in serialised form """
+    import uuid
+
+    from attrkid import binary
+    from attrkid.fields import _field, list_field
+
+    @attr.s
+    class M:
+        id = _field(uuid.UUID)
+        day = _field(datetime.date)
+        ids = list_field(uuid.UUID)
+
+    m = M(id=uuid.uuid4(), day=datetime.date(2020, 1, 2), ids=[uuid.uuid4()])
+    assert m == binary.loads(M, binary.dumps(m))
+
+
+def test_array_field():
+    import array
+
+    from attrkid import binary
+    from attrkid.fields import array_field
+
+    @attr.s
+    class Series:
+        values = array_field('d')
+        counts = array_field('h')
+
+    s = Series(
+        values=array.array('d', [1.5, -2.0] * 100),
+        counts=array.array('h', [-1, 2, 3]))
+    data = binary.dumps(s)
+    assert s == binary.loads(Series, data)
+    # The raw items, plus a few bytes of header and lengths
+    assert len(data) < 8 * 200 + 2 * 3 + 32
+
+
+def test_schema_mismatch():
+    from attrkid import binary
+    from attrkid.exceptions import SchemaMismatchError
+    from attrkid.fields import int_field, string_field
+
+    @attr.s
+    class A:
+        i = int_field()
+        s = string_field(is_optional=True)
+
+    @attr.s
+    class Renamed:
+        i = int_field()
+        s = string_field(is_optional=True)
+
+    @attr.s
+    class Different:
+        i = string_field()
+
+    data = binary.dumps(A(i=1, s='a'))
+    # Only the layout matters, not the class name
+    assert Renamed(i=1, s='a') == binary.loads(Renamed, data)
+    with pytest.raises(SchemaMismatchError):
+        binary.loads(Different, data)
+
+
+def test_smaller_than_json():
+    from attrkid import binary, to_dict
+    from attrkid.fields import int_field, string_field
+
+    @attr.s
+    class A:
+        i = int_field()
+        s = string_field(is_optional=True)
+
+    a = A(i=12345, s='hello')
+    assert len(binary.dumps(a)) < len(json.dumps(to_dict(a)))
+
+
+def test_validates():
+    from attrkid import binary
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import int_field
+
+    def positive(inst, attr, value):
+        if value < 0:
+            raise ValueError('must be positive')
+
+    @attr.s
+    class Loose:
+        i = int_field()
+
+    @attr.s
+    class Strict:
+        i = int_field(validator=positive)
+
+    data = binary.dumps(Loose(i=-1))
+    with pytest.raises(ValidationError):
+        binary.loads(Strict, data)
+
+
+def test_codec_published_compiled(monkeypatch):
+    """ Other threads mustn't find a codec that's still being compiled """
+    from attrkid import binary
+    from attrkid.constants import SELF
+    from attrkid.fields import object_field, string_field
+
+    @attr.s
+    class Node:
+        name = string_field()
+        child = object_field(SELF, is_optional=True, default=None)
+
+    published = []
+    compile = binary._ClassCodec.compile
+
+    def checking_compile(self):
+        published.append(self.cls in binary._CODECS)
+        compile(self)
+
+    monkeypatch.setattr(binary._ClassCodec, 'compile', checking_compile)
+    node = Node(name='a', child=Node(name='b'))
+    assert node == binary.loads(Node, binary.dumps(node))
+    assert [False] == published
+
+
+def test_naive_datetime_and_prec():
+    from attrkid import binary, from_dict, to_dict
+    from attrkid.fields import datetime_field, decimal_field
+
+    @attr.s
+    class M:
+        naive = datetime_field()
+        aware = datetime_field()
+        before_epoch = datetime_field()
+        price = decimal_field(prec=3)
+
+    m = M(
+        naive=datetime.datetime(2020, 1, 2, 3, 4, 5, 6),
+        aware=datetime.datetime(2020, 1, 2, 3, 4, 5, 6, tzinfo=pytz.utc),
+        before_epoch=datetime.datetime(1900, 1, 2, 3, 4, 5, 6),
+        price=decimal.Decimal('1.23456'))
+    loaded = binary.loads(M, binary.dumps(m))
+    assert m.naive == loaded.naive
+    assert loaded.naive.tzinfo is None
+    assert m.aware == loaded.aware
+    assert m.before_epoch == loaded.before_epoch
+    # Rounded to the field's precision, as from_dict does
+    assert decimal.Decimal('1.23') == loaded.price
+    data = dict(to_dict(m), price='1.23456')
+    assert loaded.price == from_dict(M, data).price
@@ -0,0 +1,145 @@
+import datetime
+import enum
+import ipaddress
+import uuid
+
+import attr
+import pytest
+import pytz
+
+
+class Colour(enum.Enum):
+    RED = 'red'
+    GREEN = 'green'
+
+
+def test_builtin_codecs():
+    from attrkid import from_dict, to_dict
+    from attrkid.fields import any_field, datetime_field, list_field, _field
+
+    @attr.s
+    class Host:
+        id = _field(uuid.UUID)
+        address = _field(ipaddress.IPv4Address)
+        network = _field(ipaddress.IPv6Network)
+        colour = _field(Colour)
+        born = _field(datetime.date)
+        seen = datetime_field()
+        others = list_field(uuid.UUID)
+        extra = any_field(is_optional=True, default=None)
+
+    host = Host(
+        id=uuid.UUID('5d9ee1ef-1e5b-4d0a-9b1a-8b6a2b1c4d5e'),
+        address=ipaddress.IPv4Address('10.0.0.1'),
+        network=ipaddress.IPv6Network('2001:db8::/32'),
+        colour=Colour.GREEN,
+        born=datetime.date(2019, 2, 3),
+        seen=datetime.datetime(2019, 2, 3, 4, 5, 6, tzinfo=pytz.utc),
+        others=[uuid.UUID(int=1), uuid.UUID(int=2)],
+        extra=Colour.RED)
+    data = to_dict(host)
+    assert {
+        'id': '5d9ee1ef-1e5b-4d0a-9b1a-8b6a2b1c4d5e',
+        'address': '10.0.0.1',
+        'network': '2001:db8::/32',
+        'colour': 'green',
+        'born': '2019-02-03',
+        'seen': '2019-02-03T04:05:06.000000Z',
+        'others': [
+            '00000000-0000-0000-0000-000000000001',
+            '00000000-0000-0000-0000-000000000002'
+        ],
+        'extra': 'red',
+    } == data
+
+    loaded = from_dict(Host, data)
+    # There's no telling what type an any_field value was
+    assert 'red' == loaded.extra
+    assert attr.evolve(host, extra='red') == loaded
+    # Values which are already the right type are left alone
+    assert host == from_dict(Host, attr.asdict(host, recurse=False))
+
+
+def test_engine_uses_codecs(monkeypatch):
+    from attrkid import from_dict, serde, to_dict
+    from attrkid.constants import SELF
+    from attrkid.fields import list_field, object_field, _field
+
+    @attr.s
+    class Host:
+        id = _field(uuid.UUID)
+        address = _field(ipaddress.IPv4Address)
+        colour = _field(Colour)
+        born = _field(datetime.date)
+        others = list_field(uuid.UUID)
+        parent = object_field(SELF, is_optional=True, default=None)
+
+    host = None
+    for i in range(3):
+        host = Host(
+            id=uuid.UUID(int=i),
+            address=ipaddress.IPv4Address('10.0.0.1'),
+            colour=Colour.GREEN,
+            born=datetime.date(2019, 2, 3),
+            others=[uuid.UUID(int=1)],
+            parent=host)
+    expected = to_dict(host)
+    monkeypatch.setattr(serde, 'MAX_RECURSION_DEPTH', 0)
+    assert expected == to_dict(host)
+    assert host == from_dict(Host, expected)
+
+
+def test_options_codecs():
+    from attrkid import from_dict, to_dict
+    from attrkid.codec import CODECS
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import list_field, _field
+    from attrkid.options import SerdeOptions
+
+    @attr.s
+    class Host:
+        id = _field(uuid.UUID)
+        others = list_field(uuid.UUID)
+
+    registry = CODECS.copy()
+    registry.register(
+        uuid.UUID,
+        encode=lambda value, *, options: value.int,
+        decode=lambda cls, raw: cls(int=raw))
+    options = SerdeOptions(codecs=registry)
+
+    host = Host(id=uuid.uuid4(), others=[uuid.UUID(int=1), uuid.UUID(int=2)])
+    data = to_dict(host, options=options)
+    assert host.id.int == data['id']
+    assert [1, 2] == data['others']
+    assert host == from_dict(Host, data, options=options)
+    # The global registry is unchanged
+    assert str(host.id) == to_dict(host)['id']
+    with pytest.raises(ValidationError):
+        from_dict(Host, data)
+
+
+def test_registry_dispatch():
+    from attrkid.codec import CodecRegistry
+
+    class Base:
+        pass
+
+    class Child(Base):
+        pass
+
+    registry = CodecRegistry()
+    assert registry.lookup(Child) is None
+
+    registry.register(Base, encode='base', decode='base')
+    assert 'base' == registry.lookup(Child).encode
+    assert Child in registry
+
+    # The cache mustn't hide codecs registered later
+    registry.register(Child, encode='child', decode='child')
+    assert 'child' == registry.lookup(Child).encode
+    assert 'base' == registry.lookup(Base).encode
+
+    registry.unregister(Child)
+    assert 'base' == registry.lookup(Child).encode
+    assert registry.lookup([]) is None
@@ -0,0 +1,111 @@
+import array
+import datetime
+
+import attr
+import pytest
+import pytz
+
+
+def test_from_columns_simple():
+    from attrkid.columnar import from_columns
+    from attrkid.fields import int_field, string_field
+
+    @attr.s
+    class M:
+        a = int_field()
+        b = string_field()
+
+    ms = from_columns(M, {'a': [1, 2], 'b': ['x', 'y']})
+    assert [M(a=1, b='x'), M(a=2, b='y')] == ms
+
+
+def test_from_columns_deserialises():
+    from attrkid.columnar import from_columns
+    from attrkid.fields import datetime_field
+
+    @attr.s
+    class M:
+        d = datetime_field()
+
+    dt = datetime.datetime(2017, 11, 13, 15, 12, 0, tzinfo=pytz.utc)
+    ms = from_columns(M, {'d': ['2017-11-13T15:12:00']})
+    assert [M(d=dt)] == ms
+
+
+def test_from_columns_nested():
+    from attrkid.columnar import from_columns
+    from attrkid.fields import object_field, string_field
+
+    @attr.s
+    class Address:
+        line_1 = string_field()
+        postcode = string_field()
+
+    @attr.s
+    class Person:
+        name = string_field()
+        home = object_field(Address, is_optional=True)
+
+    columns = {
+        'name': ['a', 'b'],
+        'home.line_1': ['1 Street', None],
+        'home.postcode': ['AB1', None],
+    }
+    masks = {'home': [False, True]}
+    people = from_columns(Person, columns, masks=masks)
+    assert [
+        Person(name='a', home=Address(line_1='1 Street', postcode='AB1')),
+        Person(name='b', home=None),
+    ] == people
+
+
+def test_from_columns_masks_and_defaults():
+    from attrkid.columnar import from_columns
+    from attrkid.fields import int_field
+
+    @attr.s
+    class M:
+        a = int_field(is_optional=True)
+        b = int_field(default=5)
+
+    ms = from_columns(
+        M, {'a': array.array('q', [1, 2])}, masks={'a': [False, True]})
+    assert [M(a=1, b=5), M(a=None, b=5)] == ms
+
+
+def test_from_columns_default_from_attr():
+    from attrkid.columnar import from_columns
+    from attrkid.fields import int_field, string_field
+
+    @attr.s
+    class M:
+        name = string_field()
+        label = string_field(default_from_attr='_label')
+        _size = int_field(default=1)
+
+        @property
+        def _label(self):
+            return self.name.upper()
+
+    # Defaulted by attrs from the instance, unless there's a column
+    assert [M(name='a', label='A'), M(name='b', label='B')] == from_columns(
+        M, {'name': ['a', 'b']})
+    assert [M(name='a', label='x', size=2)] == from_columns(
+        M, {'name': ['a'], 'label': ['x'], '_size': [2]})
+
+
+def test_from_columns_errors():
+    from attrkid.columnar import from_columns
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import int_field
+
+    @attr.s
+    class M:
+        a = int_field()
+
+    with pytest.raises(ValueError):
+        from_columns(M, {'a': [1, 2]}, masks={'a': [True]})
+
+    with pytest.raises(ValidationError) as exc:
+        from_columns(M, {'a': [1, 'x']})
+    assert 1 == exc.value.errors[0]['row']
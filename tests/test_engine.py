@@ -0,0 +1,156 @@
+import attr
+import pytest
+
+from attrkid.constants import SELF
+from attrkid.fields import bool_field, list_field, object_field, string_field
+from attrkid.kind import DeferredKind, UnionKind
+
+DEPTH = 10000
+
+_EXPR = UnionKind(
+    ('lit', DeferredKind(f'{__name__}.Lit')),
+    ('not', DeferredKind(f'{__name__}.Not')),
+    ('and', DeferredKind(f'{__name__}.And')),
+)
+
+
+@attr.s
+class Lit:
+    value = bool_field()
+
+
+@attr.s
+class Not:
+    item = object_field(_EXPR)
+
+
+@attr.s
+class And:
+    items = list_field(_EXPR)
+
+
+@attr.s
+class Employee:
+    name = string_field()
+    manager = object_field(SELF, is_optional=True, default=None)
+    reports = list_field(SELF)
+
+
+def test_deep_self_tree():
+    from attrkid import from_dict, to_dict
+
+    data = {'name': 'ceo'}
+    for i in range(DEPTH):
+        data = {'name': str(i), 'reports': [{'name': 'x'}, data]}
+
+    employee = from_dict(Employee, data)
+    for i in reversed(range(DEPTH)):
+        assert str(i) == employee.name
+        assert 'x' == employee.reports[0].name
+        employee = employee.reports[1]
+    assert 'ceo' == employee.name
+
+    employee = Employee(name='ceo')
+    for i in range(DEPTH):
+        employee = Employee(name=str(i), manager=employee)
+    data = to_dict(employee)
+    for i in reversed(range(DEPTH)):
+        assert str(i) == data['name']
+        assert [] == data['reports']
+        data = data['manager']
+    assert 'ceo' == data['name']
+
+
+def test_deep_union_ast():
+    from attrkid import from_dict, to_dict
+
+    expr = Lit(value=True)
+    for i in range(DEPTH):
+        expr = Not(item=expr) if i % 2 else And(items=[Lit(False), expr])
+
+    data = to_dict(expr)
+    for i in reversed(range(DEPTH)):
+        if i % 2:
+            child = data['item']
+        else:
+            assert {'lit': {'value': False}} == data['items'][0]
+            child = data['items'][1]
+        (selector, data), = child.items()
+        assert (('not' if (i - 1) % 2 else 'and') if i else 'lit') == selector
+    assert {'value': True} == data
+
+    expr = from_dict(Not, to_dict(expr))
+    for i in reversed(range(DEPTH)):
+        if i % 2:
+            assert isinstance(expr, Not)
+            expr = expr.item
+        else:
+            assert isinstance(expr, And)
+            expr = expr.items[1]
+    assert Lit(value=True) == expr
+
+
+def test_deep_errors():
+    from attrkid import from_dict
+    from attrkid.exceptions import ValidationError
+
+    data = {'name': 1}
+    for i in range(DEPTH):
+        data = {'name': str(i), 'manager': data}
+    with pytest.raises(ValidationError) as info:
+        from_dict(Employee, data)
+
+    manager = attr.fields(Employee).manager
+    exc = info.value
+    depth = 0
+    while exc.errors[0]['field'] is manager:
+        exc = exc.exc
+        depth += 1
+    assert DEPTH == depth
+    assert attr.fields(Employee).name is exc.errors[0]['field']
+
+
+@pytest.mark.parametrize('max_depth', [0, 1, 2])
+def test_engine_matches_recursion(monkeypatch, max_depth):
+    """ Hand over to the engine part way down, and check nothing changes """
+    from attrkid import from_dict, memo, serde, to_dict
+    from attrkid.options import SerdeOptions
+
+    @attr.s
+    class Value:
+        value = string_field()
+
+    @attr.s
+    class Only:
+        item = object_field(Value, is_only_field=True)
+
+    @memo.memoise
+    @attr.s(frozen=True)
+    class Tag:
+        label = string_field()
+
+    @attr.s
+    class Holder:
+        expr = object_field(_EXPR)
+        only = object_field(Only)
+        onlys = list_field(UnionKind(('only', Only), ('value', Value)))
+        tags = list_field(Tag)
+        missing = object_field(Value, is_optional=True, default=None)
+
+    holder = Holder(
+        expr=And(items=[Not(item=Lit(value=True)), Lit(value=False)]),
+        only=Only(item=Value(value='a')),
+        onlys=[Only(item=Value(value='b')), Value(value='c')],
+        tags=[Tag(label='t')] * 2,
+    )
+    results = []
+    for options in (SerdeOptions(), SerdeOptions(omit_null_values=False)):
+        results.append((to_dict(holder, options=options),
+                        from_dict(Holder, to_dict(holder, options=options))))
+
+    monkeypatch.setattr(serde, 'MAX_RECURSION_DEPTH', max_depth)
+    for options, (as_dict, loaded) in zip(
+        (SerdeOptions(), SerdeOptions(omit_null_values=False)), results):
+        assert as_dict == to_dict(holder, options=options)
+        assert loaded == from_dict(Holder, as_dict)
+        assert holder == loaded
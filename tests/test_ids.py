@@ -0,0 +1,81 @@
+import uuid
+
+import pytest
+
+
+@pytest.mark.parametrize('name, version', [('new_uuid4', 4), ('new_uuid7', 7)])
+def test_uuid_format(name, version):
+    from attrkid import ids
+
+    values = [getattr(ids, name)() for _ in range(1000)]
+    assert 1000 == len(set(values))
+    for value in values:
+        assert 32 == len(value)
+        parsed = uuid.UUID(value)
+        assert version == parsed.version
+        assert uuid.RFC_4122 == parsed.variant
+        assert value == parsed.hex
+
+
+def test_time_ordered(monkeypatch):
+    from attrkid import ids
+
+    now = [1_600_000_000_000]
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: now[0] * 1000000)
+    # Forget any real IDs made already
+    monkeypatch.setattr(ids, '_uuid7_clock', ids._TimeOrdered(74))
+    monkeypatch.setattr(ids, '_ulid_clock', ids._TimeOrdered(80))
+
+    for new_id in (ids.new_uuid7, ids.new_ulid):
+        made = [new_id()]
+        # Several in the same millisecond, then the clock going backwards
+        made += [new_id() for _ in range(5)]
+        now[0] -= 10
+        made.append(new_id())
+        now[0] += 20
+        made.append(new_id())
+        assert sorted(made) == made
+        assert len(set(made)) == len(made)
+
+    ulid = ids.new_ulid()
+    assert 26 == len(ulid)
+    assert set(ulid) <= set(ids._ULID_ALPHABET)
+    # The timestamp is the first 10 characters
+    assert now[0] == int(''.join(
+        f'{ids._ULID_ALPHABET.index(c):05b}' for c in ulid[:10]), 2)
+    assert now[0] == int(ids.new_uuid7()[:12], 16)
+
+
+def test_time_ordered_overflow(monkeypatch):
+    from attrkid import ids
+
+    monkeypatch.setattr(ids.time, 'time_ns', lambda: 5000000)
+    # Room for at most 4 IDs a millisecond
+    clock = ids._TimeOrdered(2)
+    made = [clock.next() for _ in range(6)]
+    assert made == sorted(made)
+    assert len(set(made)) == len(made)
+    assert 5 == made[0][0]
+    assert 5 < made[-1][0]
+
+
+def test_entropy_pool(monkeypatch):
+    from attrkid import ids
+
+    reads = []
+
+    def urandom(n):
+        reads.append(n)
+        return bytes(range(n))
+
+    monkeypatch.setattr(ids.os, 'urandom', urandom)
+    pool = ids._EntropyPool(block_size=10)
+    assert [0x0001, 0x0203, 0x0405, 0x0607, 0x0809] == [
+        pool.take(2) for _ in range(5)
+    ]
+    assert [10] == reads
+    # A block too short for what's asked for is thrown away
+    assert 0x0001020304050607 == pool.take(8)
+    assert [10, 10] == reads
+    pool.take(16)
+    assert [10, 10, 16] == reads
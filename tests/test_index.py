@@ -0,0 +1,92 @@
+import attr
+import pytest
+
+
+def _person():
+    from attrkid.fields import key, primary_key, string_field
+
+    @attr.s(frozen=True)
+    class Person:
+        id = primary_key(int)
+        email = string_field(unique=True, is_optional=True, default=None)
+        company_id = key(str, is_optional=True, default=None)
+        name = string_field(default='')
+
+    return Person
+
+
+def test_indexed_collection():
+    from attrkid.index import IndexedCollection
+
+    Person = _person()
+    a = Person(id=1, email='a@example.com', company_id='x')
+    b = Person(id=2, email='b@example.com', company_id='x')
+    c = Person(id=3, email=None, company_id=None)
+    people = IndexedCollection(Person, [a, b, c])
+
+    assert 3 == len(people)
+    assert [a, b, c] == list(people)
+    assert b is people.get_by_pk(2)
+    assert people.get_by_pk(4) is None
+    assert a is people.get_by('email', 'a@example.com')
+    assert a is people.get_by('id', 1)
+    assert [a, b] == people.filter_by('company_id', 'x')
+    assert [] == people.filter_by('company_id', 'y')
+    assert [c] == people.filter_by('id', 3)
+
+    with pytest.raises(ValueError):
+        people.get_by('company_id', 'x')
+    with pytest.raises(ValueError):
+        people.filter_by('name', '')
+
+
+def test_uniqueness():
+    from attrkid.exceptions import DuplicateKeyError
+    from attrkid.index import IndexedCollection
+
+    Person = _person()
+    people = IndexedCollection(Person, [Person(id=1, email='a')])
+
+    with pytest.raises(DuplicateKeyError):
+        people.add(Person(id=1))
+    with pytest.raises(DuplicateKeyError):
+        people.add(Person(id=2, email='a'))
+    with pytest.raises(DuplicateKeyError):
+        # Duplicates within the batch are caught too, and nothing is added
+        people.extend([Person(id=2, email='b'), Person(id=3, email='b')])
+    assert 1 == len(people)
+    assert people.get_by('email', 'b') is None
+
+    # None doesn't clash
+    people.extend([Person(id=2), Person(id=3)])
+    assert 3 == len(people)
+
+    with pytest.raises(TypeError):
+        people.add(object())
+
+
+def test_update_and_remove():
+    from attrkid.exceptions import DuplicateKeyError
+    from attrkid.index import IndexedCollection
+
+    Person = _person()
+    a = Person(id=1, email='a', company_id='x')
+    b = Person(id=2, email='b', company_id='x')
+    people = IndexedCollection(Person, [a, b])
+
+    a2 = people.update(1, email='c', company_id='y')
+    assert a2 is people.get_by('email', 'c')
+    assert people.get_by('email', 'a') is None
+    assert [b] == people.filter_by('company_id', 'x')
+    assert [a2] == people.filter_by('company_id', 'y')
+
+    with pytest.raises(DuplicateKeyError):
+        people.update(1, email='b')
+    with pytest.raises(DuplicateKeyError):
+        people.update(1, id=2)
+    assert a2 is people.get_by_pk(1)
+
+    assert b is people.remove(2)
+    assert [] == people.filter_by('company_id', 'x')
+    assert people.get_by('email', 'b') is None
+    assert 1 == len(people)
@@ -0,0 +1,154 @@
+import datetime
+
+import attr
+import pytest
+
+
+def test_interning():
+    from attrkid import from_dict
+    from attrkid.fields import list_field, object_field, string_field
+    from attrkid.intern import interning
+
+    @attr.s(frozen=True)
+    class Address:
+        line_1 = string_field()
+        postcode = string_field()
+
+    @attr.s(frozen=True)
+    class Person:
+        name = string_field()
+        home = object_field(Address)
+
+    @attr.s
+    class Batch:
+        people = list_field(Person)
+
+    home = {'line_1': '10 Some Street', 'postcode': 'AB1'}
+    data = {
+        'people': [
+            {'name': 'a', 'home': home},
+            {'name': 'b', 'home': dict(home)},
+            {'name': 'a', 'home': home},
+        ]
+    }
+
+    with interning() as table:
+        batch = from_dict(Batch, data)
+    a1, b, a2 = batch.people
+    assert a1 is a2
+    assert a1.home is b.home
+    # b's home, and a2 and its home
+    assert 3 == table.hits
+
+    # Outside the block, nothing is shared
+    batch = from_dict(Batch, data)
+    a1, b, a2 = batch.people
+    assert a1 == a2
+    assert a1 is not a2
+
+
+def test_interning_types():
+    from attrkid import from_dict
+    from attrkid.fields import any_field
+    from attrkid.intern import interning
+
+    @attr.s(frozen=True)
+    class M:
+        v = any_field()
+
+    with interning():
+        one = from_dict(M, {'v': 1})
+        assert one is from_dict(M, {'v': 1})
+        assert 1.0 == from_dict(M, {'v': 1.0}).v
+        assert isinstance(from_dict(M, {'v': 1.0}).v, float)
+
+
+def test_interning_equal_values():
+    """ Values which compare equal but are written differently """
+    from attrkid import from_dict, to_dict
+    from attrkid.fields import datetime_field, decimal_field, float_field
+    from attrkid.intern import interning
+
+    utc = datetime.timezone.utc
+    plus_1 = datetime.timezone(datetime.timedelta(hours=1))
+
+    @attr.s(frozen=True)
+    class Amount:
+        amount = decimal_field()
+
+    @attr.s(frozen=True)
+    class Reading:
+        value = float_field()
+
+    @attr.s(frozen=True)
+    class Event:
+        when = datetime_field()
+
+    cases = [
+        (Amount, {'amount': '1.0'}, {'amount': '1.00'}),
+        (Reading, {'value': 0.0}, {'value': -0.0}),
+        # Parsed datetimes are always UTC, but ones already decoded are
+        # left as they are
+        (Event, {'when': datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=utc)},
+         {'when': datetime.datetime(2020, 1, 2, 4, 4, 5, tzinfo=plus_1)}),
+    ]
+    for cls, first, second in cases:
+        with interning():
+            a = from_dict(cls, first)
+            b = from_dict(cls, second)
+            assert a == b
+            assert a is not b
+            assert from_dict(cls, second) is b
+        assert to_dict(from_dict(cls, first)) == to_dict(a)
+        assert to_dict(from_dict(cls, second)) == to_dict(b)
+
+
+def test_intern_table_eviction():
+    from attrkid import from_dict
+    from attrkid.fields import string_field
+    from attrkid.intern import InternTable, interning
+
+    @attr.s(frozen=True)
+    class Address:
+        line_1 = string_field()
+        postcode = string_field()
+
+    table = InternTable(maxsize=2)
+    with interning(table):
+        for i in range(3):
+            from_dict(Address, {'line_1': str(i), 'postcode': 'x'})
+    assert 2 == len(table)
+
+    with interning(table):
+        # Still there
+        from_dict(Address, {'line_1': '2', 'postcode': 'x'})
+    assert 1 == table.hits
+
+    with pytest.raises(ValueError):
+        InternTable(maxsize=0)
+
+
+def test_interning_deep():
+    from attrkid import from_dict
+    from attrkid.constants import SELF
+    from attrkid.fields import object_field, string_field
+    from attrkid.intern import interning
+
+    @attr.s(frozen=True)
+    class Chain:
+        name = string_field()
+        next = object_field(SELF, is_optional=True, default=None)
+
+    def chain(depth):
+        data = {'name': 'end'}
+        for i in range(depth):
+            data = {'name': str(i % 3), 'next': data}
+        return data
+
+    # Deeper than the explicit-stack engine takes over at, and the
+    # interpreter's recursion limit
+    with interning() as table:
+        first = from_dict(Chain, chain(2000))
+        second = from_dict(Chain, chain(2000))
+    assert first is second
+    assert 2001 == len(table)
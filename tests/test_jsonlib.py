@@ -0,0 +1,101 @@
+import datetime
+import sys
+
+import attr
+import pytest
+import pytz
+
+
+@pytest.mark.parametrize('backend',
+                         ['json', 'orjson', 'ujson', 'simplejson'])
+def test_round_trip(backend):
+    from attrkid import from_json, to_json
+    from attrkid.fields import datetime_field, list_field, string_field
+    from attrkid.options import SerdeOptions
+
+    @attr.s
+    class M:
+        name = string_field()
+        when = datetime_field()
+        ns = list_field(int)
+
+    options = SerdeOptions(json_backend=backend)
+    m = M(
+        name='é/x',
+        when=datetime.datetime(2020, 1, 2, 3, 4, 5, tzinfo=pytz.utc),
+        ns=[1, 2])
+    data = to_json(m, options=options)
+    assert isinstance(data, str)
+    assert m == from_json(M, data, options=options)
+    assert m == from_json(M, data.encode('utf-8'), options=options)
+    with pytest.raises(ValueError):
+        from_json(M, '{', options=options)
+
+
+def test_fallback(monkeypatch):
+    from attrkid import jsonlib
+
+    monkeypatch.setattr(jsonlib, '_loaded', {})
+    # Make importing it fail, as if it wasn't installed
+    monkeypatch.setitem(sys.modules, 'ujson', None)
+    assert 'json' == jsonlib.get_backend('ujson').name
+    with pytest.raises(ValueError):
+        jsonlib.get_backend('yaml')
+
+
+def test_default_backend(monkeypatch):
+    from attrkid import from_dict, jsonlib
+    from attrkid.fields import list_field
+
+    @attr.s
+    class M:
+        ns = list_field(int)
+
+    calls = []
+
+    def loads(data):
+        calls.append(data)
+        return [1, 2]
+
+    monkeypatch.setattr(jsonlib, '_default', jsonlib.DEFAULT_BACKEND)
+    monkeypatch.setattr(jsonlib, '_loaded',
+                        {'simplejson': jsonlib.JSONBackend(
+                            name='simplejson', dumps=None, loads=loads)})
+    raw = {'ns': '[1, 2]'}
+    assert [1, 2] == from_dict(M, raw).ns
+    assert [] == calls
+
+    # Fields given as JSON strings are decoded with the chosen backend
+    jsonlib.set_default_backend('simplejson')
+    assert [1, 2] == from_dict(M, raw).ns
+    assert ['[1, 2]'] == calls
+    with pytest.raises(ValueError):
+        jsonlib.set_default_backend('yaml')
+
+
+@pytest.mark.parametrize('backend',
+                         ['json', 'orjson', 'ujson', 'simplejson'])
+def test_memoised(backend):
+    from attrkid import from_json, to_json
+    from attrkid.fields import list_field, object_field, string_field
+    from attrkid.memo import READ_ONLY, memoise
+    from attrkid.options import SerdeOptions
+
+    @memoise(mode=READ_ONLY)
+    @attr.s(frozen=True)
+    class Tag:
+        name = string_field()
+        aliases = list_field(str)
+
+    @attr.s(frozen=True)
+    class Post:
+        tag = object_field(Tag)
+        tags = list_field(Tag)
+
+    options = SerdeOptions(json_backend=backend)
+    tag = Tag(name='a', aliases=['b', 'c'])
+    post = Post(tag=tag, tags=[tag, Tag(name='d')])
+    # Twice, so the second comes from the memo
+    for _ in range(2):
+        data = to_json(post, options=options)
+        assert post == from_json(Post, data, options=options)
@@ -1,4 +1,5 @@
 import attr
+import pytest
 
 
 @attr.s
@@ -20,3 +21,134 @@ def test_wrap_kind_multiple():
 
     kinds = (DeferredKind('tests.test_utils.A'), B)
     check(kinds)
+
+
+def test_union_dispatch():
+    from attrkid.kind import DeferredKind, UnionKind, union_parts
+
+    union = UnionKind(('a', A), ('b', DeferredKind(f'{__name__}.B')),
+                      ('also_a', A))
+    assert 'a' == union.selector_for(A)
+    assert 'b' == union.selector_for(B)
+    assert B == union.kind_for('b')
+    with pytest.raises(ValueError):
+        union.selector_for(object)
+    with pytest.raises(ValueError):
+        union.kind_for('c')
+
+    value = {'x': 1}
+    assert (B, value) == union_parts(union, {'b': value})
+
+
+def test_union_tag():
+    from attrkid.kind import UnionKind, union_parts, union_value
+
+    union = UnionKind(('a', A), ('b', B), tag='type')
+    value = {'type': 'b', 'x': 1}
+    kind, data = union_parts(union, value)
+    assert B == kind
+    assert data is value
+    assert value == union_value(union, 'b', {'x': 1})
+
+    with pytest.raises(ValueError):
+        union_parts(union, {'x': 1})
+    with pytest.raises(TypeError):
+        union_value(union, 'b', [1])
+    with pytest.raises(TypeError):
+        UnionKind(('a', A), tag=1)
+
+    # The tag is part of the union's identity
+    assert UnionKind(('a', A), ('b', B)) != union
+    assert UnionKind(('a', A), ('b', B), tag='type') == union
+
+
+def test_union_tag_clash():
+    from attrkid.fields import string_field
+    from attrkid.kind import ImmediateKind, UnionKind
+
+    @attr.s
+    class Typed:
+        type = string_field()
+
+    # The field would be written over the tag
+    with pytest.raises(TypeError):
+        UnionKind(('a', A), ('typed', Typed), tag='type')
+    # Kinds which aren't resolved yet are checked on first use
+    union = UnionKind(('a', A), ('typed', ImmediateKind(Typed)), tag='type')
+    with pytest.raises(TypeError):
+        union.kind_for('a')
+    assert 'typed' == UnionKind(('typed', Typed), tag='kind').selector_for(
+        Typed)
+
+
+def test_union_untagged():
+    from attrkid.fields import int_field, list_field, string_field
+    from attrkid.kind import UnionKind, union_parts, union_value
+
+    @attr.s
+    class Point:
+        x = int_field()
+        y = int_field()
+        label = string_field(is_optional=True)
+
+    @attr.s
+    class Point3D:
+        x = int_field()
+        y = int_field()
+        z = int_field()
+
+    @attr.s
+    class Named:
+        x = int_field(is_optional=True)
+        label = string_field()
+
+    union = UnionKind(('2d', Point), ('3d', Point3D), ('named', Named),
+                      untagged=True)
+    value = {'x': 1, 'y': 2}
+    assert (Point, value) == union_parts(union, value)
+    assert value is union_value(union, '2d', value)
+    assert Point == union.kind_for_keys(['x', 'y', 'label'])
+    assert Point3D == union.kind_for_keys(['x', 'y', 'z'])
+    assert Named == union.kind_for_keys(['label'])
+
+    with pytest.raises(ValueError) as info:
+        union.kind_for_keys(['y'])
+    assert 'No kind' in str(info.value)
+
+    @attr.s
+    class Pair:
+        x = int_field()
+        y = int_field()
+
+    ambiguous = UnionKind(('2d', Point), ('pair', Pair), untagged=True)
+    assert Point == ambiguous.kind_for_keys(['x', 'y', 'label'])
+    with pytest.raises(ValueError) as info:
+        ambiguous.kind_for_keys(['x', 'y'])
+    assert 'Ambiguous' in str(info.value)
+    with pytest.raises(ValueError):
+        union_parts(ambiguous, {'x': 1, 'y': 2})
+
+    with pytest.raises(TypeError):
+        UnionKind(('2d', Point), tag='type', untagged=True)
+
+    @attr.s
+    class Wrapper:
+        values = list_field(int, is_only_field=True)
+
+    # Rejected when the union is made, not when it's first used
+    with pytest.raises(TypeError):
+        UnionKind(('2d', Point), ('wrapper', Wrapper), untagged=True)
+
+
+def test_union_parts_external():
+    from attrkid.kind import UnionKind, union_parts
+
+    @attr.s
+    class A:
+        pass
+
+    union = UnionKind(('a', A))
+    assert (A, {}) == union_parts(union, {'a': {}})
+    for value in ({}, {'a': {}, 'b': {}}, ['a']):
+        with pytest.raises(ValueError):
+            union_parts(union, value)
@@ -0,0 +1,107 @@
+import gc
+import json
+
+import attr
+import pytest
+
+
+def test_memoise_copy():
+    from attrkid import to_dict
+    from attrkid.fields import int_field, list_field, object_field
+    from attrkid.memo import cache_info, memoise
+
+    @memoise
+    @attr.s(frozen=True)
+    class Child:
+        n = int_field()
+
+    @memoise
+    @attr.s(frozen=True)
+    class Parent:
+        child = object_field(Child)
+        ns = list_field(int)
+
+    p = Parent(child=Child(n=1), ns=[1, 2])
+    first = to_dict(p)
+    assert {'child': {'n': 1}, 'ns': [1, 2]} == first
+    first['child']['n'] = 99
+    first['ns'].append(3)
+
+    second = to_dict(p)
+    assert {'child': {'n': 1}, 'ns': [1, 2]} == second
+    assert 1 == cache_info(Parent).hits
+
+
+def test_memoise_read_only():
+    from attrkid import to_dict
+    from attrkid.fields import int_field, list_field, object_field
+    from attrkid.memo import READ_ONLY, memoise
+
+    @memoise(mode=READ_ONLY)
+    @attr.s(frozen=True)
+    class Child:
+        n = int_field()
+
+    @memoise(mode=READ_ONLY)
+    @attr.s(frozen=True)
+    class Parent:
+        child = object_field(Child)
+        ns = list_field(int)
+
+    c = Child(n=1)
+    p = Parent(child=c, ns=[1, 2])
+    d = to_dict(p)
+    assert d is to_dict(p)
+    # Children share their cached subtree with the parent
+    assert d['child'] is to_dict(c)
+    with pytest.raises(TypeError):
+        d['child'] = {}
+    assert '{"child": {"n": 1}, "ns": [1, 2]}' == json.dumps(d)
+
+
+def test_memoise_options():
+    from attrkid import to_dict
+    from attrkid.options import SerdeOptions
+    from attrkid.fields import int_field
+    from attrkid.memo import memoise
+
+    @memoise
+    @attr.s(frozen=True)
+    class M:
+        n = int_field(is_optional=True)
+
+    m = M(n=None)
+    assert {} == to_dict(m)
+    assert {'n': None} == to_dict(
+        m, options=SerdeOptions(omit_null_values=False))
+
+
+def test_memoise_eviction():
+    from attrkid import to_dict
+    from attrkid.fields import int_field
+    from attrkid.memo import cache_info, memoise
+
+    @memoise(maxsize=2)
+    @attr.s(frozen=True)
+    class Child:
+        n = int_field()
+
+    children = [Child(n=i) for i in range(3)]
+    for c in children:
+        to_dict(c)
+    assert 2 == cache_info(Child).size
+
+    del children, c
+    gc.collect()
+    assert 0 == cache_info(Child).size
+
+
+def test_memoise_requires_frozen():
+    from attrkid.memo import memoise
+
+    with pytest.raises(TypeError):
+
+        @memoise
+        @attr.s
+        class M:
+            pass
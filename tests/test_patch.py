@@ -0,0 +1,374 @@
+import attr
+import pytest
+
+
+def merge(target, patch):
+    """ Apply a JSON Merge Patch (RFC 7396) """
+    if not isinstance(patch, dict):
+        return patch
+    if not isinstance(target, dict):
+        target = {}
+    result = dict(target)
+    for k, v in patch.items():
+        if v is None:
+            result.pop(k, None)
+        else:
+            result[k] = merge(result.get(k), v)
+    return result
+
+
+def test_diff_unchanged():
+    from attrkid.fields import int_field, list_field, string_field
+    from attrkid.patch import to_dict_diff
+
+    @attr.s
+    class Person:
+        name = string_field()
+        age = int_field()
+        tags = list_field(str)
+
+    p = Person(name='Chris', age=30, tags=['a', 'b'])
+    assert {} == to_dict_diff(p, p)
+    assert {} == to_dict_diff(p, attr.evolve(p))
+
+
+def test_diff_fields():
+    from attrkid import to_dict
+    from attrkid.fields import (
+        any_field,
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.patch import to_dict_diff
+
+    @attr.s
+    class Address:
+        line_1 = string_field()
+        postcode = string_field(is_optional=True)
+
+    @attr.s
+    class Tags:
+        tags = list_field(str, is_only_field=True)
+
+    @attr.s
+    class Person:
+        name = string_field()
+        age = int_field()
+        home = object_field(Address)
+        tags = object_field(Tags)
+        extra = any_field()
+
+    old = Person(
+        name='Chris',
+        age=30,
+        home=Address(line_1='10 Some Street', postcode='AB1'),
+        tags=Tags(tags=['a', 'b']),
+        extra={'x': 1, 'y': 2})
+    new = attr.evolve(
+        old,
+        age=31,
+        home=attr.evolve(old.home, postcode=None),
+        tags=attr.evolve(old.tags, tags=['c']),
+        extra={'x': 1, 'z': 3})
+    patch = to_dict_diff(old, new)
+    assert {
+        'age': 31,
+        'home': {
+            'postcode': None
+        },
+        'tags': ['c'],
+        'extra': {
+            'y': None,
+            'z': 3
+        },
+    } == patch
+    assert to_dict(new) == merge(to_dict(old), patch)
+
+
+def test_diff_union():
+    from attrkid import to_dict
+    from attrkid.fields import int_field, list_field, object_field
+    from attrkid.kind import UnionKind
+    from attrkid.patch import to_dict_diff
+
+    @attr.s
+    class And:
+        items = list_field(int)
+
+    @attr.s
+    class Not:
+        item = int_field()
+
+    @attr.s
+    class Container:
+        expr = object_field(UnionKind(('and', And), ('not', Not)))
+
+    c1 = Container(expr=And(items=[1, 2]))
+    c2 = Container(expr=And(items=[1, 2, 3]))
+    c3 = Container(expr=Not(item=1))
+
+    patch = to_dict_diff(c1, c2)
+    assert {'expr': {'and': {'items': [1, 2, 3]}}} == patch
+    assert to_dict(c2) == merge(to_dict(c1), patch)
+
+    patch = to_dict_diff(c2, c3)
+    assert {'expr': {'and': None, 'not': {'item': 1}}} == patch
+    assert to_dict(c3) == merge(to_dict(c2), patch)
+
+
+def test_diff_wrong_type():
+    from attrkid.fields import list_field, string_field
+    from attrkid.patch import to_dict_diff
+
+    @attr.s
+    class Address:
+        line_1 = string_field()
+
+    @attr.s
+    class Tags:
+        tags = list_field(str, is_only_field=True)
+
+    with pytest.raises(TypeError):
+        to_dict_diff(Tags(tags=[]), Address(line_1='x'))
+
+
+def test_apply_patch():
+    from attrkid import to_dict
+    from attrkid.fields import (
+        any_field,
+        int_field,
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.patch import apply_patch, to_dict_diff
+
+    @attr.s
+    class Address:
+        line_1 = string_field()
+        postcode = string_field(is_optional=True)
+
+    @attr.s
+    class Tags:
+        tags = list_field(str, is_only_field=True)
+
+    @attr.s
+    class Person:
+        name = string_field()
+        age = int_field()
+        home = object_field(Address)
+        tags = object_field(Tags)
+        extra = any_field()
+
+    old = Person(
+        name='Chris',
+        age=30,
+        home=Address(line_1='10 Some Street', postcode='AB1'),
+        tags=Tags(tags=['a', 'b']),
+        extra={'x': 1, 'y': 2})
+    new = attr.evolve(
+        old,
+        age=31,
+        home=attr.evolve(old.home, postcode=None),
+        tags=attr.evolve(old.tags, tags=['c']),
+        extra={'x': 1, 'z': 3})
+    patched = apply_patch(old, to_dict_diff(old, new))
+    assert new == patched
+    assert to_dict(new) == to_dict(patched)
+
+    # Untouched children are shared with the original
+    patched = apply_patch(old, {'age': 40})
+    assert 40 == patched.age
+    assert old.home is patched.home
+    assert old.tags is patched.tags
+
+
+def test_apply_patch_union():
+    from attrkid.fields import int_field, list_field, object_field
+    from attrkid.kind import UnionKind
+    from attrkid.patch import apply_patch, to_dict_diff
+
+    @attr.s
+    class And:
+        items = list_field(int)
+
+    @attr.s
+    class Not:
+        item = int_field()
+
+    @attr.s
+    class Container:
+        expr = object_field(UnionKind(('and', And), ('not', Not)))
+
+    c1 = Container(expr=And(items=[1, 2]))
+    c2 = Container(expr=And(items=[1, 2, 3]))
+    c3 = Container(expr=Not(item=1))
+    assert c2 == apply_patch(c1, to_dict_diff(c1, c2))
+    assert c3 == apply_patch(c2, to_dict_diff(c2, c3))
+
+
+@pytest.mark.parametrize('tag, untagged', [('op', False), (None, True)])
+def test_patch_internal_union(tag, untagged):
+    from attrkid import to_dict
+    from attrkid.fields import int_field, list_field, object_field
+    from attrkid.kind import UnionKind
+    from attrkid.patch import apply_patch, to_dict_diff
+
+    @attr.s
+    class And:
+        items = list_field(int)
+
+    @attr.s
+    class Not:
+        item = int_field()
+
+    @attr.s
+    class Container:
+        expr = object_field(
+            UnionKind(('and', And), ('not', Not), tag=tag, untagged=untagged))
+
+    c1 = Container(expr=And(items=[1, 2]))
+    c2 = Container(expr=And(items=[1, 2, 3]))
+    c3 = Container(expr=Not(item=1))
+
+    patch = to_dict_diff(c1, c2)
+    assert {'expr': {'items': [1, 2, 3]}} == patch
+    patched = apply_patch(c1, patch)
+    assert c2 == patched
+
+    patch = to_dict_diff(c2, c3)
+    expected = {'items': None, 'item': 1}
+    if tag:
+        expected[tag] = 'not'
+    assert {'expr': expected} == patch
+    assert to_dict(c3) == merge(to_dict(c2), patch)
+    assert c3 == apply_patch(c2, patch)
+
+
+def test_apply_patch_validates_touched_fields(mocker):
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import int_field
+    from attrkid.patch import apply_patch
+
+    a_validator = mocker.MagicMock()
+    b_validator = mocker.MagicMock()
+
+    @attr.s(frozen=True)
+    class M:
+        a = int_field(validator=a_validator)
+        b = int_field(validator=b_validator)
+
+    m = M(a=1, b=2)
+    expected = M(a=1, b=3)
+    a_validator.reset_mock()
+    b_validator.reset_mock()
+
+    assert expected == apply_patch(m, {'b': 3})
+    assert not a_validator.called
+    assert b_validator.called
+
+    with pytest.raises(ValidationError):
+        apply_patch(m, {'b': 'x'})
+
+
+class _Counting(type):
+    checks = 0
+
+    def __instancecheck__(cls, instance):
+        _Counting.checks += 1
+        return super().__instancecheck__(instance)
+
+
+class Part(metaclass=_Counting):
+    pass
+
+
+class SubPart(Part):
+    pass
+
+
+def test_evolve():
+    from attrkid import evolve
+    from attrkid.fields import int_field, string_field, tuple_field
+
+    def positive(inst, attr, value):
+        if value <= 0:
+            raise ValueError(value)
+
+    @attr.s(frozen=True)
+    class Machine:
+        name = string_field()
+        parts = tuple_field(Part)
+        _size = int_field(default=1, validator=positive)
+
+    machine = Machine(name='m', parts=(SubPart(), ))
+    resized = evolve(machine, size=2)
+    assert 2 == resized._size
+    assert 'm' == resized.name
+    assert machine.parts is resized.parts
+    with pytest.raises(ValueError):
+        evolve(machine, size=0)
+    with pytest.raises(TypeError):
+        evolve(machine, name=1)
+    with pytest.raises(TypeError):
+        evolve(machine, colour='red')
+    with pytest.raises(TypeError):
+        evolve(machine, parts=(Part(), 'x'))
+
+    # Items of a frozen collection are only checked the first time it's
+    # passed in
+    parts = tuple([SubPart() for _ in range(40)])
+    _Counting.checks = 0
+    evolve(machine, parts=parts)
+    assert 40 == _Counting.checks
+    evolve(machine, parts=parts, name='n')
+    assert 40 == _Counting.checks
+    evolve(machine, parts=parts[1:])
+    assert 79 == _Counting.checks
+
+
+def test_evolve_as_init_would():
+    from attrkid import evolve
+    from attrkid.fields import int_field
+    from attrkid.patch import apply_patch
+
+    @attr.s(frozen=True, cache_hash=True)
+    class Box:
+        width = int_field()
+        height = int_field()
+        area = attr.ib(
+            init=False,
+            default=attr.Factory(
+                lambda self: self.width * self.height, takes_self=True))
+
+    box = Box(width=2, height=3)
+    assert hash(box) == hash(Box(width=2, height=3))
+    for wider in (evolve(box, width=4), apply_patch(box, {'width': 4})):
+        assert Box(width=4, height=3) == wider
+        assert 12 == wider.area
+        assert hash(Box(width=4, height=3)) == hash(wider)
+        assert hash(wider) != hash(box)
+
+
+def test_evolve_remembered_bounded(monkeypatch):
+    from attrkid import evolve, patch
+    from attrkid.fields import tuple_field
+
+    @attr.s(frozen=True)
+    class Bag:
+        items = tuple_field(int)
+
+    monkeypatch.setattr(patch, '_validated', {})
+    monkeypatch.setattr(patch, '_validated_items', 0)
+    monkeypatch.setattr(patch, '_MAX_VALIDATED_ITEMS', 100)
+    bag = Bag()
+    evolve(bag, items=(1, 2))
+    assert {} == patch._validated
+    values = [tuple(range(40)) for _ in range(3)]
+    for value in values:
+        evolve(bag, items=value)
+    # The oldest is forgotten, to hold no more than 100 items
+    assert values[1:] == list(patch._validated.values())
+    assert 80 == patch._validated_items
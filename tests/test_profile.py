@@ -0,0 +1,87 @@
+import gc
+import json
+import sys
+import tracemalloc
+
+import attr
+import pytest
+
+from attrkid.fields import int_field, list_field
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 9), reason='needs tracemalloc.reset_peak')
+
+
+@attr.s(frozen=True)
+class Point:
+    x = int_field()
+    y = int_field()
+
+
+@attr.s
+class Path:
+    points = list_field(Point)
+
+
+def _path_data(n):
+    return {'points': [{'x': i, 'y': -i} for i in range(n)]}
+
+
+def test_allocations():
+    from attrkid import from_dict, to_dict
+    from attrkid.constants import FROM_DICT, TO_DICT
+    from attrkid.profile import allocations
+
+    assert not tracemalloc.is_tracing()
+    with allocations() as profile:
+        path = from_dict(Path, _path_data(20))
+        to_dict(path)
+    assert not tracemalloc.is_tracing()
+    # Not counted, once the block is over
+    from_dict(Path, _path_data(20))
+
+    usage = profile.usage
+    assert {(Path, None, FROM_DICT), (Path, 'points', FROM_DICT),
+            (Point, None, FROM_DICT), (Path, None, TO_DICT),
+            (Path, 'points', TO_DICT), (Point, None, TO_DICT)} == set(usage)
+    assert 20 == usage[(Point, None, FROM_DICT)].calls
+    assert 1 == usage[(Path, 'points', FROM_DICT)].calls
+    # Each Point is an object the GC counts, and is kept by the Path
+    assert 20 <= usage[(Point, None, FROM_DICT)].objects
+    assert 0 < usage[(Point, None, FROM_DICT)].bytes
+    assert usage[(Point, None, FROM_DICT)].peak < (
+        usage[(Path, None, FROM_DICT)].peak)
+    assert (Point, None, FROM_DICT) == profile.top(1, key='calls')[0][0]
+    assert 'Path.points' in profile.summary()
+
+
+def test_allocations_gc():
+    from attrkid import from_dict
+    from attrkid.constants import FROM_DICT
+    from attrkid.fields import _field
+    from attrkid.profile import allocations
+
+    def collect(cls, field, value):
+        gc.collect(1)
+        return value
+
+    @attr.s
+    class M:
+        x = _field(None, deserialise=collect)
+
+    with allocations() as profile:
+        from_dict(M, {'x': 1})
+    assert 1 == profile.usage[(M, 'x', FROM_DICT)].collections
+    assert 0 == profile.usage[(M, None, FROM_DICT)].collections
+    assert 1 == profile.gc[1].count
+
+
+def test_main(tmp_path, capsys):
+    from attrkid.profile import main
+
+    path = tmp_path / 'paths.json'
+    path.write_text(json.dumps([_path_data(5), _path_data(10)]))
+    main(['tests.test_profile:Path', str(path), '--repeat', '2'])
+    out = capsys.readouterr().out
+    assert 'Point' in out
+    assert 'GC generation 0' in out
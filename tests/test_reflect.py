@@ -0,0 +1,60 @@
+import attr
+
+
+def test_class_info():
+    from attrkid.constants import SELF
+    from attrkid.fields import (
+        key,
+        list_field,
+        object_field,
+        primary_key,
+        string_field,
+    )
+    from attrkid.kind import UnionKind
+    from attrkid.reflect import class_info
+
+    @attr.s
+    class A:
+        pass
+
+    @attr.s
+    class M:
+        id = primary_key(int)
+        a_id = key(str)
+        name = string_field(unique=True)
+        u = object_field(UnionKind(('a', A), ))
+        hidden = string_field(should_serialise=False)
+        children = list_field(SELF)
+
+    info = class_info(M)
+    fields = attr.fields(M)
+    assert info is class_info(M)
+    assert fields.id is info.pk
+    assert (fields.id, fields.a_id) == info.keys
+    assert (fields.name, ) == info.uniques
+    assert fields.hidden not in info.serialisable
+    assert info.only_field is None
+    assert info.unions['u'] is not None
+    assert info.unions['children'] is None
+    assert M is info.item_kind('children')
+    assert (str, ) == info.field_types('name')
+
+    # Subclasses get their own info
+    @attr.s
+    class N(M):
+        extra = string_field(default='')
+
+    assert class_info(N) is not info
+    assert 'extra' in [f.name for f in class_info(N).fields]
+
+
+def test_primary_key_for_missing():
+    import pytest
+    from attrkid.reflect import primary_key_for
+
+    @attr.s
+    class M:
+        f = attr.ib()
+
+    with pytest.raises(ValueError):
+        primary_key_for(M)
@@ -150,6 +150,31 @@ def test_set_field():
     assert M(xs={1, 2, 3}) == m
 
 
+def test_collections_not_copied():
+    """ Collections are built once, and never shared with the input """
+    from attrkid import from_dict
+    from attrkid.fields import list_field, set_field, tuple_field
+
+    @attr.s
+    class M:
+        xs = list_field(int)
+        ys = tuple_field(int)
+        zs = set_field(int)
+
+    xs = [1, 2]
+    ys = (3, 4)
+    zs = frozenset([5])
+    m = M(xs=xs, ys=ys, zs=zs)
+    assert zs is m.zs
+    assert frozenset is M(xs=xs, ys=ys, zs={5}).zs.__class__
+
+    m = from_dict(M, {'xs': xs, 'ys': ys, 'zs': [5, 5]})
+    assert xs == m.xs
+    assert xs is not m.xs
+    assert ys is m.ys
+    assert frozenset([5]) == m.zs
+
+
 def test_set_field_object():
     from attrkid import from_dict, to_dict
     from attrkid.fields import set_field, int_field
@@ -971,6 +996,163 @@ def test_decimal_field():
     assert m == as_ob
 
 
+@pytest.mark.parametrize('encoding', ['base64', 'base85', 'hex'])
+def test_bytes_field_encoding(encoding):
+    import array
+
+    from attrkid import to_dict, from_dict
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import bytes_field
+
+    @attr.s
+    class M:
+        data = bytes_field(encoding=encoding)
+        chunked = bytes_field(
+            encoding=encoding, chunk_threshold=0, is_optional=True)
+
+    # Longer than a chunk, and not a whole number of them
+    blob = bytes(range(256)) * 7000 + b'end'
+    m = M(data=b'\x00\xffhello', chunked=bytearray(blob))
+    as_dict = to_dict(m)
+    assert isinstance(as_dict['data'], str)
+    as_ob = from_dict(M, as_dict)
+    assert m == as_ob
+    assert isinstance(as_ob.data, bytes)
+    assert isinstance(as_ob.chunked, bytes)
+
+    # Views are encoded without being copied first
+    values = array.array('d', [1.5, -2.0])
+    m = M(data=memoryview(values), chunked=None)
+    assert values.tobytes() == from_dict(M, to_dict(m)).data
+
+    with pytest.raises(ValidationError):
+        from_dict(M, {'data': '!not encoded!'})
+    with pytest.raises(ValidationError):
+        from_dict(M, {'data': 12})
+
+
+def test_bytes_field_raw():
+    from attrkid import to_dict, from_dict
+    from attrkid.fields import bytes_field
+
+    @attr.s
+    class M:
+        data = bytes_field()
+
+    buffer = bytearray(b'abc')
+    m = M(data=memoryview(buffer))
+    assert m.data.obj is buffer
+    assert {'data': m.data} == to_dict(m)
+    assert {'data': b'abc'} == to_dict(from_dict(M, {'data': b'abc'}))
+    with pytest.raises(TypeError):
+        M(data='abc')
+    with pytest.raises(ValueError):
+        bytes_field(encoding='base32')
+
+
+def test_array_field():
+    import array
+
+    from attrkid import to_dict, from_dict
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import array_field
+
+    @attr.s
+    class Series:
+        values = array_field('d')
+        counts = array_field('q', is_optional=True, default=None)
+
+    s = Series(values=array.array('d', [1.5, 2.0]))
+    assert Series(values=array.array('d')) == Series()
+    as_dict = to_dict(s)
+    assert {'values': [1.5, 2.0]} == as_dict
+    assert s == from_dict(Series, as_dict)
+    assert array.array('q', [1, 2]) == from_dict(Series, {
+        'values': '[]',
+        'counts': [1, 2]
+    }).counts
+
+    with pytest.raises(ValidationError):
+        from_dict(Series, {'values': [], 'counts': [1.5]})
+    with pytest.raises(TypeError):
+        Series(values=array.array('f', [1.5]))
+    with pytest.raises(TypeError):
+        Series(values=[1.5])
+    with pytest.raises(ValueError):
+        array_field('u')
+
+
+def test_array_field_ndarray():
+    numpy = pytest.importorskip('numpy')
+
+    from attrkid import to_dict, from_dict
+    from attrkid.fields import array_field
+
+    @attr.s(cmp=False)
+    class Series:
+        values = array_field('d', ndarray=True)
+
+    assert 0 == len(Series().values)
+    s = Series(values=numpy.array([1.5, 2.0]))
+    as_dict = to_dict(s)
+    assert {'values': [1.5, 2.0]} == as_dict
+    loaded = from_dict(Series, as_dict).values
+    assert numpy.float64 == loaded.dtype
+    assert [1.5, 2.0] == loaded.tolist()
+    with pytest.raises(TypeError):
+        Series(values=numpy.zeros((2, 2)))
+    with pytest.raises(TypeError):
+        Series(values=numpy.zeros(2, dtype='q'))
+
+
+def test_enum_field():
+    import enum
+
+    from attrkid import to_dict, from_dict
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import enum_field
+    from attrkid.options import SerdeOptions
+
+    class Status(enum.Enum):
+        OPEN = 'open'
+        CLOSED = 'closed'
+        SHUT = 'closed'
+
+    @attr.s
+    class M:
+        by_value = enum_field(Status)
+        by_name = enum_field(Status, by='name')
+        maybe = enum_field(Status, is_optional=True, default=None)
+
+    m = M(by_value=Status.CLOSED, by_name=Status.OPEN)
+    as_dict = to_dict(m)
+    assert {'by_value': 'closed', 'by_name': 'OPEN'} == as_dict
+    assert {'by_value': 'closed', 'by_name': 'OPEN', 'maybe': None} == to_dict(
+        m, options=SerdeOptions(omit_null_values=False))
+
+    as_ob = from_dict(M, as_dict)
+    assert m == as_ob
+    assert as_ob.by_value is Status.CLOSED
+    assert Status.CLOSED is from_dict(M, {
+        'by_value': 'open',
+        'by_name': 'SHUT'
+    }).by_name
+
+    for data in ({'by_value': 'OPEN', 'by_name': 'OPEN'},
+                 {'by_value': 'open', 'by_name': 'open'},
+                 {'by_value': ['open'], 'by_name': 'OPEN'}):
+        with pytest.raises(ValidationError):
+            from_dict(M, data)
+    with pytest.raises(TypeError) as info:
+        M(by_value='open', by_name=Status.OPEN)
+    # Checked by member_of alone
+    assert 'must be a member of Status' in str(info.value)
+    with pytest.raises(TypeError):
+        enum_field(str)
+    with pytest.raises(ValueError):
+        enum_field(Status, by='label')
+
+
 def test_optional_tuple_field():
     from attrkid import to_dict, from_dict
     from attrkid.fields import tuple_field
@@ -992,3 +1174,188 @@ def test_optional_tuple_field():
 
     data = {}
     assert m == from_dict(M, data)
+
+
+def test_share_references():
+    from attrkid import from_dict, to_dict
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import list_field, object_field, string_field
+    from attrkid.kind import UnionKind
+    from attrkid.options import SerdeOptions
+
+    @attr.s(frozen=True)
+    class Address:
+        postcode = string_field()
+
+    @attr.s(frozen=True)
+    class Person:
+        name = string_field()
+        home = object_field(Address)
+
+    @attr.s(frozen=True)
+    class Household:
+        address = object_field(UnionKind(('address', Address), ))
+        head = object_field(Person)
+        people = list_field(Person)
+
+    home = Address(postcode='AB1')
+    a = Person(name='a', home=home)
+    b = Person(name='b', home=home)
+    household = Household(people=[a, b], address=home, head=a)
+    options = SerdeOptions(share_references=True)
+
+    as_dict = to_dict(household, options=options)
+    assert {
+        'address': {
+            'address': {
+                '$id': 1,
+                'postcode': 'AB1'
+            }
+        },
+        'head': {
+            '$id': 2,
+            'name': 'a',
+            'home': {
+                '$ref': 1
+            }
+        },
+        'people': [{
+            '$ref': 2
+        }, {
+            'name': 'b',
+            'home': {
+                '$ref': 1
+            }
+        }],
+    } == as_dict
+
+    loaded = from_dict(Household, as_dict, options=options)
+    assert household == loaded
+    assert loaded.head is loaded.people[0]
+    assert loaded.address is loaded.people[1].home is loaded.people[0].home
+
+    # Without the option, everything is written out in full
+    assert household == from_dict(Household, to_dict(household))
+
+    with pytest.raises(ValidationError):
+        from_dict(Household, dict(as_dict, head={'$ref': 9}), options=options)
+
+
+@pytest.mark.parametrize('share_references', [True, False])
+def test_reference_cycle(share_references):
+    from attrkid import to_dict
+    from attrkid.constants import SELF
+    from attrkid.fields import list_field, string_field
+    from attrkid.options import SerdeOptions
+
+    @attr.s
+    class M:
+        name = string_field()
+        ms = list_field(SELF)
+
+    m = M(name='m')
+    m.ms.append(M(name='n', ms=[m]))
+    with pytest.raises(ValueError):
+        to_dict(m, options=SerdeOptions(share_references=share_references))
+
+
+def test_union_field_tagged():
+    from attrkid import from_dict, to_dict
+    from attrkid.exceptions import ValidationError
+    from attrkid.fields import bool_field, list_field, object_field
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class Value:
+        value = bool_field()
+
+    @attr.s
+    class And:
+        items = list_field(Value)
+
+    @attr.s
+    class Not:
+        item = object_field(Value, is_only_field=True)
+
+    expr = UnionKind(('and', And), ('not', Not), tag='type')
+
+    @attr.s
+    class Container:
+        item = object_field(expr)
+        items = list_field(expr)
+
+    c = Container(
+        item=And(items=[Value(value=True)]),
+        items=[Not(item=Value(value=False))])
+    expected = {
+        'item': {
+            'type': 'and',
+            'items': [{
+                'value': True
+            }]
+        },
+        'items': [{
+            'type': 'not',
+            'value': False
+        }],
+    }
+    assert expected == to_dict(c)
+    assert c == from_dict(Container, expected)
+
+    with pytest.raises(ValidationError):
+        from_dict(Container, dict(expected, item={'items': []}))
+
+
+def test_union_field_untagged():
+    from attrkid import from_dict, to_dict
+    from attrkid.fields import (
+        list_field,
+        object_field,
+        string_field,
+    )
+    from attrkid.kind import UnionKind
+
+    @attr.s
+    class Card:
+        number = string_field()
+        expiry = string_field()
+
+    @attr.s
+    class Transfer:
+        account = string_field()
+        reference = string_field(is_optional=True, default=None)
+
+    @attr.s
+    class Only:
+        values = list_field(int, is_only_field=True)
+
+    @attr.s
+    class Payment:
+        method = object_field(
+            UnionKind(('card', Card), ('transfer', Transfer), untagged=True))
+        methods = list_field(
+            UnionKind(('card', Card), ('transfer', Transfer), untagged=True))
+
+    p = Payment(
+        method=Card(number='1234', expiry='01/30'),
+        methods=[Transfer(account='1'),
+                 Transfer(account='2', reference='x')])
+    expected = {
+        'method': {
+            'number': '1234',
+            'expiry': '01/30'
+        },
+        'methods': [{
+            'account': '1'
+        }, {
+            'account': '2',
+            'reference': 'x'
+        }],
+    }
+    assert expected == to_dict(p)
+    assert p == from_dict(Payment, expected)
+
+    # Only's value isn't a dict of fields, so it can't be told apart by
+    # keys: the union is rejected as it's made
+    with pytest.raises(TypeError):
+        UnionKind(('card', Card), ('only', Only), untagged=True)
@@ -0,0 +1,123 @@
+import enum
+
+import attr
+import pytest
+from hypothesis import given, settings
+
+from attrkid.constants import SELF
+from attrkid.fields import (
+    array_field,
+    bytes_field,
+    datetime_field,
+    decimal_field,
+    enum_field,
+    int_field,
+    list_field,
+    object_field,
+    primary_key,
+    set_field,
+    string_field,
+    url_field,
+)
+from attrkid.kind import DeferredKind, UnionKind
+from attrkid.testing import strategy
+
+
+class Colour(enum.Enum):
+    RED = 'red'
+    BLUE = 'blue'
+
+
+@attr.s(frozen=True)
+class Leaf:
+    name = string_field()
+    size = int_field(is_optional=True, default=None)
+
+
+@attr.s(kw_only=True)
+class Tree:
+    id = primary_key(auto=True)
+    title = string_field(default='untitled')
+    planted = datetime_field()
+    price = decimal_field()
+    colour = enum_field(Colour)
+    seed = bytes_field(encoding='base64')
+    rings = array_field('h')
+    tags = set_field(str)
+    leaves = list_field(Leaf)
+    branch = object_field(
+        UnionKind(('leaf', Leaf),
+                  ('tree', DeferredKind('tests.test_testing.Tree'))))
+    parent = object_field(SELF, is_optional=True, default=None)
+    children = list_field(SELF)
+
+
+def _depth(tree):
+    nested = [c for c in tree.children]
+    if isinstance(tree.branch, Tree):
+        nested.append(tree.branch)
+    return 1 + max([_depth(c) for c in nested], default=0)
+
+
+def test_generate():
+    from attrkid import from_dict, to_dict
+    from attrkid.testing import generate
+
+    trees = list(generate(Tree, 50, seed=1, max_depth=2))
+    assert 50 == len(trees)
+    for tree in trees:
+        assert tree == from_dict(Tree, to_dict(tree))
+        assert _depth(tree) <= 3
+    # Some of each, for optional and defaulted fields
+    assert {True, False} == {t.parent is None for t in trees}
+    assert {True, False} == {t.title == 'untitled' for t in trees}
+    assert {Leaf, Tree} == {t.branch.__class__ for t in trees}
+
+    assert list(generate(Tree, 5, seed=2, as_dicts=True)) == list(
+        generate(Tree, 5, seed=2, as_dicts=True))
+    assert isinstance(next(generate(Tree, as_dicts=True)), dict)
+
+
+def test_generate_sizes():
+    from attrkid.testing import generate
+
+    for tree in generate(
+            Tree,
+            20,
+            seed=3,
+            collection_size=(2, 2),
+            string_length=(4, 4),
+            default_probability=0):
+        assert 2 == len(tree.leaves) == len(tree.rings)
+        assert all(4 == len(leaf.name) for leaf in tree.leaves)
+
+
+def test_generate_overrides():
+    from attrkid.testing import generate
+
+    @attr.s
+    class Site:
+        url = url_field()
+
+    with pytest.raises(ValueError):
+        list(generate(Site, 5, seed=1))
+    url = attr.fields(Site).url
+    sites = generate(
+        Site, 5, overrides={url: lambda r: f'https://{r.randrange(99)}'})
+    assert all(s.url.startswith('https://') for s in sites)
+
+    @attr.s
+    class Loop:
+        next = object_field(SELF)
+
+    with pytest.raises(ValueError):
+        list(generate(Loop, 1))
+
+
+@settings(max_examples=20)
+@given(strategy(Tree, max_depth=1, as_dicts=True))
+def test_strategy(data):
+    from attrkid import from_dict, to_dict
+
+    tree = from_dict(Tree, data)
+    assert tree == from_dict(Tree, to_dict(tree))
@@ -47,3 +47,47 @@ def test_composite():
     with pytest.raises(ValueError):
         M(f=2)
     M(f=1)
+
+
+def test_fuse():
+    from attr.validators import optional
+
+    from attrkid.constants import SELF
+    from attrkid.fields import int_field, list_field, object_field
+    from attrkid.kind import DeferredKind
+    from attrkid.validators import all_of, collection_of, fuse, instance_of
+
+    def positive(inst, attr, value):
+        if value <= 0:
+            raise ValueError(f'{attr.name} must be positive')
+
+    @attr.s
+    class M:
+        n = int_field(is_optional=True, default=None, validator=positive)
+        parent = object_field(SELF, is_optional=True, default=None)
+        others = list_field(DeferredKind('tests.test_validators.Other'))
+        anything = attr.ib(validator=fuse(None), default=None)
+
+    M(n=1, parent=M(), others=[Other()])
+    M(n=None)
+    for kw, error in (({'n': 0}, ValueError), ({'n': 'x'}, TypeError),
+                      ({'parent': 1}, TypeError), ({'others': [1]}, TypeError),
+                      ({'others': [M()]}, TypeError)):
+        with pytest.raises(error):
+            M(**kw)
+    assert attr.fields(M).anything.validator is None
+
+    # Failures raise the errors the validators would have
+    unfused = all_of(optional(instance_of(list)), collection_of(int))
+    for value in ('x', [1, 'x']):
+        errors = []
+        for validator in (unfused, fuse(unfused)):
+            with pytest.raises(TypeError) as exc_info:
+                validator(None, attr.fields(M).n, value)
+            errors.append(exc_info.value.args)
+        assert errors[0] == errors[1]
+
+
+@attr.s
+class Other:
+    pass